@@ -0,0 +1,240 @@
+"""
+Offline analysis of video archives: the detect / track / classify pipeline runs headless over shards of the
+videos in a process pool, and the per-shard results are stitched into one result file per video.
+
+python drone_detection/batch.py grabber.parameters.video_path=<video_dir> batch.workers=8
+"""
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import dataclasses
+import json
+import multiprocessing
+import os
+import pathlib
+from typing import Any
+
+import cv2
+import hydra
+import numpy as np
+from loguru import logger
+from omegaconf import DictConfig, OmegaConf
+
+from drone_detection import grabbers, detectors, trackers, classifiers
+from drone_detection.classifiers import ClassificationCadence
+from drone_detection.utils import Runtime, iou_matrix
+
+
+@dataclasses.dataclass(frozen=True)
+class Shard:
+    """
+    A frame range [start, stop) of a video. Frames before `owned_from` overlap the previous shard, they are
+    processed to warm up the tracker and to stitch the track ids, but their results come from the previous shard.
+    """
+    path: str
+    start: int
+    stop: int
+    owned_from: int
+
+
+@dataclasses.dataclass()
+class ShardResult:
+    shard: Shard
+    # one record per track per frame: frame, track_id, bbox_xyxy, threat_score, classification
+    records: list[dict[str, Any]]
+    frames: int
+
+
+def _pyav_available() -> bool:
+    try:
+        from drone_detection.grabbers import pyav_decoder  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def video_keyframes(path: str | pathlib.Path) -> tuple[int, np.ndarray | None]:
+    """
+    The number of frames of a video and the indices of its keyframes, from the PyAV frame index if PyAV is
+    installed. Without PyAV the keyframes are unknown (None) and the frame count is OpenCV's estimate.
+    """
+    if not _pyav_available():
+        capture = cv2.VideoCapture(str(path))
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        capture.release()
+        return frame_count, None
+    from drone_detection.grabbers.pyav_decoder import PyAVDecoder
+    decoder = PyAVDecoder(path)
+    decoder.release()
+    return decoder.frame_count, decoder.index.keyframe_indices
+
+
+def plan_shards(path: str | pathlib.Path, shard_frames: int, overlap_frames: int) -> list[Shard]:
+    """
+    Splits a video into shards of about shard_frames frames. Each shard after the first starts at the keyframe
+    at or before overlap_frames frames ahead of the frames it owns, so decoding starts without a seek inside a
+    group of pictures and the tracks of the overlap can be matched to the previous shard.
+
+    Shards are decoded with PyAV, which seeks to exact frames. Without PyAV the video is one shard, as OpenCV's
+    seeking may land on a nearby frame.
+    """
+    frame_count, keyframes = video_keyframes(path)
+    if frame_count <= 0:
+        return []
+    if keyframes is None:
+        return [Shard(path=str(path), start=0, stop=frame_count, owned_from=0)]
+    bounds = list(range(0, frame_count, shard_frames)) + [frame_count]
+    shards = []
+    for owned_from, stop in zip(bounds[:-1], bounds[1:]):
+        start = max(owned_from - overlap_frames, 0)
+        if len(keyframes):
+            start = int(keyframes[max(np.searchsorted(keyframes, start, side="right") - 1, 0)])
+        shards.append(Shard(path=str(path), start=start, stop=stop, owned_from=owned_from))
+    return shards
+
+
+# the detectors (background model, motion gate, resolution selector) and the trackers hold per-video state and
+# are created per shard, only the weights are loaded once per worker process and shared through the model registry
+_worker_ready = False
+
+
+def _init_worker(cfg: dict[str, Any]) -> None:
+    global _worker_ready
+    cfg = OmegaConf.create(cfg)
+    detectors.create(cfg.detector)
+    Runtime(**cfg.get("runtime", {})).apply()
+    _worker_ready = True
+
+
+def run_shard(cfg: dict[str, Any], shard: Shard) -> ShardResult:
+    """Runs the pipeline headless over a shard and returns the tracks of every frame."""
+    cfg = OmegaConf.create(cfg)
+    if not _worker_ready:
+        _init_worker(OmegaConf.to_container(cfg))
+    detector = detectors.create(cfg.detector)
+    tracker = trackers.create(cfg.tracker)
+    behaviour_classifier, threat_score_calculator = classifiers.create(cfg.classifier)
+    cadence = ClassificationCadence(**cfg.classifier.get("cadence", {}))
+    min_track_length = cfg.classifier.min_track_length
+
+    # the shard bounds are PyAV frame indices, the opencv backend would count and seek frames differently
+    backend = "pyav" if _pyav_available() else cfg.grabber.parameters.get("backend", "opencv")
+    grabber = grabbers.VideoGrabber(**{**cfg.grabber.parameters, "video_path": shard.path, "backend": backend})
+    grabber.seek(shard.start)
+
+    records = []
+    frame_index = shard.start
+    for frame_index in range(shard.start, shard.stop):
+        image = next(grabber, None)
+        if image is None:
+            break
+        tracks = tracker.update(detections=detector.run(image), frame=image) or []
+        detector.observe_tracks(tracks)
+        for track in tracks:
+            if track.time_since_last_seen > cfg.tracker.age_threshold:
+                continue
+            if len(track) > min_track_length:
+                cadence.classify(track, behaviour_classifier, threat_score_calculator)
+            records.append({"frame": frame_index,
+                            "track_id": str(track.track_id),
+                            "bbox_xyxy": [float(v) for v in track.bbox_xyxy],
+                            "threat_score": track.threat_score,
+                            "classification": track.classification})
+    else:
+        frame_index = shard.stop
+    return ShardResult(shard=shard, records=records, frames=frame_index - shard.start)
+
+
+def stitch(results: list[ShardResult], iou_threshold: float = 0.5, min_matches: int = 3) -> list[dict[str, Any]]:
+    """
+    Merges the shard results of one video, renumbering the track ids so a track crossing a shard boundary keeps
+    one id.
+
+    Each shard's tracks are matched to the previous shard's tracks by the number of overlap frames in which their
+    boxes overlap by at least iou_threshold, greedily by the most matched frames, needing at least min_matches
+    frames. Unmatched tracks get new ids. The results of the overlap frames are taken from the previous shard.
+
+    Returns:
+        The records of all the shards in frame order with the stitched track ids (strings "0", "1", ...).
+    """
+    merged: list[dict[str, Any]] = []
+    previous: dict[int, dict[str, np.ndarray]] = {}  # frame -> stitched id -> box, in the next shard's overlap
+    next_id = 0
+
+    for result in sorted(results, key=lambda r: r.shard.start):
+        by_frame: dict[int, dict[str, list[float]]] = collections.defaultdict(dict)
+        for record in result.records:
+            by_frame[record["frame"]][record["track_id"]] = record["bbox_xyxy"]
+
+        votes: collections.Counter[tuple[str, str]] = collections.Counter()
+        for frame, earlier in previous.items():
+            later = by_frame.get(frame)
+            if not later:
+                continue
+            earlier_ids, later_ids = list(earlier), list(later)
+            iou = iou_matrix([earlier[i] for i in earlier_ids], [later[i] for i in later_ids])
+            for i, j in zip(*np.nonzero(iou >= iou_threshold)):
+                votes[(earlier_ids[i], later_ids[j])] += 1
+
+        mapping: dict[str, str] = {}
+        used: set[str] = set()
+        for (earlier_id, later_id), count in votes.most_common():
+            if count < min_matches or earlier_id in used or later_id in mapping:
+                continue
+            mapping[later_id] = earlier_id
+            used.add(earlier_id)
+
+        previous = collections.defaultdict(dict)
+        for record in result.records:
+            if record["track_id"] not in mapping:
+                mapping[record["track_id"]] = str(next_id)
+                next_id += 1
+            record = {**record, "track_id": mapping[record["track_id"]]}
+            if record["frame"] >= result.shard.owned_from:
+                merged.append(record)
+            previous[record["frame"]][record["track_id"]] = record["bbox_xyxy"]
+
+    merged.sort(key=lambda r: (r["frame"], r["track_id"]))
+    return merged
+
+
+@hydra.main(version_base=None, config_path="../config", config_name="config")
+def main(cfg: DictConfig):
+    batch = cfg.get("batch", {})
+    grabber = grabbers.VideoGrabber(**cfg.grabber.parameters)
+    output_dir = pathlib.Path(batch.get("output_dir", "outputs/batch"))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    shards = [shard for path in grabber.paths
+              for shard in plan_shards(path, batch.get("shard_frames", 3000), batch.get("overlap_frames", 60))]
+    workers = batch.get("workers") or os.cpu_count()
+    logger.info(f"Processing {len(grabber.paths)} videos in {len(shards)} shards with {workers} workers")
+
+    config = OmegaConf.to_container(cfg, resolve=True)
+    results: dict[str, list[ShardResult]] = collections.defaultdict(list)
+    # spawned workers, so each starts without the parent's torch and OpenCV thread pools
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_worker, initargs=(config,)) as pool:
+        futures = {pool.submit(run_shard, config, shard): shard for shard in shards}
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results[result.shard.path].append(result)
+            logger.info(f"Done {result.shard.path} [{result.shard.start}, {result.shard.stop}): "
+                        f"{len(result.records)} track records")
+
+    for path, video_results in results.items():
+        records = stitch(video_results, iou_threshold=batch.get("stitch_iou", 0.5),
+                         min_matches=batch.get("stitch_min_matches", 3))
+        output = output_dir / f"{pathlib.Path(path).stem}.json"
+        with open(output, "w") as f:
+            json.dump({"video": path,
+                       "frames": max(r.shard.stop for r in video_results),
+                       "shards": len(video_results),
+                       "tracks": len({r["track_id"] for r in records}),
+                       "records": records}, f)
+        logger.info(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
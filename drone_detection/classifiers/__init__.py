@@ -5,6 +5,7 @@ from typing import Callable
 from omegaconf import DictConfig
 
 from .behaviour import *
+from .cadence import *
 
 
 class ClassifierType(enum.Enum):
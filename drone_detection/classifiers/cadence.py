@@ -0,0 +1,90 @@
+import math
+from typing import Any, Callable
+
+__all__ = ["ClassificationCadence"]
+
+
+class ClassificationCadence:
+    """
+    Decides when a track's behaviour classification and threat score are recomputed.
+
+    The results are cached on the track. A track is re-classified when it has never been classified, when its
+    cached result is `interval` frames old, when its Kalman velocity or area has changed by more than the
+    configured deltas since it was classified, or on every frame while its threat score is at or above
+    `high_threat_threshold`. Otherwise the cached result is reused, so no output is more than `interval`
+    frames stale.
+    """
+
+    def __init__(self,
+                 interval: int = 5,
+                 velocity_delta: float = 20.0,
+                 area_delta: float = 0.25,
+                 high_threat_threshold: float = 50.0,
+                 enabled: bool = True,
+                 **kwargs) -> None:
+        """
+        Args:
+            interval: Re-classify a track at least every this many frames.
+            velocity_delta: Re-classify when the velocity (vx, vy, vw, vh) has moved by more than this, in px/s.
+            area_delta: Re-classify when the area has changed by more than this fraction.
+            high_threat_threshold: Tracks with a threat score at or above this are re-classified every frame.
+            enabled: If False every track is classified on every frame.
+            **kwargs: Additional keyword arguments.
+        """
+        self.interval = interval
+        self.velocity_delta = velocity_delta
+        self.area_delta = area_delta
+        self.high_threat_threshold = high_threat_threshold
+        self.enabled = enabled
+
+        self.classified = 0
+        self.reused = 0
+
+    def should_classify(self, track) -> bool:
+        """Whether the track's cached classification is out of date."""
+        if not self.enabled or track.classification is None or track.classified_state is None:
+            return True
+        if track.frames_since_classified >= self.interval:
+            return True
+        if track.threat_score is not None and track.threat_score >= self.high_threat_threshold:
+            return True
+
+        state, cached = track.state, track.classified_state
+        velocity_change = math.sqrt(sum((state[k] - cached[k]) ** 2 for k in ("vx", "vy", "vw", "vh")))
+        if velocity_change > self.velocity_delta:
+            return True
+        return abs(state["area"] - cached["area"]) > self.area_delta * max(cached["area"], 1e-9)
+
+    def classify(self,
+                 track,
+                 behaviour_classifier: Callable[..., dict[str, float]],
+                 threat_score_calculator: Callable[..., float],
+                 refresh: bool | None = None) -> tuple[dict[str, float], float]:
+        """
+        Returns the track's behaviour probabilities and threat score, recomputing and caching them if they are
+        out of date.
+
+        Args:
+            track: The track.
+            behaviour_classifier: The behaviour classifier from classifiers.create.
+            threat_score_calculator: The threat score calculator from classifiers.create.
+            refresh: Whether to recompute, None to recompute if the cached result is out of date. A track that has
+                     never been classified is always classified.
+        """
+        if refresh is None:
+            refresh = self.should_classify(track)
+        if refresh or track.classification is None:
+            track.classification = behaviour_classifier(state_history=list(track.state_history))
+            track.threat_score = threat_score_calculator(state=track.state, behavior_probs=track.classification)
+            track.classified_state = track.state
+            track.frames_since_classified = 0
+            self.classified += 1
+        else:
+            self.reused += 1
+        return track.classification, track.threat_score
+
+    def stats(self) -> dict[str, Any]:
+        total = self.classified + self.reused
+        return {"classified": self.classified,
+                "reused": self.reused,
+                "reuse_fraction": self.reused / total if total else 0.0}
@@ -8,13 +8,15 @@ from loguru import logger
 from numpy import typing as npt
 from omegaconf import DictConfig
 
-from ..utils import xyxy_to_cxcywh, xyxy_to_xywh
+from ..utils import xyxy_to_cxcywh, xyxy_to_xywh, boxes_xyxy_to_xywh, boxes_xyxy_to_cxcywh, clip_boxes, \
+    EntryPoint, lazy_getattr
 __all__ = ["create"]
 
 
 class DetectorType(enum.Enum):
-    # MOG2 = "MOG2"
+    MOG2 = "MOG2"
     YOLO = "YOLO"
+    MOTION_GATED = "MOTION_GATED"
 
 
 @dataclasses.dataclass()
@@ -32,6 +34,60 @@ class Detection:
         return xyxy_to_cxcywh(self.bbox_xyxy)
 
 
+@dataclasses.dataclass()
+class DetectionBatch:
+    """
+    A columnar set of detections, bounding boxes as an (N, 4) array rather than one Detection per box.
+    """
+    bboxes_xyxy: npt.NDArray[np.float64]
+    confidences: npt.NDArray[np.float64]
+
+    def __post_init__(self):
+        self.bboxes_xyxy = np.asarray(self.bboxes_xyxy, dtype=float).reshape(-1, 4)
+        self.confidences = np.asarray(self.confidences, dtype=float).reshape(-1)
+
+    @classmethod
+    def from_detections(cls, detections: list[Detection]) -> "DetectionBatch":
+        """Creates a batch from a list of detections, missing confidences become NaN."""
+        return cls(bboxes_xyxy=np.array([d.bbox_xyxy for d in detections], dtype=float),
+                   confidences=np.array([d.confidence for d in detections], dtype=float))
+
+    def to_detections(self, frame: npt.NDArray[np.uint8]) -> list[Detection]:
+        """
+        Converts the batch to a list of detections with their image data cropped from the frame.
+
+        Args:
+            frame: The frame the detections were found in.
+
+        Returns:
+            A list of Detection, one per box.
+        """
+        corners = np.rint(self.bboxes_xyxy).astype(int).tolist()
+        confidences = [None if np.isnan(c) else c for c in self.confidences.tolist()]
+        return [Detection(bbox_xyxy=box, data=frame[ymin:ymax, xmin:xmax, ...], confidence=conf)
+                for box, (xmin, ymin, xmax, ymax), conf in zip(self.bboxes_xyxy, corners, confidences)]
+
+    def __len__(self) -> int:
+        return len(self.bboxes_xyxy)
+
+    def __getitem__(self, index: npt.ArrayLike) -> "DetectionBatch":
+        """Selects detections with an index array or boolean mask."""
+        return DetectionBatch(bboxes_xyxy=self.bboxes_xyxy[index], confidences=self.confidences[index])
+
+    def clip(self, width: int, height: int) -> "DetectionBatch":
+        """Returns the batch with the bounding boxes clipped to a frame of the given size."""
+        return DetectionBatch(bboxes_xyxy=clip_boxes(self.bboxes_xyxy, width, height),
+                              confidences=self.confidences)
+
+    @property
+    def bboxes_xywh(self) -> npt.NDArray[np.float64]:
+        return boxes_xyxy_to_xywh(self.bboxes_xyxy)
+
+    @property
+    def bboxes_cxcywh(self) -> npt.NDArray[np.float64]:
+        return boxes_xyxy_to_cxcywh(self.bboxes_xyxy)
+
+
 class BaseDetector(ABC):
 
     @abc.abstractmethod
@@ -42,13 +98,23 @@ class BaseDetector(ABC):
     def run(self, frame: npt.NDArray[np.int8]) -> list[Detection]:
         ...
 
+    def run_batch(self, frames: list[npt.NDArray[np.uint8]]) -> list[list[Detection]]:
+        """Detects in several frames, e.g. of different streams. Runs them one by one unless overridden."""
+        return [self.run(frame) for frame in frames]
 
-from .yolo_detector import *
+    def observe_tracks(self, tracks: list) -> None:
+        """Called with the tracks after each tracker update, e.g. to choose the next inference size."""
 
-DETECTOR_FACTORY: dict[DetectorType, Any] = {
-    DetectorType.YOLO: DetectorYOLO
+
+# backends are only imported when they are created or accessed, e.g. DetectorYOLO imports ultralytics and torch
+DETECTOR_FACTORY: dict[DetectorType, EntryPoint] = {
+    DetectorType.MOG2: EntryPoint(".mog2_detector", "DetectorMOG2", __name__),
+    DetectorType.YOLO: EntryPoint(".yolo_detector", "DetectorYOLO", __name__),
+    DetectorType.MOTION_GATED: EntryPoint(".motion_gate", "DetectorMotionGated", __name__),
 }
 
+__getattr__ = lazy_getattr(__name__, {entry_point.name: entry_point for entry_point in DETECTOR_FACTORY.values()})
+
 
 def create(cfg: DictConfig) -> BaseDetector:
     """
@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+from numpy import typing as npt
+
+from ..utils import boxes_xywh_to_xyxy
+from . import BaseDetector, Detection, DetectionBatch
+
+__all__ = ["DetectorMOG2"]
+
+
+class DetectorMOG2(BaseDetector):
+    """
+    A background subtraction detector using OpenCV's MOG2 model.
+
+    The frame is downscaled before the background model is updated, so this is cheap enough to run on every
+    frame. Each connected blob of foreground pixels is returned as a candidate Detection in full-resolution
+    coordinates. It is intended for static cameras, either on its own or as a motion gate in front of a more
+    expensive detector (see DetectorMotionGated).
+    """
+
+    def __init__(self,
+                 scale: float = 0.5,
+                 history: int = 500,
+                 var_threshold: float = 16.0,
+                 detect_shadows: bool = False,
+                 learning_rate: float = -1.0,
+                 grayscale: bool = True,
+                 kernel_size: int = 3,
+                 min_area: int = 4,
+                 max_area: int | None = None,
+                 **kwargs) -> None:
+        """
+        Initializes the MOG2 detector.
+
+        Args:
+            scale: Factor the frame is resized by before background subtraction (0 < scale <= 1).
+            history: Number of frames used to build the background model.
+            var_threshold: Squared Mahalanobis distance threshold for a pixel to be foreground.
+            detect_shadows: Whether MOG2 should mark shadows. Shadow pixels are never reported as foreground.
+            learning_rate: Background model learning rate, -1 lets OpenCV choose it from the history length.
+            grayscale: Run background subtraction on a single channel image, roughly 3x cheaper than colour.
+            kernel_size: Size of the morphological opening used to remove speckle noise, 0 to disable.
+            min_area: Minimum blob area in downscaled pixels.
+            max_area: Maximum blob area in downscaled pixels, None for no limit.
+            **kwargs: Additional keyword arguments.
+        """
+        if not 0 < scale <= 1:
+            raise ValueError(f"scale must be in (0, 1], got {scale}")
+
+        self.scale = scale
+        self.learning_rate = learning_rate
+        self.grayscale = grayscale
+        self.min_area = min_area
+        self.max_area = max_area
+        self.kernel = None
+        if kernel_size > 0:
+            self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+
+        self.model = cv2.createBackgroundSubtractorMOG2(history=history,
+                                                        varThreshold=var_threshold,
+                                                        detectShadows=detect_shadows)
+
+    def foreground_mask(self, frame: npt.NDArray[np.uint8]) -> npt.NDArray[np.uint8]:
+        """
+        Updates the background model and returns the foreground mask at the downscaled resolution.
+
+        Args:
+            frame: A BGR image.
+
+        Returns:
+            A binary (0/255) mask of the foreground pixels.
+        """
+        small = frame
+        if self.scale != 1:
+            small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if self.grayscale and small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        mask = self.model.apply(small, learningRate=self.learning_rate)
+
+        # shadows are marked as 127, only keep definite foreground
+        _, mask = cv2.threshold(mask, 200, 255, cv2.THRESH_BINARY)
+        if self.kernel is not None:
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+        return mask
+
+    def run(self, frame: npt.NDArray[np.uint8]) -> list[Detection]:
+        mask = self.foreground_mask(frame)
+        n_labels, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+        # label 0 is the background
+        stats = stats[1:n_labels]
+        areas = stats[:, cv2.CC_STAT_AREA]
+        keep = areas >= self.min_area
+        if self.max_area is not None:
+            keep &= areas <= self.max_area
+        stats = stats[keep]
+        if len(stats) == 0:
+            return []
+
+        boxes_xywh = stats[:, [cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP, cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT]]
+        # the fraction of the blob's bounding box that is foreground
+        fill = stats[:, cv2.CC_STAT_AREA] / np.maximum(boxes_xywh[:, 2] * boxes_xywh[:, 3], 1)
+
+        height, width = frame.shape[:2]
+        batch = DetectionBatch(bboxes_xyxy=boxes_xywh_to_xyxy(boxes_xywh) / self.scale, confidences=fill)
+        return batch.clip(width, height).to_detections(frame)
@@ -0,0 +1,133 @@
+from typing import Any
+
+import numpy as np
+from numpy import typing as npt
+from omegaconf import DictConfig
+
+from . import BaseDetector, Detection, DetectionBatch
+from .mog2_detector import DetectorMOG2
+
+__all__ = ["DetectorMotionGated"]
+
+
+class DetectorMotionGated(BaseDetector):
+    """
+    Runs a cheap MOG2 motion detector on every frame and only calls the (expensive) wrapped detector
+    when there is foreground motion.
+
+    In "frame" mode the wrapped detector is run on the full frame whenever any motion is found.
+    In "roi" mode it is run only on the padded region containing all the motion blobs, and the
+    detections are shifted back into full frame coordinates.
+
+    A static background model absorbs targets that stop moving, e.g. a hovering drone. To avoid losing
+    them the wrapped detector is kept running for `hold_frames` frames after it last found something,
+    and is forced to run on the full frame every `refresh_interval` frames.
+    """
+
+    def __init__(self,
+                 detector: DictConfig | dict[str, Any] | BaseDetector,
+                 motion: dict[str, Any] | None = None,
+                 mode: str = "frame",
+                 roi_padding: int = 32,
+                 max_roi_fraction: float = 0.5,
+                 hold_frames: int = 10,
+                 refresh_interval: int = 0,
+                 **kwargs) -> None:
+        """
+        Initializes the motion gated detector.
+
+        Args:
+            detector: The detector to gate. Either a detector config (type and parameters) or a detector instance.
+            motion: Keyword arguments for the DetectorMOG2 used as the gate.
+            mode: "frame" to run the detector on the whole frame, "roi" to run it on the region with motion.
+            roi_padding: Padding in pixels added around the motion region in "roi" mode.
+            max_roi_fraction: In "roi" mode, if the motion region covers more than this fraction of the frame
+                              the full frame is used instead.
+            hold_frames: Keep running the detector on full frames for this many frames after it last
+                         returned a detection. 0 to disable.
+            refresh_interval: Force a full frame detection every this many frames. 0 to disable.
+            **kwargs: Additional keyword arguments.
+        """
+        if mode not in ("frame", "roi"):
+            raise ValueError(f"Unknown motion gate mode {mode}")
+
+        if isinstance(detector, BaseDetector):
+            self.detector = detector
+        else:
+            from . import create
+            self.detector = create(DictConfig(detector))
+
+        self.motion = DetectorMOG2(**(motion or {}))
+        self.mode = mode
+        self.roi_padding = roi_padding
+        self.max_roi_fraction = max_roi_fraction
+        self.hold_frames = hold_frames
+        self.refresh_interval = refresh_interval
+
+        self.frame_count = 0
+        self.frames_skipped = 0
+        self.frames_roi = 0
+        self._frames_since_detection = hold_frames + 1
+
+    @property
+    def skip_fraction(self) -> float:
+        """The fraction of frames on which the wrapped detector was not run."""
+        if self.frame_count == 0:
+            return 0.0
+        return self.frames_skipped / self.frame_count
+
+    @property
+    def imgsz(self) -> int | None:
+        """The wrapped detector's inference size, so the realtime controller's reduce_imgsz reaches it."""
+        return self.detector.imgsz
+
+    @imgsz.setter
+    def imgsz(self, imgsz: int | None) -> None:
+        if not hasattr(self.detector, "imgsz"):
+            raise AttributeError(f"{type(self.detector).__name__} has no inference size")
+        self.detector.imgsz = imgsz
+
+    def observe_tracks(self, tracks: list) -> None:
+        self.detector.observe_tracks(tracks)
+
+    def run(self, frame: npt.NDArray[np.uint8]) -> list[Detection]:
+        self.frame_count += 1
+        blobs = self.motion.run(frame)
+
+        force = self._frames_since_detection <= self.hold_frames
+        if self.refresh_interval > 0 and self.frame_count % self.refresh_interval == 0:
+            force = True
+
+        if not blobs and not force:
+            self.frames_skipped += 1
+            self._frames_since_detection += 1
+            return []
+
+        if self.mode == "roi" and blobs and not force:
+            detections = self._run_roi(frame, blobs)
+        else:
+            detections = self.detector.run(frame)
+
+        if detections:
+            self._frames_since_detection = 0
+        else:
+            self._frames_since_detection += 1
+
+        return detections
+
+    def _run_roi(self, frame: npt.NDArray[np.uint8], blobs: list[Detection]) -> list[Detection]:
+        height, width = frame.shape[:2]
+        boxes = DetectionBatch.from_detections(blobs).bboxes_xyxy
+        xmin, ymin = boxes[:, :2].min(axis=0) - self.roi_padding
+        xmax, ymax = boxes[:, 2:].max(axis=0) + self.roi_padding
+        xmin, ymin = int(max(0, xmin)), int(max(0, ymin))
+        xmax, ymax = int(min(width, xmax)), int(min(height, ymax))
+
+        if (xmax - xmin) * (ymax - ymin) > self.max_roi_fraction * width * height:
+            return self.detector.run(frame)
+
+        self.frames_roi += 1
+        batch = DetectionBatch.from_detections(self.detector.run(frame[ymin:ymax, xmin:xmax]))
+        batch.bboxes_xyxy += [xmin, ymin, xmin, ymin]
+        return batch.to_detections(frame)
+
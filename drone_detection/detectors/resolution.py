@@ -0,0 +1,104 @@
+import collections
+from typing import Iterable
+
+import numpy as np
+
+__all__ = ["ResolutionSelector"]
+
+
+class ResolutionSelector:
+    """
+    Chooses the detector inference size for each frame from a set of sizes.
+
+    The smallest size is used when nothing is being tracked, and the smallest size at which the smallest
+    tracked target is still at least `min_target_px` pixels across otherwise. The choice is capped by the time
+    budget: the detector's measured latency at each size must fit in the budget left after the per-track work.
+    Every `refresh_interval` frames the largest affordable size is used to find new small, distant targets.
+    """
+
+    def __init__(self,
+                 sizes: Iterable[int],
+                 min_target_px: float = 12,
+                 budget_ms: float | None = None,
+                 track_cost_ms: float = 0.5,
+                 refresh_interval: int = 30,
+                 smoothing: float = 0.2) -> None:
+        """
+        Args:
+            sizes: The inference sizes to choose from.
+            min_target_px: The smallest target side, in pixels of the resized image, the detector finds reliably.
+            budget_ms: Time budget per frame for detection and per-track work, None for no limit.
+            track_cost_ms: Estimated time per track spent outside the detector, subtracted from the budget.
+            refresh_interval: Use the largest affordable size every this many frames, 0 to disable.
+            smoothing: Weight of the latest measurement in the moving average latency of each size.
+        """
+        self.sizes = sorted(int(s) for s in sizes)
+        if not self.sizes:
+            raise ValueError("At least one inference size is required")
+        self.min_target_px = min_target_px
+        self.budget_ms = budget_ms
+        self.track_cost_ms = track_cost_ms
+        self.refresh_interval = refresh_interval
+        self.smoothing = smoothing
+
+        self.latency_ms: dict[int, float] = {}
+        self.frames_per_size: collections.Counter[int] = collections.Counter()
+        self._min_target_side: float | None = None
+        self._n_tracks = 0
+        self._frame_count = 0
+
+    def observe_tracks(self, sides: Iterable[float]) -> None:
+        """
+        Records the tracked targets for the next selection.
+
+        Args:
+            sides: The smaller side, in full resolution pixels, of each tracked target's box.
+        """
+        sides = np.fromiter(sides, dtype=float)
+        self._n_tracks = len(sides)
+        self._min_target_side = float(sides.min()) if len(sides) else None
+
+    def record(self, size: int, latency_ms: float) -> None:
+        """Records the measured detector latency at a size."""
+        previous = self.latency_ms.get(size)
+        self.latency_ms[size] = latency_ms if previous is None else previous + self.smoothing * (latency_ms - previous)
+
+    def estimated_latency(self, size: int) -> float:
+        """The measured latency at a size, or an estimate scaled by pixel count from the nearest measured size."""
+        if size in self.latency_ms:
+            return self.latency_ms[size]
+        if not self.latency_ms:
+            return 0.0
+        nearest = min(self.latency_ms, key=lambda s: abs(s - size))
+        return self.latency_ms[nearest] * (size / nearest) ** 2
+
+    def select(self, frame_shape: tuple[int, ...], max_size: int | None = None) -> int:
+        """
+        Chooses the size for a frame.
+
+        Args:
+            frame_shape: The shape of the image passed to the detector.
+            max_size: An upper limit, e.g. from the real-time controller.
+
+        Returns:
+            The inference size.
+        """
+        self._frame_count += 1
+        sizes = [s for s in self.sizes if max_size is None or s <= max_size] or self.sizes[:1]
+
+        if self.budget_ms is not None:
+            available = self.budget_ms - self.track_cost_ms * self._n_tracks
+            sizes = [s for s in sizes if self.estimated_latency(s) <= available] or sizes[:1]
+
+        if self.refresh_interval > 0 and self._frame_count % self.refresh_interval == 0:
+            size = sizes[-1]
+        elif self._min_target_side is None:
+            size = sizes[0]
+        else:
+            # letterboxing scales the long side of the image to the inference size
+            long_side = max(frame_shape[:2])
+            large_enough = [s for s in sizes if self._min_target_side * s / long_side >= self.min_target_px]
+            size = large_enough[0] if large_enough else sizes[-1]
+
+        self.frames_per_size[size] += 1
+        return size
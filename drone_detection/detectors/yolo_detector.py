@@ -1,10 +1,14 @@
 import pathlib
+import time
+from typing import Any
 
 import numpy as np
 from numpy import typing as npt
 from ultralytics import YOLO
 
-from . import BaseDetector, Detection
+from ..utils import get_model
+from . import BaseDetector, Detection, DetectionBatch
+from .resolution import ResolutionSelector
 
 __all__ = ["DetectorYOLO"]
 
@@ -14,26 +18,59 @@ DEFAULT_PATH = package_root / "data/weights"
 
 class DetectorYOLO(BaseDetector):
 
-    def __init__(self, model_path: str, min_confidence: float = 0.5, **kwargs) -> None:
+    def __init__(self, model_path: str,
+                 min_confidence: float = 0.5,
+                 device: str | None = None,
+                 share_model: bool = True,
+                 imgsz: int | None = None,
+                 resolution: dict[str, Any] | None = None,
+                 **kwargs) -> None:
         self.min_confidence = min_confidence
+        self.device = device
+        # inference size, None for the size the model was trained at. Can be changed between frames.
+        # With a resolution selector it is the largest size the selector may choose.
+        self.imgsz = imgsz
+        # keyword arguments of a ResolutionSelector to choose the inference size per frame from the tracks
+        self.resolution = ResolutionSelector(**resolution) if resolution else None
         model_path = DEFAULT_PATH / model_path
         if not pathlib.Path(model_path).exists():
             raise FileNotFoundError(f"Model path {model_path} does not exist")
 
-        self.model = YOLO(model_path)
+        # a shared model is loaded once per process, e.g. when the tracker uses the same weights
+        self.model = get_model(model_path, device=device) if share_model else YOLO(model_path)
+
+    def observe_tracks(self, tracks: list) -> None:
+        if self.resolution is not None:
+            self.resolution.observe_tracks(min(xmax - xmin, ymax - ymin)
+                                           for xmin, ymin, xmax, ymax in (track.bbox_xyxy for track in tracks))
 
     def run(self, frame: npt.NDArray[np.uint8]) -> list[Detection]:
-        results = self.model(frame, verbose=False)
+        imgsz = self.imgsz if self.resolution is None else self.resolution.select(frame.shape, self.imgsz)
+        kwargs = {} if imgsz is None else {"imgsz": imgsz}
+        t0 = time.perf_counter()
+        results = self.model(frame, verbose=False, device=self.device, **kwargs)
+        if self.resolution is not None:
+            self.resolution.record(imgsz, (time.perf_counter() - t0) * 1000)
         detections: list[Detection] = []
         for r in results:
-            bboxes = r.boxes.cpu()
+            detections.extend(self._detections(r, frame))
+        return detections
 
-            for box, conf in zip(bboxes.xyxy.numpy(), bboxes.conf.numpy()):
-                if conf < self.min_confidence:
-                    continue
-                xmin, ymin, xmax, ymax = np.rint(box).astype(int)
+    def run_batch(self, frames: list[npt.NDArray[np.uint8]]) -> list[list[Detection]]:
+        """
+        Detects in several frames with one model call, e.g. the pending frames of several streams. The frames can
+        differ in size. The inference size is imgsz, the resolution selector is not used: it follows the tracks of
+        one stream.
+        """
+        if not frames:
+            return []
+        kwargs = {} if self.imgsz is None else {"imgsz": self.imgsz}
+        results = self.model(list(frames), verbose=False, device=self.device, **kwargs)
+        return [self._detections(r, frame) for r, frame in zip(results, frames)]
 
-                detections.append(Detection(bbox_xyxy=box,
-                                            data=frame[ymin:ymax, xmin:xmax, :],
-                                            confidence=conf))
-        return detections
+    def _detections(self, result, frame: npt.NDArray[np.uint8]) -> list[Detection]:
+        height, width = frame.shape[:2]
+        bboxes = result.boxes.cpu()
+        batch = DetectionBatch(bboxes_xyxy=bboxes.xyxy.numpy(), confidences=bboxes.conf.numpy())
+        batch = batch[batch.confidences >= self.min_confidence].clip(width, height)
+        return batch.to_detections(frame)
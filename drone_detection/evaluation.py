@@ -0,0 +1,386 @@
+"""
+Detector evaluation over an image set annotated in PASCAL VOC XML (the format of the training data before
+scripts/prepare_data.py converts it): mAP@0.5 and mAP@0.5:0.95 and recall at the operating confidence, overall
+and per object size bucket, for several detector variants (detector configs: weights, backends, inference sizes,
+motion gating) in one pass.
+
+Each image is decoded once and run through every variant's detector in batches. Predictions are cached per
+variant, keyed by the hash of the weights and the detector config, so re-evaluating after a change to the metrics
+or the image set only runs the images not seen before.
+
+python drone_detection/evaluation.py evaluation.images=<images_dir> evaluation.annotations=<xml_dir>
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import dataclasses
+import hashlib
+import json
+import math
+import pathlib
+import xml.etree.ElementTree as ET
+from typing import Any, Iterator
+
+import hydra
+import numpy as np
+from loguru import logger
+from numpy import typing as npt
+from omegaconf import DictConfig, OmegaConf
+
+from drone_detection import detectors
+from drone_detection.detectors import DetectionBatch
+from drone_detection.grabbers.image_grabber import read_image
+from drone_detection.utils import iou_matrix, box_areas
+
+PACKAGE_ROOT = pathlib.Path(__file__).resolve().parents[1]
+WEIGHTS_DIR = PACKAGE_ROOT / "data/weights"
+
+# mAP@0.5:0.95 IoU thresholds, as COCO
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+# COCO's 101 recall points of the interpolated precision
+RECALL_POINTS = np.linspace(0, 1, 101)
+# object size buckets by the square root of the box area in pixels
+SIZE_BUCKETS: dict[str, tuple[float, float]] = {"tiny": (0, 16), "small": (16, 32), "medium": (32, 96),
+                                                 "large": (96, math.inf)}
+
+
+@dataclasses.dataclass()
+class GroundTruth:
+    image: pathlib.Path
+    bboxes_xyxy: npt.NDArray[np.float64]
+
+
+@dataclasses.dataclass()
+class Predictions:
+    """The boxes and confidences a variant predicted for one image."""
+    bboxes_xyxy: npt.NDArray[np.float64]
+    confidences: npt.NDArray[np.float64]
+
+
+def load_voc_annotations(annotations_dir: str | pathlib.Path, images_dir: str | pathlib.Path,
+                         classes: list[str] | None = None) -> list[GroundTruth]:
+    """
+    Reads the VOC XML annotations of an image set.
+
+    Args:
+        annotations_dir: The directory of XML files.
+        images_dir: The directory of the images the XML files name.
+        classes: The object names to evaluate, None for every object.
+
+    Returns:
+        One GroundTruth per annotation whose image exists, sorted by image name.
+    """
+    images_dir = pathlib.Path(images_dir)
+    ground_truth = []
+    for xml_path in sorted(pathlib.Path(annotations_dir).glob("*.xml")):
+        try:
+            root = ET.parse(xml_path).getroot()
+        except ET.ParseError:
+            logger.warning(f"Skipping annotation that could not be parsed: {xml_path}")
+            continue
+        image = images_dir / (root.findtext("filename") or "")
+        if not image.is_file():
+            logger.warning(f"Skipping annotation without its image: {xml_path}")
+            continue
+        boxes = []
+        for obj in root.findall("object"):
+            bndbox = obj.find("bndbox")
+            if bndbox is None or classes is not None and obj.findtext("name") not in classes:
+                continue
+            box = [float(bndbox.findtext(k, "0")) for k in ("xmin", "ymin", "xmax", "ymax")]
+            if box[2] > box[0] and box[3] > box[1]:
+                boxes.append(box)
+        ground_truth.append(GroundTruth(image=image, bboxes_xyxy=np.array(boxes, dtype=float).reshape(-1, 4)))
+    return ground_truth
+
+
+def match_detections(bboxes_xyxy: npt.ArrayLike, confidences: npt.ArrayLike, gt_bboxes_xyxy: npt.ArrayLike,
+                     iou_thresholds: npt.ArrayLike = IOU_THRESHOLDS,
+                     gt_ignore: npt.ArrayLike | None = None) -> tuple[npt.NDArray[np.bool_], npt.NDArray[np.bool_]]:
+    """
+    Matches the detections of one image to its ground truth at every IoU threshold at once.
+
+    Detections are matched greedily in order of confidence to the unmatched ground truth box of highest IoU, as
+    COCO does. Ignored ground truth boxes (e.g. outside the size bucket evaluated) are only matched when no other
+    box is left, and the detections matched to them are ignored rather than counted.
+
+    Args:
+        bboxes_xyxy: An (N, 4) array of detected boxes.
+        confidences: The N detection confidences.
+        gt_bboxes_xyxy: An (M, 4) array of ground truth boxes.
+        iou_thresholds: The T IoU thresholds.
+        gt_ignore: An optional (M,) boolean mask of ground truth boxes to ignore.
+
+    Returns:
+        (N, T) boolean arrays of whether each detection is a true positive and whether it is ignored, in the
+        order of the detections given.
+    """
+    iou_thresholds = np.asarray(iou_thresholds, dtype=float)
+    n, t = len(confidences), len(iou_thresholds)
+    matched = np.zeros((n, t), dtype=bool)
+    ignored = np.zeros((n, t), dtype=bool)
+    gt_ignore = np.zeros(len(gt_bboxes_xyxy), dtype=bool) if gt_ignore is None else np.asarray(gt_ignore, bool)
+    if n == 0 or len(gt_ignore) == 0:
+        return matched, ignored
+
+    iou = iou_matrix(bboxes_xyxy, gt_bboxes_xyxy)
+    available = np.ones((t, len(gt_ignore)), dtype=bool)
+    # ignored boxes rank below every counted box, so they are only chosen when no counted box matches
+    rank_penalty = np.where(gt_ignore, 2.0, 0.0)
+    for i in np.argsort(-np.asarray(confidences), kind="stable"):
+        candidates = available & (iou[i] >= iou_thresholds[:, None])
+        cost = np.where(candidates, rank_penalty - iou[i], np.inf)
+        best = np.argmin(cost, axis=1)
+        hit = np.isfinite(cost[np.arange(t), best])
+        available[hit, best[hit]] = False
+        matched[i] = hit & ~gt_ignore[best]
+        ignored[i] = hit & gt_ignore[best]
+    return matched, ignored
+
+
+def average_precision(true_positives: npt.NDArray[np.bool_], confidences: npt.NDArray[np.float64], gt_count: int,
+                      ignored: npt.NDArray[np.bool_] | None = None) -> npt.NDArray[np.float64]:
+    """
+    The COCO 101 point interpolated average precision at each IoU threshold.
+
+    Args:
+        true_positives: An (N, T) boolean array, whether each detection of the whole set is a true positive.
+        confidences: The N detection confidences.
+        gt_count: The number of ground truth boxes.
+        ignored: An optional (N, T) boolean array of detections counted neither as true nor false positives.
+
+    Returns:
+        The T average precisions, NaN if there is no ground truth.
+    """
+    if gt_count == 0:
+        return np.full(true_positives.shape[1], np.nan)
+    if len(confidences) == 0:
+        return np.zeros(true_positives.shape[1])
+    counted = np.ones_like(true_positives) if ignored is None else ~ignored
+    order = np.argsort(-confidences, kind="stable")
+    tp = np.cumsum(true_positives[order] & counted[order], axis=0)
+    fp = np.cumsum(~true_positives[order] & counted[order], axis=0)
+    recall = tp / gt_count
+    precision = tp / np.maximum(tp + fp, 1)
+    # the precision envelope: the best precision at this recall or higher
+    precision = np.maximum.accumulate(precision[::-1], axis=0)[::-1]
+    ap = np.empty(true_positives.shape[1])
+    for j in range(true_positives.shape[1]):
+        k = np.searchsorted(recall[:, j], RECALL_POINTS, side="left")
+        ap[j] = np.where(k < len(recall), precision[np.minimum(k, len(recall) - 1), j], 0).mean()
+    return ap
+
+
+def box_sizes(bboxes_xyxy: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """The square root of the box areas, the object size buckets are defined on."""
+    return np.sqrt(box_areas(np.asarray(bboxes_xyxy, dtype=float).reshape(-1, 4)))
+
+
+def evaluate(ground_truth: list[GroundTruth], predictions: list[Predictions],
+             size_buckets: dict[str, tuple[float, float]] | None = None,
+             min_confidence: float = 0.5) -> dict[str, dict[str, float]]:
+    """
+    Computes the metrics of one variant.
+
+    Args:
+        ground_truth: The ground truth of each image.
+        predictions: The predictions for each image, in the same order.
+        size_buckets: The object size buckets, name -> [min, max) of the square root of the area in pixels.
+        min_confidence: The operating confidence the recall is reported at.
+
+    Returns:
+        For "all" and each size bucket: map50, map50_95, recall (at min_confidence), precision (at
+        min_confidence) and the number of ground truth boxes.
+    """
+    buckets = {"all": (0, math.inf), **(SIZE_BUCKETS if size_buckets is None else size_buckets)}
+    results = {}
+    for name, (low, high) in buckets.items():
+        tps, ignores, confidences, gt_count = [], [], [], 0
+        for gt, pred in zip(ground_truth, predictions):
+            gt_sizes = box_sizes(gt.bboxes_xyxy)
+            gt_ignore = (gt_sizes < low) | (gt_sizes >= high)
+            matched, ignored = match_detections(pred.bboxes_xyxy, pred.confidences, gt.bboxes_xyxy,
+                                                gt_ignore=gt_ignore)
+            # unmatched detections outside the bucket are not false positives of this bucket
+            sizes = box_sizes(pred.bboxes_xyxy)
+            ignored |= ~matched & ((sizes < low) | (sizes >= high))[:, None]
+            tps.append(matched)
+            ignores.append(ignored)
+            confidences.append(pred.confidences)
+            gt_count += int((~gt_ignore).sum())
+        tp = np.concatenate(tps) if tps else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool)
+        ignored = np.concatenate(ignores) if ignores else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool)
+        confidence = np.concatenate(confidences) if confidences else np.zeros(0)
+        ap = average_precision(tp, confidence, gt_count, ignored=ignored)
+        operating = (confidence >= min_confidence) & ~ignored[:, 0]
+        results[name] = {"map50": float(ap[0]),
+                         "map50_95": float(ap.mean()),
+                         "recall": float(tp[operating, 0].sum() / gt_count) if gt_count else math.nan,
+                         "precision": float(tp[operating, 0].mean()) if operating.any() else math.nan,
+                         "objects": gt_count}
+    return results
+
+
+@dataclasses.dataclass()
+class Variant:
+    """
+    A detector configuration to evaluate: a detector config section (type and parameters, as the pipeline's
+    `detector`), so the variant is run with the pipeline's post-processing, e.g. a YOLO detector's confidence
+    filtering and box clipping, or a motion gated detector.
+    """
+    name: str
+    detector: dict[str, Any]
+    min_confidence: float = 0.5
+
+    @property
+    def weights(self) -> list[pathlib.Path]:
+        """The weights files of the detector and of any detector it wraps."""
+        return [path if path.is_absolute() else WEIGHTS_DIR / path
+                for path in map(pathlib.Path, _model_paths(self.detector))]
+
+    def cache_key(self) -> str:
+        """The hash of the weights and the detector config the predictions depend on."""
+        digest = hashlib.sha256()
+        for weights in self.weights:
+            with open(weights, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        digest.update(json.dumps(self.detector, sort_keys=True).encode())
+        return digest.hexdigest()[:16]
+
+
+def _model_paths(cfg: Any) -> list[str]:
+    """The model_path entries of a detector config, nested ones included."""
+    if isinstance(cfg, dict):
+        paths = [str(cfg["model_path"])] if "model_path" in cfg else []
+        return paths + [path for key, value in cfg.items() if key != "model_path" for path in _model_paths(value)]
+    if isinstance(cfg, list):
+        return [path for value in cfg for path in _model_paths(value)]
+    return []
+
+
+class PredictionCache:
+    """
+    The predictions of one variant, stored as one .npz file per cache key: the boxes and confidences of all the
+    images concatenated, with per image offsets.
+    """
+
+    def __init__(self, path: pathlib.Path | None = None) -> None:
+        """
+        Args:
+            path: The cache file, None for an in-memory cache that is not saved.
+        """
+        self.path = path
+        self.predictions: dict[str, Predictions] = {}
+        if path is not None and path.exists():
+            data = np.load(path)
+            offsets = data["offsets"]
+            for i, image in enumerate(data["images"].tolist()):
+                s = slice(offsets[i], offsets[i + 1])
+                self.predictions[image] = Predictions(data["bboxes_xyxy"][s], data["confidences"][s])
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        images = list(self.predictions)
+        values = [self.predictions[image] for image in images]
+        np.savez(self.path,
+                 images=np.array(images, dtype=str),
+                 offsets=np.cumsum([0] + [len(p.confidences) for p in values]),
+                 bboxes_xyxy=np.concatenate([p.bboxes_xyxy for p in values]).reshape(-1, 4) if values
+                 else np.zeros((0, 4)),
+                 confidences=np.concatenate([p.confidences for p in values]) if values else np.zeros(0))
+
+
+def _batches(paths: list[pathlib.Path], batch_size: int, workers: int) -> Iterator[list[tuple[pathlib.Path, Any]]]:
+    """Decodes the images on a thread pool, yielding them in batches in order."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        decoded = pool.map(read_image, paths)
+        batch = []
+        for path, image in zip(paths, decoded):
+            if image is None:
+                logger.warning(f"Skipping image that could not be decoded: {path}")
+                continue
+            batch.append((path, image))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def predict(variants: list[Variant], images: list[pathlib.Path], cache_dir: pathlib.Path | None = None,
+            batch_size: int = 16, workers: int = 4) -> dict[str, dict[str, Predictions]]:
+    """
+    Runs every variant over the images, decoding each image once. Images already in a variant's cache are not
+    run again.
+
+    Args:
+        variants: The detector variants.
+        images: The image files.
+        cache_dir: The prediction cache directory, None to disable caching.
+        batch_size: Images per detector run_batch call.
+        workers: Image decoding threads.
+
+    Returns:
+        Variant name -> image path -> predictions.
+    """
+    caches = {v.name: PredictionCache(cache_dir / f"{v.cache_key()}.npz" if cache_dir else None)
+              for v in variants}
+    todo = [image for image in images if any(str(image) not in caches[v.name].predictions for v in variants)]
+    logger.info(f"{len(images)} images, {len(todo)} with predictions to compute")
+
+    runners = {v.name: detectors.create(OmegaConf.create(v.detector)) for v in variants
+               if any(str(i) not in caches[v.name].predictions for i in todo)}
+    for batch in _batches(todo, batch_size, workers):
+        for v in variants:
+            missing = [(path, image) for path, image in batch if str(path) not in caches[v.name].predictions]
+            if not missing:
+                continue
+            results = runners[v.name].run_batch([image for _, image in missing])
+            for (path, _), detections in zip(missing, results):
+                found = DetectionBatch.from_detections(detections)
+                caches[v.name].predictions[str(path)] = Predictions(found.bboxes_xyxy, found.confidences)
+    if todo:
+        for cache in caches.values():
+            cache.save()
+    return {name: {str(image): cache.predictions[str(image)] for image in images
+                   if str(image) in cache.predictions} for name, cache in caches.items()}
+
+
+def format_report(results: dict[str, dict[str, dict[str, float]]]) -> str:
+    """A table of the metrics of each variant and size bucket."""
+    lines = [f"{'variant':>20} {'size':>8} {'objects':>8} {'mAP50':>7} {'mAP50-95':>9} {'recall':>7} {'prec':>7}"]
+    for name, buckets in results.items():
+        for bucket, m in buckets.items():
+            lines.append(f"{name:>20} {bucket:>8} {m['objects']:>8} {m['map50']:>7.3f} {m['map50_95']:>9.3f} "
+                         f"{m['recall']:>7.3f} {m['precision']:>7.3f}")
+    return "\n".join(lines)
+
+
+@hydra.main(version_base=None, config_path="../config", config_name="config")
+def main(cfg: DictConfig):
+    evaluation = cfg.evaluation
+    ground_truth = load_voc_annotations(evaluation.annotations, evaluation.images, evaluation.get("classes"))
+    variants = [Variant(**v) for v in OmegaConf.to_container(evaluation.variants, resolve=True)]
+    cache_dir = pathlib.Path(evaluation.cache_dir) if evaluation.get("cache_dir") else None
+    predictions = predict(variants, [gt.image for gt in ground_truth], cache_dir=cache_dir,
+                          batch_size=evaluation.get("batch_size", 16), workers=evaluation.get("workers", 4))
+
+    size_buckets = {name: (low, math.inf if high is None else high)
+                    for name, (low, high) in evaluation.get("size_buckets", {}).items()} or None
+    results = {}
+    for v in variants:
+        evaluated = [gt for gt in ground_truth if str(gt.image) in predictions[v.name]]
+        results[v.name] = evaluate(evaluated, [predictions[v.name][str(gt.image)] for gt in evaluated],
+                                   size_buckets=size_buckets, min_confidence=v.min_confidence)
+    print(format_report(results))
+    if evaluation.get("output"):
+        with open(evaluation.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Wrote {evaluation.output}")
+
+
+if __name__ == "__main__":
+    main()
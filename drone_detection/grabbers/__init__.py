@@ -7,10 +7,13 @@ from numpy import typing as npt
 from omegaconf import DictConfig
 from loguru import logger
 from .video_writer import *
+from .display import *
+from ..utils import EntryPoint, lazy_getattr
 
 class GrabberType(enum.Enum):
     VIDEO = "VIDEO"
     CAMERA = "CAMERA"
+    IMAGES = "IMAGES"
 
 
 class BaseGrabber(ABC):
@@ -24,12 +27,13 @@ class BaseGrabber(ABC):
         ...
 
 
-from .file_grabber import VideoGrabber
-
-GRABBER_FACTORY: dict[GrabberType, Any] = {
-    GrabberType.VIDEO: VideoGrabber
+GRABBER_FACTORY: dict[GrabberType, EntryPoint] = {
+    GrabberType.VIDEO: EntryPoint(".file_grabber", "VideoGrabber", __name__),
+    GrabberType.IMAGES: EntryPoint(".image_grabber", "ImageGrabber", __name__),
 }
 
+__getattr__ = lazy_getattr(__name__, {entry_point.name: entry_point for entry_point in GRABBER_FACTORY.values()})
+
 def create(cfg: DictConfig) -> Iterable[npt.NDArray[np.uint8]]:
     """
      Creates a grabber based on the provided configuration.
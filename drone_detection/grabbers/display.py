@@ -0,0 +1,150 @@
+import threading
+
+import cv2
+import numpy as np
+from numpy import typing as npt
+
+__all__ = ["Display"]
+
+
+class Display:
+    """
+    Shows the annotated frames in a window from its own thread, so the processing loop never waits on drawing
+    the window or on polling the keyboard.
+
+    show() only hands over a reference to the frame: the display thread picks up the latest one, downscales it to
+    fit the preview size and shows it, and frames handed over in the meantime are dropped. Keys are handled on the
+    display thread: q requests a quit, p pauses, and while paused any other key steps one frame.
+    wait_if_paused() is where the processing loop blocks while paused.
+
+    All HighGUI calls are made from the display thread. Where windows must belong to the main thread (macOS)
+    threaded=False shows each frame from the calling thread instead, as main.py used to.
+    """
+
+    def __init__(self,
+                 enabled: bool = True,
+                 window_name: str = "image",
+                 max_width: int | None = 1280,
+                 max_height: int | None = 720,
+                 poll_ms: int = 10,
+                 threaded: bool = True,
+                 **kwargs) -> None:
+        """
+        Args:
+            enabled: Show a window, False to run without one.
+            window_name: The window title.
+            max_width: Frames are downscaled to fit max_width x max_height, None for no limit.
+            max_height: See max_width.
+            poll_ms: Milliseconds the display thread waits for a key between frames.
+            threaded: Show frames from a separate thread, False to show them from the thread that calls show().
+            **kwargs: Additional keyword arguments.
+        """
+        self.enabled = enabled
+        self.window_name = window_name
+        self.max_width = max_width
+        self.max_height = max_height
+        self.poll_ms = max(1, poll_ms)
+        self.threaded = threaded
+
+        self.quit_requested = False
+        self.shown = 0
+        self.dropped = 0
+
+        self._frame: npt.NDArray[np.uint8] | None = None
+        self._paused = False
+        self._steps = 0
+        self._sizes: dict[tuple[int, int], tuple[int, int] | None] = {}
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def paused(self) -> bool:
+        """Whether p has paused processing."""
+        return self._paused
+
+    def start(self) -> "Display":
+        if self.enabled and self.threaded:
+            self._thread = threading.Thread(target=self._run, name="display", daemon=True)
+            self._thread.start()
+        return self
+
+    def show(self, image: npt.NDArray[np.uint8]) -> None:
+        """Hands a frame to the display, without copying it, so it must not be modified afterwards."""
+        if not self.enabled:
+            return
+        if not self.threaded:
+            self._present(image)
+            self._handle_key(cv2.waitKey(1))
+            return
+        with self._condition:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = image
+
+    def wait_if_paused(self) -> None:
+        """Blocks while paused, until a key steps one frame, p resumes or q quits."""
+        if not self.threaded:
+            while self.enabled and self._paused and not self._steps and not self.quit_requested:
+                self._handle_key(cv2.waitKey(0))
+        with self._condition:
+            self._condition.wait_for(lambda: not self._paused or self._steps or self.quit_requested or
+                                     self._stop.is_set())
+            if self._paused and self._steps:
+                self._steps -= 1
+
+    def _preview_size(self, height: int, width: int) -> tuple[int, int] | None:
+        """The (width, height) a frame is shown at, None if it fits already."""
+        size = self._sizes.get((height, width), ())
+        if size == ():
+            scale = min(self.max_width / width if self.max_width else 1.0,
+                        self.max_height / height if self.max_height else 1.0)
+            size = self._sizes[(height, width)] = \
+                (max(1, round(width * scale)), max(1, round(height * scale))) if scale < 1.0 else None
+        return size
+
+    def _present(self, image: npt.NDArray[np.uint8]) -> None:
+        size = self._preview_size(*image.shape[:2])
+        if size is not None:
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        cv2.imshow(self.window_name, image)
+        self.shown += 1
+
+    def _handle_key(self, key: int) -> None:
+        key &= 0xFF
+        if key == 0xFF:  # no key
+            return
+        with self._condition:
+            if key == ord("q"):
+                self.quit_requested = True
+            elif key == ord("p"):
+                self._paused = not self._paused
+                self._steps = 0
+            elif self._paused:
+                self._steps += 1
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._condition:
+                image, self._frame = self._frame, None
+            if image is not None:
+                self._present(image)
+            # also keeps the window responsive between frames
+            self._handle_key(cv2.waitKey(self.poll_ms))
+        cv2.destroyAllWindows()
+
+    def stats(self) -> dict[str, int]:
+        """Frames shown, and frames dropped because a newer one arrived before the display was ready."""
+        return {"shown": self.shown, "dropped": self.dropped}
+
+    def stop(self) -> None:
+        """Closes the window, releasing a processing loop waiting in wait_if_paused."""
+        with self._condition:
+            self._stop.set()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        elif self.enabled and self.shown:
+            cv2.destroyAllWindows()
@@ -14,22 +14,46 @@ PACKAGE_ROOT = pathlib.Path(__file__).resolve().parents[2]
 # DEFAULT_PATH = package_root / "data/videos"
 
 
+BACKENDS = ("opencv", "pyav")
+
+
 class VideoGrabber(BaseGrabber):
     """
     A grabber that reads frames from a video file or a list of video files.
+
+    Frames are decoded by cv2.VideoCapture, or with the "pyav" backend by FFmpeg through PyAV, which decodes
+    with multiple threads, scales in the decoder and seeks to exact frames using a frame index cached beside
+    each video.
     """
 
-    def __init__(self, video_path: str | list[str], video_root_dir: str, **kwargs) -> None:
+    def __init__(self, video_path: str | list[str], video_root_dir: str,
+                 backend: str = "opencv",
+                 decoder_threads: int = 0,
+                 width: int | None = None,
+                 height: int | None = None,
+                 **kwargs) -> None:
         """
            Initializes the VideoGrabber with the given video path(s).
 
            Args:
                video_path: A string or a list of strings representing the path(s) to the video file(s).
                            If a directory is provided, all .mp4 files in that directory will be used.
+               backend: "opencv" or "pyav" (requires the av package).
+               decoder_threads: pyav decoder threads, 0 to let FFmpeg choose.
+               width: Output frame width, None for the video width. With only one of width and height the
+                      aspect ratio is kept.
+               height: Output frame height, None for the video height.
                **kwargs: Additional keyword arguments.
            """
-
-        if not pathlib.Path(video_root_dir).is_absolute():
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown video backend {backend}, expected one of {BACKENDS}")
+        self.backend = backend
+        self.decoder_threads = decoder_threads
+        self.width = width
+        self.height = height
+
+        video_root_dir = pathlib.Path(video_root_dir)
+        if not video_root_dir.is_absolute():
             video_root_dir = PACKAGE_ROOT / video_root_dir
 
         paths = video_path
@@ -71,13 +95,44 @@ class VideoGrabber(BaseGrabber):
            FileNotFoundError: If a video file is not found.
        """
         if self.cap is None:
-            if self.index >= len(self.paths):
-                raise StopIteration
-            if not pathlib.Path(self.paths[self.index]).exists():
-                raise FileNotFoundError(f"Video file not found: {self.paths[self.index]}")
-            self.cap = cv2.VideoCapture(str(self.paths[self.index]))
-            logger.info(f"Loaded: {self.paths[self.index]}")
-        return self.cap.read()
+            self._open_current()
+        ret, frame = self.cap.read()
+        if ret and self.backend == "opencv" and (self.width or self.height):
+            frame = cv2.resize(frame, self._output_size(frame.shape), interpolation=cv2.INTER_AREA)
+        return ret, frame
+
+    def _open_current(self) -> None:
+        if self.index >= len(self.paths):
+            raise StopIteration
+        path = self.paths[self.index]
+        if not pathlib.Path(path).exists():
+            raise FileNotFoundError(f"Video file not found: {path}")
+        if self.backend == "pyav":
+            from .pyav_decoder import PyAVDecoder
+            self.cap = PyAVDecoder(path, threads=self.decoder_threads, width=self.width, height=self.height)
+        else:
+            self.cap = cv2.VideoCapture(str(path))
+        logger.info(f"Loaded: {path}")
+
+    def _output_size(self, shape: tuple[int, ...]) -> tuple[int, int]:
+        height, width = shape[:2]
+        if self.width and self.height:
+            return self.width, self.height
+        if self.width:
+            return self.width, round(height * self.width / width)
+        return round(width * self.height / height), self.height
+
+    def seek(self, frame: int) -> None:
+        """
+        Positions the current video so the next frame returned is the given frame. Exact with the pyav
+        backend, OpenCV's seeking may land on a nearby frame for some codecs.
+        """
+        if self.cap is None:
+            self._open_current()
+        if self.backend == "pyav":
+            self.cap.seek(frame)
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
 
     def __next__(self) -> npt.NDArray[np.uint8]:
         """
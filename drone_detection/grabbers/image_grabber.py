@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import mmap
+import pathlib
+import re
+from typing import Iterator
+
+import cv2
+import numpy as np
+from loguru import logger
+from numpy import typing as npt
+from omegaconf import ListConfig
+
+from . import BaseGrabber
+
+__all__ = ["ImageGrabber", "read_image"]
+
+PACKAGE_ROOT = pathlib.Path(__file__).resolve().parents[2]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def _natural_key(path: pathlib.Path) -> list[str | int]:
+    """Sort key that orders frame_2 before frame_10."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", str(path))]
+
+
+def read_image(path: str | pathlib.Path, use_mmap: bool = False) -> npt.NDArray[np.uint8] | None:
+    """
+    Reads and decodes an image file to BGR, None if it cannot be decoded.
+
+    Args:
+        path: The image file.
+        use_mmap: Memory map the file instead of reading it into a buffer.
+    """
+    if use_mmap:
+        with open(path, "rb") as f:
+            if pathlib.Path(path).stat().st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return cv2.imdecode(np.frombuffer(mapped, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+class ImageGrabber(BaseGrabber):
+    """
+    A grabber that reads frames from image files: a directory, a glob pattern or a list of files, in natural
+    sort order.
+
+    Images are read and decoded on a thread pool (cv2.imdecode releases the GIL) with up to `read_ahead` images
+    in flight, and yielded in order. The file of the last frame returned is in `path`, and items() yields
+    (path, frame) pairs. Files that cannot be decoded are logged and skipped.
+    """
+
+    def __init__(self,
+                 image_path: str | list[str],
+                 image_root_dir: str = "data/images",
+                 pattern: str = "*",
+                 workers: int = 4,
+                 read_ahead: int = 16,
+                 use_mmap: bool = False,
+                 **kwargs) -> None:
+        """
+        Args:
+            image_path: A directory, a glob pattern (e.g. "seq01/*.png") or a list of image files. Relative paths
+                        are relative to image_root_dir if they exist there.
+            image_root_dir: The directory relative paths are resolved against. If relative it is to the repo root.
+            pattern: The glob pattern for the images in a directory, e.g. "**/*.jpg" to include subdirectories.
+                     Only files with an image extension are used.
+            workers: Decoding threads, 0 to decode on the calling thread.
+            read_ahead: The number of images decoded ahead of the one being returned.
+            use_mmap: Memory map the files instead of reading them into a buffer.
+            **kwargs: Additional keyword arguments.
+        """
+        root = pathlib.Path(image_root_dir)
+        if not root.is_absolute():
+            root = PACKAGE_ROOT / root
+
+        entries = list(image_path) if isinstance(image_path, (list, tuple, ListConfig)) else [image_path]
+        paths: list[pathlib.Path] = []
+        for entry in entries:
+            entry = pathlib.Path(entry)
+            is_glob = any(c in entry.name for c in "*?[")
+            if not entry.is_absolute():
+                # as with videos, a relative path not found in the root dir is relative to the working directory
+                candidate = root / entry
+                if candidate.exists() or is_glob and any(candidate.parent.glob(entry.name)):
+                    entry = candidate
+            if entry.is_dir():
+                found = [p for p in entry.glob(pattern) if p.suffix.lower() in IMAGE_EXTENSIONS and p.is_file()]
+                paths.extend(sorted(found, key=_natural_key))
+            elif is_glob:
+                paths.extend(sorted((p for p in entry.parent.glob(entry.name) if p.is_file()), key=_natural_key))
+            else:
+                paths.append(entry)
+
+        self.paths = paths
+        self.workers = workers
+        self.read_ahead = max(read_ahead, 1)
+        self.use_mmap = use_mmap
+        self.path: pathlib.Path | None = None
+        self.frames_skipped = 0
+        self._items: Iterator[tuple[pathlib.Path, npt.NDArray[np.uint8]]] | None = None
+        logger.debug(f"Loaded: {len(self.paths)} images")
+
+    def __iter__(self) -> ImageGrabber:
+        return self
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def items(self) -> Iterator[tuple[pathlib.Path, npt.NDArray[np.uint8]]]:
+        """Yields (path, frame) for every image that can be decoded, in order."""
+        if self.workers <= 0:
+            for path in self.paths:
+                frame = self._read(path)
+                if frame is None:
+                    self.frames_skipped += 1
+                else:
+                    yield path, frame
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers,
+                                                   thread_name_prefix="image-grabber") as pool:
+            pending: collections.deque[tuple[pathlib.Path, concurrent.futures.Future]] = collections.deque()
+            paths = iter(self.paths)
+            try:
+                for path in paths:
+                    pending.append((path, pool.submit(self._read, path)))
+                    if len(pending) >= self.read_ahead:
+                        break
+                while pending:
+                    path, future = pending.popleft()
+                    next_path = next(paths, None)
+                    if next_path is not None:
+                        pending.append((next_path, pool.submit(self._read, next_path)))
+                    # counted here rather than in _read, which runs on the worker threads
+                    frame = future.result()
+                    if frame is None:
+                        self.frames_skipped += 1
+                    else:
+                        yield path, frame
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def _read(self, path: pathlib.Path) -> npt.NDArray[np.uint8] | None:
+        try:
+            frame = read_image(path, use_mmap=self.use_mmap)
+            if frame is None:
+                logger.warning(f"Skipping image that could not be decoded: {path}")
+        except OSError as e:
+            logger.warning(f"Skipping image that could not be read: {path}: {e}")
+            frame = None
+        return frame
+
+    def grab(self) -> npt.NDArray[np.uint8]:
+        """
+        Returns the next image.
+
+        Raises:
+            StopIteration: If all the images have been read.
+        """
+        if self._items is None:
+            self._items = self.items()
+        self.path, frame = next(self._items)
+        return frame
+
+    def __next__(self) -> npt.NDArray[np.uint8]:
+        return self.grab()
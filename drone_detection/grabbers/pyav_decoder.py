@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import pathlib
+
+import av
+import numpy as np
+from loguru import logger
+from numpy import typing as npt
+
+__all__ = ["PyAVDecoder", "FrameIndex"]
+
+INDEX_SUFFIX = ".index.npz"
+
+
+class FrameIndex:
+    """
+    The presentation timestamp of every frame of a video stream and which frames are keyframes, in display order.
+
+    Built by demuxing the stream without decoding it, and cached beside the video as <video>.index.npz. The cache
+    is rebuilt when the video's size or modification time changes.
+    """
+
+    def __init__(self, pts: npt.NDArray[np.int64], keyframes: npt.NDArray[np.bool_]) -> None:
+        self.pts = pts
+        self.keyframes = keyframes
+
+    def __len__(self) -> int:
+        return len(self.pts)
+
+    @property
+    def keyframe_indices(self) -> npt.NDArray[np.int64]:
+        return np.flatnonzero(self.keyframes)
+
+    def keyframe_before(self, frame: int) -> int:
+        """The index of the last keyframe at or before a frame."""
+        keyframes = self.keyframe_indices
+        return int(keyframes[max(np.searchsorted(keyframes, frame, side="right") - 1, 0)])
+
+    @classmethod
+    def build(cls, container: av.container.InputContainer, stream: av.video.stream.VideoStream) -> FrameIndex:
+        pts, keyframes = [], []
+        for packet in container.demux(stream):
+            # the flushing packet at the end of the stream has no timestamp
+            if packet.pts is None:
+                continue
+            pts.append(packet.pts)
+            keyframes.append(packet.is_keyframe)
+        order = np.argsort(pts, kind="stable")
+        return cls(pts=np.array(pts, dtype=np.int64)[order], keyframes=np.array(keyframes, dtype=bool)[order])
+
+    @classmethod
+    def load_or_build(cls, path: pathlib.Path, container: av.container.InputContainer,
+                      stream: av.video.stream.VideoStream, cache: bool = True) -> FrameIndex:
+        """
+        Loads the cached index of a video, or builds it and writes the cache.
+
+        Args:
+            path: The video file.
+            container: The opened video. It is rewound to the start after building the index.
+            stream: The video stream to index.
+            cache: Read and write the cache file.
+        """
+        cache_path = path.with_name(path.name + INDEX_SUFFIX)
+        stat = path.stat()
+        signature = np.array([stat.st_size, stat.st_mtime_ns, stream.index], dtype=np.int64)
+
+        if cache and cache_path.exists():
+            try:
+                with np.load(cache_path) as data:
+                    if np.array_equal(data["signature"], signature):
+                        return cls(pts=data["pts"], keyframes=data["keyframes"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable frame index {cache_path}: {e}")
+
+        index = cls.build(container, stream)
+        container.seek(0, stream=stream)
+        if cache:
+            try:
+                np.savez(cache_path, pts=index.pts, keyframes=index.keyframes, signature=signature)
+            except OSError as e:
+                logger.warning(f"Could not write frame index {cache_path}: {e}")
+        logger.debug(f"Indexed {path}: {len(index)} frames, {int(index.keyframes.sum())} keyframes")
+        return index
+
+
+class PyAVDecoder:
+    """
+    Decodes a video with FFmpeg through PyAV, as a drop in replacement for cv2.VideoCapture in VideoGrabber.
+
+    Decoding uses FFmpeg's frame and slice threading, and frames are converted to BGR (and optionally scaled) by
+    swscale in the same step. Seeking is exact: it jumps to the keyframe before the requested frame using the
+    frame index and decodes forward to it.
+    """
+
+    def __init__(self,
+                 path: str | pathlib.Path,
+                 threads: int = 0,
+                 width: int | None = None,
+                 height: int | None = None,
+                 index_cache: bool = True) -> None:
+        """
+        Args:
+            path: The video file.
+            threads: Decoder threads, 0 to let FFmpeg choose.
+            width: Output frame width, None for the video width (or to keep the aspect ratio with height).
+            height: Output frame height, None for the video height (or to keep the aspect ratio with width).
+            index_cache: Cache the frame index beside the video.
+        """
+        self.path = pathlib.Path(path)
+        self.container = av.open(str(self.path))
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        self.stream.codec_context.thread_count = threads
+
+        src_width, src_height = self.stream.codec_context.width, self.stream.codec_context.height
+        if width is not None and height is None:
+            height = round(src_height * width / src_width)
+        elif height is not None and width is None:
+            width = round(src_width * height / src_height)
+        self.width = width or src_width
+        self.height = height or src_height
+
+        self.index = FrameIndex.load_or_build(self.path, self.container, self.stream, cache=index_cache)
+        self._frames = self.container.decode(self.stream)
+        self._next_frame = 0
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.index)
+
+    @property
+    def fps(self) -> float:
+        return float(self.stream.average_rate or 0)
+
+    @property
+    def position(self) -> int:
+        """The index of the frame the next read returns."""
+        return self._next_frame
+
+    def _to_ndarray(self, frame: av.VideoFrame) -> npt.NDArray[np.uint8]:
+        return frame.to_ndarray(format="bgr24", width=self.width, height=self.height)
+
+    def read(self) -> tuple[bool, npt.NDArray[np.uint8] | None]:
+        """Decodes the next frame, like cv2.VideoCapture.read."""
+        frame = next(self._frames, None)
+        if frame is None:
+            return False, None
+        self._next_frame += 1
+        return True, self._to_ndarray(frame)
+
+    def seek(self, frame: int) -> None:
+        """Positions the decoder so the next read returns the given frame."""
+        if not 0 <= frame < len(self.index):
+            raise IndexError(f"Frame {frame} is out of range, the video has {len(self.index)} frames")
+        target = self.index.pts[frame]
+        self.container.seek(int(self.index.pts[self.index.keyframe_before(frame)]), stream=self.stream,
+                            backward=True, any_frame=False)
+        frames = self.container.decode(self.stream)
+        for decoded in frames:
+            if decoded.pts is not None and decoded.pts >= target:
+                break
+        else:
+            decoded = None
+
+        # the frame reached while seeking is returned by the next read
+        def resume():
+            if decoded is not None:
+                yield decoded
+            yield from frames
+
+        self._frames = resume()
+        self._next_frame = frame
+
+    def release(self) -> None:
+        self.container.close()
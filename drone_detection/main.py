@@ -1,9 +1,14 @@
-import cv2
+import time
+
 import hydra
+from loguru import logger
 from omegaconf import DictConfig
 
 from drone_detection import grabbers, detectors, trackers, classifiers
-from drone_detection.utils import draw_track, draw_classification, draw_threat_scores
+from drone_detection.classifiers import ClassificationCadence
+from drone_detection.trackers.track_manager import TrackEvent
+from drone_detection.utils import OverlayRenderer, Runtime, RealtimeController, ComputeScheduler, METRICS, \
+    MetricsExporter, COUNT_BUCKETS, Profiler
 
 
 
@@ -15,58 +20,143 @@ def main(cfg: DictConfig):
     tracker = trackers.create(cfg.tracker)
     behaviour_classifier, threat_score_calculator = classifiers.create(cfg.classifier)
 
+    # thread counts and core affinity, after the components have imported their backends
+    runtime = Runtime(**cfg.get("runtime", {}))
+    runtime.apply()
+
+    # degrades quality when a frame takes longer than the frame interval, disabled by default
+    realtime = RealtimeController(**cfg.get("realtime", {"enabled": False}))
+    configured_imgsz = {c: c.imgsz for c in (detector, tracker) if hasattr(c, "imgsz")}
+
+    # allocates optional per-track work (ReID, high resolution, classification) to the highest threat tracks
+    scheduler = ComputeScheduler(**cfg.get("scheduler", {"enabled": False}))
+    if scheduler.enabled:
+        tracker.scheduler = scheduler
+
     min_track_length = cfg.classifier.min_track_length
+    cadence = ClassificationCadence(**cfg.classifier.get("cadence", {}))
+
+    # per stage metrics, optionally served on a local /metrics endpoint and dumped to a file
+    metrics_cfg = cfg.get("metrics", {"enabled": False})
+    METRICS.enabled = metrics_cfg.get("enabled", True)
+    exporter = MetricsExporter(METRICS, **metrics_cfg).start() if METRICS.enabled else None
+    stage_seconds = {stage: METRICS.histogram("stage_seconds", "Time spent in each pipeline stage", stage=stage)
+                     for stage in ("grabber", "detector", "tracker", "classifier", "writer")}
+    frames_total = METRICS.counter("frames", "Frames read from the grabber")
+    dropped_total = METRICS.counter("dropped_frames", "Frames dropped to keep up with real time")
+    detections_per_frame = METRICS.histogram("detections_per_frame", "Detections per detector run",
+                                             buckets=COUNT_BUCKETS)
+    active_tracks = METRICS.gauge("active_tracks", "Tracks seen within the age threshold")
+    track_events = {event: METRICS.counter("track_events", "Track lifecycle events", event=event.value)
+                    for event in TrackEvent}
+    if hasattr(tracker, "manager"):
+        tracker.manager.subscribe(lambda event, track: track_events[event].inc())
+
+    # periodic cProfile and tracemalloc reports per stage, switched on by config or by a signal
+    profiler = Profiler(**cfg.get("profiling", {"enabled": False}))
+
+    # draws boxes, ids, classification bars and threat scores from cached label sprites
+    overlay = OverlayRenderer(**cfg.get("overlay", {}))
+
+    # shows the latest frame, downscaled, from its own thread: q quits, p pauses and then any key steps a frame
+    display = grabbers.Display(**cfg.get("display", {})).start()
 
-    frame_delay = 1  # if set to 1, display will wait for a user input
     write_video = cfg.writer.enabled
     writer = None
 
-    # loop through frames
-    for image in grabber:
-        detections = detector.run(image)
+    tracks = []
 
-        tracks = tracker.update(detections=detections, frame=image)
-        if tracks is None:
+    # loop through frames
+    frames = iter(grabber)
+    while True:
+        profiler.start_frame()
+        with runtime.stage("grabber"), stage_seconds["grabber"].time(), profiler.stage("grabber"):
+            image = next(frames, None)
+        if image is None:
+            break
+        frames_total.inc()
+        if realtime.should_drop():
+            dropped_total.inc()
             continue
-
-        threat_scores: dict[int, float] = {}
-        for track in tracks:
-
-            # is track too old
-            if track.time_since_last_seen > cfg.tracker.age_threshold:
-                continue
-
-            # classify behaviour
-            if len(track) > min_track_length:
-                classifications = behaviour_classifier(state_history=list(track.state_history))
-                threat_score = threat_score_calculator(state=track.state,
-                                                       behavior_probs=classifications)
-                threat_scores[track.track_id] = threat_score
-                image = draw_classification(image,
-                                            classifications=classifications,
-                                            bbox_xyxy=track.bbox_xyxy)
-
-            image = draw_track(image,
-                               bbox_xyxy=track.bbox_xyxy,
-                               track_id=track.track_id,
-                               )
-
-        image = draw_threat_scores(image, scores=threat_scores)
+        realtime.start_frame()
+        scheduler.plan(tracks)
+
+        # on detection stride frames the tracks keep their last state
+        if realtime.should_detect():
+            for component, imgsz in configured_imgsz.items():
+                component.imgsz = realtime.imgsz or imgsz
+
+            with runtime.stage("detector"), stage_seconds["detector"].time(), profiler.stage("detector"):
+                detections = detector.run(image)
+            detections_per_frame.observe(len(detections))
+
+            with runtime.stage("tracker"), stage_seconds["tracker"].time(), profiler.stage("tracker"):
+                tracks = tracker.update(detections=detections, frame=image)
+            if tracks is None:
+                tracks = []
+            detector.observe_tracks([track for track in tracks if scheduler.may_spend(track, "high_res")])
+
+        classifications, threat_scores = {}, {}
+        active, classify_s = 0, 0.0
+        drawn = []
+        with profiler.stage("classifier"):
+            for track in tracks:
+
+                # is track too old
+                if track.time_since_last_seen > cfg.tracker.age_threshold:
+                    continue
+                active += 1
+                drawn.append(track)
+
+                # classify behaviour, the result is cached on the track and only recomputed when out of date.
+                # Low threat tracks keep their cached result when behind real time or deferred by the scheduler
+                if len(track) > min_track_length:
+                    refresh = cadence.should_classify(track)
+                    if refresh and track.classification is not None:
+                        refresh = realtime.should_classify(track.threat_score) and \
+                                  scheduler.may_spend(track, "classification")
+                    t0 = time.perf_counter()
+                    cadence.classify(track, behaviour_classifier, threat_score_calculator, refresh=refresh)
+                    classify_s += time.perf_counter() - t0
+                    classifications[track.track_id] = track.classification
+                    threat_scores[track.track_id] = track.threat_score
+
+        active_tracks.set(active)
+        stage_seconds["classifier"].observe(classify_s)
+
+        if realtime.draw:
+            with profiler.stage("draw"):
+                image = overlay.render(image, drawn, classifications, threat_scores)
+        else:
+            # undrawn frames are downscaled too, the writer is sized from the first frame
+            image = overlay.resize(image)
 
         if write_video:
-            if writer is None:
-                height, width = image.shape[:2]
-                writer = grabbers.VideoWriter(filename=cfg.writer.filename,frame_size=(width, height))
-            writer.add_frame(image)
-
-        cv2.imshow("image", image)
-        key = cv2.waitKey(frame_delay)
-        if key == ord("q"):
+            with stage_seconds["writer"].time(), profiler.stage("writer"):
+                if writer is None:
+                    height, width = image.shape[:2]
+                    writer = grabbers.VideoWriter(filename=cfg.writer.filename,frame_size=(width, height))
+                writer.add_frame(image)
+        realtime.end_frame()
+
+        display.show(image)
+        display.wait_if_paused()
+        if display.quit_requested:
             break
-        if key == ord("p"):
-            frame_delay = 0 if frame_delay == 1 else 1
+    display.stop()
+    if realtime.enabled:
+        logger.info(f"Real-time: {realtime.stats()}")
+    logger.info(f"Classification: {cadence.stats()}")
+    if scheduler.enabled:
+        logger.info(f"Scheduler: {scheduler.stats()}")
+    if display.enabled:
+        logger.info(f"Display: {display.stats()}")
     if write_video:
         writer.save()
+    if exporter is not None:
+        exporter.stop()
+    if profiler.enabled:
+        profiler.stop()
 
 if __name__ == "__main__":
     main()
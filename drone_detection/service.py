@@ -0,0 +1,466 @@
+"""
+Inference service: other systems submit frames per stream id over TCP and get the tracks and threat scores of each
+frame back. The pending frames of all streams are micro-batched into one detector call, and every stream keeps its
+own tracker, so its track ids and classifications carry on from frame to frame.
+
+python drone_detection/service.py service.port=8765
+
+Each message, in both directions, is a 4-byte big-endian header length, a JSON header and `size` payload bytes.
+A frame request is {"id": <any>, "stream": <stream id>, "encoding": "jpeg" | "png" | "raw", "shape": [h, w, 3]
+(raw only), "size": <payload bytes>} followed by the encoded image, or for raw the BGR pixels. The response has
+the request's id, the stream, the stream's frame number, the tracks (track_id, bbox_xyxy, threat_score,
+classification) and the timing of the request, or an "error". {"id": <any>, "op": "end_stream", "stream": <stream
+id>} drops the tracker of a stream. Requests can be pipelined, responses carry the request id. Frames of one stream
+are processed in the order they arrive.
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextlib
+import dataclasses
+import itertools
+import json
+import signal
+import struct
+import time
+from typing import Any, Callable
+
+import cv2
+import hydra
+import numpy as np
+from loguru import logger
+from numpy import typing as npt
+from omegaconf import DictConfig
+
+from drone_detection import detectors, trackers, classifiers
+from drone_detection.classifiers import ClassificationCadence
+from drone_detection.utils import Runtime, METRICS, MetricsExporter
+
+HEADER_LENGTH = struct.Struct(">I")
+MAX_HEADER_BYTES = 1 << 20
+MAX_PAYLOAD_BYTES = 1 << 28
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def encode_message(header: dict[str, Any], payload: bytes = b"") -> bytes:
+    """A message of the service protocol, the payload size is added to the header."""
+    if payload:
+        header = {**header, "size": len(payload)}
+    data = json.dumps(header).encode()
+    return HEADER_LENGTH.pack(len(data)) + data + payload
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[dict[str, Any], bytes] | None:
+    """The next message, None when the connection is closed between messages."""
+    try:
+        (length,) = HEADER_LENGTH.unpack(await reader.readexactly(HEADER_LENGTH.size))
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    if length > MAX_HEADER_BYTES:
+        raise ValueError(f"Header of {length} bytes is too large")
+    header = json.loads(await reader.readexactly(length))
+    size = int(header.get("size", 0))
+    if size > MAX_PAYLOAD_BYTES:
+        raise ValueError(f"Payload of {size} bytes is too large")
+    return header, await reader.readexactly(size) if size else b""
+
+
+def encode_frame(frame: npt.NDArray[np.uint8], encoding: str = "jpeg", quality: int = 90) -> tuple[dict, bytes]:
+    """The header fields and payload of a frame request."""
+    if encoding == "raw":
+        return {"encoding": "raw", "shape": list(frame.shape)}, np.ascontiguousarray(frame).tobytes()
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if encoding == "jpeg" else []
+    ok, data = cv2.imencode(f".{encoding}", frame, params)
+    if not ok:
+        raise ValueError(f"Could not encode the frame as {encoding}")
+    return {"encoding": encoding}, data.tobytes()
+
+
+def decode_frame(header: dict[str, Any], payload: bytes) -> npt.NDArray[np.uint8]:
+    if header.get("encoding") == "raw":
+        shape = tuple(header["shape"])
+        if len(shape) != 3 or shape[2] != 3 or np.prod(shape) != len(payload):
+            raise ValueError(f"Raw frame of shape {shape} does not match {len(payload)} payload bytes")
+        return np.frombuffer(payload, dtype=np.uint8).reshape(shape)
+    frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError(f"Could not decode the {header.get('encoding')} frame")
+    return frame
+
+
+def track_record(track: trackers.Track) -> dict[str, Any]:
+    """A track in a response, the fields of a batch.py record."""
+    return {"track_id": str(track.track_id),
+            "bbox_xyxy": [float(v) for v in track.bbox_xyxy],
+            "threat_score": track.threat_score,
+            "classification": track.classification}
+
+
+@dataclasses.dataclass()
+class Stream:
+    tracker: trackers.BaseTracker
+    frames: int = 0
+    last_seen: float = 0.0
+
+
+@dataclasses.dataclass()
+class _Request:
+    stream_id: str
+    frame: npt.NDArray[np.uint8] | None  # None to end the stream
+    future: asyncio.Future
+    received: float
+
+
+class InferenceService:
+    """
+    Micro-batches the frames of many streams into single detector calls and tracks each stream separately.
+
+    Frames are queued as they arrive. The batcher takes the first pending frame and collects more until it has
+    max_batch frames or the first frame has waited max_wait_ms, then detects in all of them with one
+    detector.run_batch call and updates the tracker of each frame's stream in arrival order. Batches run one at a
+    time on an inference thread, so the frames arriving meanwhile form the next batch: under load batches fill up
+    without waiting, when idle a frame waits at most max_wait_ms. The streams' state is only touched on the
+    inference thread.
+
+    The detector is shared by all streams, so it must not keep state between frames (YOLO, not MOG2).
+    """
+
+    def __init__(self,
+                 detector: detectors.BaseDetector,
+                 make_tracker: Callable[[], trackers.BaseTracker],
+                 behaviour_classifier: Callable,
+                 threat_score_calculator: Callable,
+                 cadence: ClassificationCadence | None = None,
+                 min_track_length: int = 10,
+                 age_threshold: int = 10,
+                 max_batch: int = 16,
+                 max_wait_ms: float = 5.0,
+                 max_queue: int = 256,
+                 stream_timeout: float = 60.0,
+                 **kwargs) -> None:
+        """
+        Args:
+            detector: The detector, its run_batch detects in the frames of a batch.
+            make_tracker: Creates the tracker of a new stream.
+            behaviour_classifier: See classifiers.create.
+            threat_score_calculator: See classifiers.create.
+            cadence: When tracks are re-classified, None to classify every frame.
+            min_track_length: Tracks are classified once they are longer than this.
+            age_threshold: Tracks not seen for more frames than this are left out of the responses.
+            max_batch: Frames per detector call.
+            max_wait_ms: The longest the first frame of a batch waits for more frames.
+            max_queue: Pending frames, further frames are rejected until the queue drains.
+            stream_timeout: Seconds after which an idle stream's tracker is dropped.
+            **kwargs: Additional keyword arguments.
+        """
+        self.detector = detector
+        self.make_tracker = make_tracker
+        self.behaviour_classifier = behaviour_classifier
+        self.threat_score_calculator = threat_score_calculator
+        self.cadence = cadence or ClassificationCadence(enabled=False)
+        self.min_track_length = min_track_length
+        self.age_threshold = age_threshold
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.stream_timeout = stream_timeout
+        self.streams: dict[str, Stream] = {}
+
+        self.requests = 0
+        self.batches = 0
+        self.rejected = 0
+        self._queue: asyncio.Queue[_Request] | None = None
+        self._task: asyncio.Task | None = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+        self._batch_size = METRICS.histogram("service_batch_size", "Frames per detector call", buckets=BATCH_BUCKETS)
+        self._request_seconds = METRICS.histogram("service_request_seconds", "Time from a frame's arrival to its "
+                                                                             "response")
+        self._queue_seconds = METRICS.histogram("service_queue_seconds", "Time a frame waits for its batch")
+        self._rejected = METRICS.counter("service_rejected", "Frames rejected because the queue was full")
+        self._streams = METRICS.gauge("service_streams", "Streams with tracker state")
+
+    async def start(self) -> InferenceService:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._batch_loop(), name="batcher")
+        return self
+
+    async def stop(self) -> None:
+        """Stops batching, failing the frames still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            request = self._queue.get_nowait()
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Service stopped"))
+        self._executor.shutdown(wait=True)
+
+    def enqueue(self, stream_id: str, frame: npt.NDArray[np.uint8] | None) -> asyncio.Future:
+        """
+        Queues a frame of a stream, or None to end the stream, and returns the future of its response. Frames of
+        a stream must be enqueued in order.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if frame is not None and self._queue.qsize() >= self.max_queue:
+            self.rejected += 1
+            self._rejected.inc()
+            future.set_exception(RuntimeError(f"Queue full, {self.max_queue} frames pending"))
+        else:
+            self._queue.put_nowait(_Request(str(stream_id), frame, future, time.perf_counter()))
+        return future
+
+    async def submit(self, stream_id: str, frame: npt.NDArray[np.uint8]) -> dict[str, Any]:
+        """Detects and tracks in a frame of a stream and returns the response."""
+        return await self.enqueue(stream_id, frame)
+
+    async def end_stream(self, stream_id: str) -> dict[str, Any]:
+        """Drops the tracker of a stream, after the frames of the stream already queued."""
+        return await self.enqueue(stream_id, None)
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                # the window starts when the first frame arrived: when it queued behind the previous batch, the
+                # frames pending now are taken without waiting
+                deadline = batch[0].received + self.max_wait
+                while len(batch) < self.max_batch:
+                    timeout = deadline - time.perf_counter()
+                    try:
+                        batch.append(self._queue.get_nowait() if timeout <= 0 else
+                                     await asyncio.wait_for(self._queue.get(), timeout))
+                    except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                        break
+                responses = await loop.run_in_executor(self._executor, self._process, batch)
+            except asyncio.CancelledError:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(RuntimeError("Service stopped"))
+                raise
+            except Exception as e:
+                logger.exception("Batch failed")
+                responses = [e] * len(batch)
+            for request, response in zip(batch, responses):
+                if request.future.done():  # the client went away
+                    continue
+                if isinstance(response, Exception):
+                    request.future.set_exception(response)
+                else:
+                    request.future.set_result(response)
+
+    def _process(self, batch: list[_Request]) -> list[dict[str, Any]]:
+        """Runs on the inference thread: detects in the frames of the batch and updates their streams."""
+        started = time.perf_counter()
+        frames = [request.frame for request in batch if request.frame is not None]
+        detections = iter(self.detector.run_batch(frames)) if frames else iter(())
+        detect_ms = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self._batch_size.observe(len(frames))
+
+        responses = []
+        for request in batch:
+            if request.frame is None:
+                stream = self.streams.pop(request.stream_id, None)
+                responses.append({"stream": request.stream_id, "ended": True,
+                                  "frames": stream.frames if stream else 0})
+                continue
+            stream = self.streams.get(request.stream_id)
+            if stream is None:
+                stream = self.streams[request.stream_id] = Stream(tracker=self.make_tracker())
+                logger.info(f"New stream {request.stream_id}")
+            tracks = stream.tracker.update(detections=next(detections), frame=request.frame) or []
+            records = []
+            for track in tracks:
+                if track.time_since_last_seen > self.age_threshold:
+                    continue
+                if len(track) > self.min_track_length:
+                    self.cadence.classify(track, self.behaviour_classifier, self.threat_score_calculator)
+                records.append(track_record(track))
+            now = time.perf_counter()
+            responses.append({"stream": request.stream_id,
+                              "frame": stream.frames,
+                              "tracks": records,
+                              "timing": {"queue_ms": (started - request.received) * 1000,
+                                         "batch_size": len(frames),
+                                         "detect_ms": detect_ms,
+                                         "server_ms": (now - request.received) * 1000}})
+            stream.frames += 1
+            stream.last_seen = now
+            self.requests += 1
+            self._queue_seconds.observe(started - request.received)
+            self._request_seconds.observe(now - request.received)
+
+        now = time.perf_counter()
+        for stream_id in [s for s, stream in self.streams.items() if now - stream.last_seen > self.stream_timeout]:
+            del self.streams[stream_id]
+            logger.info(f"Stream {stream_id} timed out")
+        self._streams.set(len(self.streams))
+        return responses
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves one client connection, its requests are pipelined and answered as they complete."""
+        peer = writer.get_extra_info("peername")
+        pending: set[asyncio.Task] = set()
+        try:
+            while (message := await read_message(reader)) is not None:
+                header, payload = message
+                # decoded off the event loop, but awaited here so a stream's frames are enqueued in order
+                try:
+                    if header.get("op", "frame") == "end_stream":
+                        future = self.enqueue(header["stream"], None)
+                    else:
+                        future = self.enqueue(header["stream"], await asyncio.to_thread(decode_frame, header,
+                                                                                        payload))
+                except Exception as e:
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_exception(e)
+                task = asyncio.create_task(self._respond(header.get("id"), future, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.warning(f"Closing connection {peer}: {e}")
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    @staticmethod
+    async def _respond(request_id: Any, future: asyncio.Future, writer: asyncio.StreamWriter) -> None:
+        try:
+            response = {"id": request_id, **await future}
+        except Exception as e:
+            response = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+        if not writer.is_closing():
+            writer.write(encode_message(response))
+            await writer.drain()
+
+    def stats(self) -> dict[str, Any]:
+        return {"requests": self.requests,
+                "batches": self.batches,
+                "mean_batch": self.requests / self.batches if self.batches else 0.0,
+                "rejected": self.rejected,
+                "streams": len(self.streams)}
+
+
+class ServiceClient:
+    """
+    An asyncio client of the service. Requests can be pipelined from several tasks, each awaits its own response.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, encoding: str = "jpeg") -> None:
+        self.host = host
+        self.port = port
+        self.encoding = encoding
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._task: asyncio.Task | None = None
+
+    async def connect(self) -> ServiceClient:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._task = asyncio.create_task(self._read_responses())
+        return self
+
+    async def request(self, header: dict[str, Any], payload: bytes = b"") -> dict[str, Any]:
+        """Sends a request and returns its response, raising RuntimeError for an error response."""
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        self._writer.write(encode_message({**header, "id": request_id}, payload))
+        await self._writer.drain()
+        response = await future
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def detect(self, stream_id: str, frame: npt.NDArray[np.uint8]) -> dict[str, Any]:
+        """The tracks of a frame of a stream."""
+        header, payload = encode_frame(frame, self.encoding)
+        return await self.request({**header, "stream": stream_id}, payload)
+
+    async def end_stream(self, stream_id: str) -> dict[str, Any]:
+        return await self.request({"op": "end_stream", "stream": stream_id})
+
+    async def _read_responses(self) -> None:
+        error: Exception = ConnectionError("Connection closed")
+        try:
+            while (message := await read_message(self._reader)) is not None:
+                future = self._pending.pop(message[0].get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message[0])
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError) as e:
+            error = e
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            with contextlib.suppress(ConnectionError):
+                await self._writer.wait_closed()
+        if self._task is not None:
+            await self._task
+
+
+def create_service(cfg: DictConfig) -> InferenceService:
+    """An InferenceService with the detector, classifier and service sections of the config."""
+    service_cfg = cfg.get("service", {})
+    if cfg.detector.type in ("MOG2", "MOTION_GATED"):
+        raise ValueError(f"The {cfg.detector.type} detector keeps per-stream background state, the service shares "
+                         f"one detector between streams")
+    tracker_cfg = service_cfg.get("tracker") or cfg.tracker
+    if tracker_cfg.type == "YOLO":
+        raise ValueError("The YOLO tracker runs its own detection and cannot be batched, set service.tracker to "
+                         "a MultiObject or DeepSort tracker")
+
+    detector = detectors.create(cfg.detector)
+    behaviour_classifier, threat_score_calculator = classifiers.create(cfg.classifier)
+    return InferenceService(detector=detector,
+                            make_tracker=lambda: trackers.create(tracker_cfg),
+                            behaviour_classifier=behaviour_classifier,
+                            threat_score_calculator=threat_score_calculator,
+                            cadence=ClassificationCadence(**cfg.classifier.get("cadence", {})),
+                            min_track_length=cfg.classifier.min_track_length,
+                            age_threshold=tracker_cfg.get("age_threshold", cfg.tracker.age_threshold),
+                            **{k: v for k, v in service_cfg.items() if k not in ("host", "port", "tracker")})
+
+
+async def serve(cfg: DictConfig) -> None:
+    service_cfg = cfg.get("service", {})
+    service = await create_service(cfg).start()
+    Runtime(**cfg.get("runtime", {})).apply()
+    metrics_cfg = cfg.get("metrics", {"enabled": False})
+    METRICS.enabled = metrics_cfg.get("enabled", True)
+    exporter = MetricsExporter(METRICS, **metrics_cfg).start() if METRICS.enabled else None
+
+    server = await asyncio.start_server(service.handle_connection, service_cfg.get("host", "127.0.0.1"),
+                                        service_cfg.get("port", 8765))
+    logger.info(f"Serving on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+    async with server:
+        await stop.wait()
+    await service.stop()
+    logger.info(f"Service: {service.stats()}")
+    if exporter is not None:
+        exporter.stop()
+
+
+@hydra.main(version_base=None, config_path="../config", config_name="config")
+def main(cfg: DictConfig):
+    asyncio.run(serve(cfg))
+
+
+if __name__ == "__main__":
+    main()
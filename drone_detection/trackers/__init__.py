@@ -8,8 +8,10 @@ from numpy import typing as npt
 from omegaconf import DictConfig
 
 from .track import Track
+from .track_manager import TrackManager, TrackEvent, log_track_event
 
 from ..detectors import Detection
+from ..utils import EntryPoint, lazy_getattr, ComputeScheduler
 
 
 class TrackerType(enum.Enum):
@@ -19,22 +21,31 @@ class TrackerType(enum.Enum):
 
 
 class BaseTracker(abc.ABC):
+    manager: TrackManager
+    # decides which tracks get optional work such as re-identification, None to do it for every track
+    scheduler: ComputeScheduler | None = None
+
+    @property
+    def tracks(self) -> dict[Any, Track]:
+        """The current tracks by track id."""
+        return self.manager.tracks
 
     @abc.abstractmethod
     def update(self, detections: list[Detection], frame: npt.NDArray[np.uint8]) -> list[Track]:
         ...
 
 
-from .yolo_tracker import TrackerYOLO
-from .deep_sort import DeepSortTracker
-
-TRACKER_FACTORY: dict[TrackerType, Any] = {
-    TrackerType.DeepSort: DeepSortTracker,
-    TrackerType.YOLO: TrackerYOLO
+# backends are only imported when they are created or accessed, e.g. DeepSortTracker imports torch and torchvision
+TRACKER_FACTORY: dict[TrackerType, EntryPoint] = {
+    TrackerType.MultiObject: EntryPoint(".multi_object_tracker", "MultiObjectTracker", __name__),
+    TrackerType.DeepSort: EntryPoint(".deep_sort", "DeepSortTracker", __name__),
+    TrackerType.YOLO: EntryPoint(".yolo_tracker", "TrackerYOLO", __name__),
 }
 
+__getattr__ = lazy_getattr(__name__, {entry_point.name: entry_point for entry_point in TRACKER_FACTORY.values()})
+
 
-def create(cfg: DictConfig) -> DeepSortTracker:
+def create(cfg: DictConfig) -> BaseTracker:
     if "type" not in cfg:
         raise ValueError("Tracker config must have a type")
 
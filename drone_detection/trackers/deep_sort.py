@@ -1,68 +1,181 @@
 from typing import Any
 
+import cv2
 import numpy as np
+import torch
 from deep_sort_realtime.deepsort_tracker import DeepSort
+from deep_sort_realtime.embedder.embedder_pytorch import MobileNetv2_Embedder
 from numpy import typing as npt
-from loguru import logger
 
-from ..detectors import Detection
-from . import BaseTracker, Track
+from ..detectors import Detection, DetectionBatch
+from ..utils import iou_matrix, clip_boxes
+from . import BaseTracker, Track, TrackManager
+
+__all__ = ["DeepSortTracker"]
+
+# ImageNet normalisation used by the MobileNetV2 embedder, in RGB order
+EMBEDDER_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+EMBEDDER_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
 
 class DeepSortTracker(BaseTracker):
+    """
+    DeepSORT tracking with cached appearance embeddings.
+
+    By default DeepSORT embeds every detection crop every frame. Here the embedding of each track is cached
+    and a detection reuses its track's embedding when the association is unambiguous: the detection overlaps
+    exactly one existing track, that track overlaps no other detection, and the track's embedding is at most
+    embedding_max_age frames old. Only the remaining detections are embedded, in a single batch at crop_size
+    resolution. With a compute scheduler, tracks it defers reuse their embedding however old it is.
+    """
 
     def __init__(self, max_age: int = 5,
                  track_kwargs: dict[str, Any] | None = None,
+                 crop_size: int = 128,
+                 embedding_max_age: int = 10,
+                 ambiguity_iou: float = 0.3,
+                 cache_embeddings: bool = True,
+                 nn_budget: int | None = 100,
+                 embedder_gpu: bool = True,
                  **kwargs):
-
-        self.tracks = {}
+        """
+        Initializes the tracker.
+
+        Args:
+            max_age: Remove a track after this many frames without a matched detection.
+            track_kwargs: Keyword arguments passed to each new Track.
+            crop_size: Detection crops are resized to crop_size x crop_size before embedding. The embedder was
+                       trained at 224, smaller crops are much cheaper and drones are usually small anyway.
+            embedding_max_age: Re-embed a track's detection when its cached embedding is older than this many frames.
+            ambiguity_iou: A detection and a track overlapping by at least this IoU are considered a likely match.
+            cache_embeddings: Reuse cached embeddings. If False every detection is embedded every frame.
+            nn_budget: Maximum number of appearance samples kept per track for matching, None for no limit.
+            embedder_gpu: Run the embedder on the GPU if one is available.
+            **kwargs: Additional keyword arguments.
+        """
         self.max_age = max_age
-        self.track_kwargs = track_kwargs
-        if self.track_kwargs is None:
-            self.track_kwargs = {}
+        self.crop_size = crop_size
+        self.embedding_max_age = embedding_max_age
+        self.ambiguity_iou = ambiguity_iou
+        self.cache_embeddings = cache_embeddings
+        self.manager = TrackManager(max_age=max_age, track_kwargs=track_kwargs)
 
+        # the embedder is run here so DeepSort only receives embeddings
         self.tracker = DeepSort(max_age=max_age,
                                 n_init=2,
                                 max_cosine_distance=0.9,
-                                nms_max_overlap=1.0)
+                                nms_max_overlap=1.0,
+                                nn_budget=nn_budget,
+                                embedder=None)
+        self.embedder = MobileNetv2_Embedder(half=True, bgr=True, gpu=embedder_gpu)
+
+        # DeepSort track id -> (embedding, frame it was computed on)
+        self._embeddings: dict[str, tuple[npt.NDArray[np.float32], int]] = {}
+
+        self.frame_count = 0
+        self.embedder_calls = 0
+        self.crops_embedded = 0
+        self.embeddings_reused = 0
+
+    @property
+    def crops_embedded_per_frame(self) -> float:
+        return self.crops_embedded / max(self.frame_count, 1)
+
+    def embed(self, frame: npt.NDArray[np.uint8], boxes_xyxy: npt.NDArray[np.float64]) -> npt.NDArray[np.float32]:
+        """
+        Computes the appearance embeddings of the given boxes with one embedder call.
+
+        Args:
+            frame: A BGR image.
+            boxes_xyxy: (K, 4) boxes inside the frame.
+
+        Returns:
+            A (K, D) array of embeddings.
+        """
+        height, width = frame.shape[:2]
+        boxes = np.rint(clip_boxes(boxes_xyxy, width, height)).astype(int)
+        # at least one pixel, so degenerate boxes still give a crop
+        boxes[:, [0, 1]] = np.minimum(boxes[:, [0, 1]], [width - 1, height - 1])
+        boxes[:, [2, 3]] = np.maximum(boxes[:, [2, 3]], boxes[:, [0, 1]] + 1)
+
+        size = (self.crop_size, self.crop_size)
+        crops = np.stack([cv2.resize(frame[y1:y2, x1:x2], size, interpolation=cv2.INTER_AREA)
+                          for x1, y1, x2, y2 in boxes])
+        crops = (crops[..., ::-1].astype(np.float32) / 255 - EMBEDDER_MEAN) / EMBEDDER_STD
+        batch = torch.from_numpy(np.ascontiguousarray(crops.transpose(0, 3, 1, 2)))
+
+        if self.embedder.gpu:
+            batch = batch.cuda()
+            if self.embedder.half:
+                batch = batch.half()
+        with torch.inference_mode():
+            embeddings = self.embedder.model(batch).float().cpu().numpy()
+
+        self.embedder_calls += 1
+        self.crops_embedded += len(boxes)
+        return embeddings
+
+    def _reusable(self, detections_xyxy: npt.NDArray[np.float64]) -> tuple[npt.NDArray[np.bool_], list]:
+        """Returns which detections can reuse a cached embedding, and the cached embedding of each of them."""
+        reuse = np.zeros(len(detections_xyxy), dtype=bool)
+        ds_tracks = [t for t in self.tracker.tracker.tracks if not t.is_deleted()]
+        if not self.cache_embeddings or not ds_tracks or len(detections_xyxy) == 0:
+            return reuse, []
+
+        cached = [self._embeddings.get(t.track_id) for t in ds_tracks]
+        fresh = np.array([c is not None and self.frame_count - c[1] <= self.embedding_max_age for c in cached])
+
+        overlaps = iou_matrix(detections_xyxy, [t.to_ltrb() for t in ds_tracks]) >= self.ambiguity_iou
+        best = overlaps.argmax(axis=1)
+        one_track = overlaps.sum(axis=1) == 1
+        one_detection = overlaps.sum(axis=0) == 1
+        reuse = one_track & one_detection[best] & fresh[best]
+
+        if self.scheduler is not None:
+            # tracks the scheduler defers keep matching on their stale embedding. Only confirmed tracks have a Track
+            # the scheduler can rank, tentative tracks are not scheduled and are always re-embedded.
+            stale = one_track & one_detection[best] & ~fresh[best]
+            for index in np.flatnonzero(stale).tolist():
+                track = self.tracks.get(ds_tracks[best[index]].track_id)
+                if cached[best[index]] is not None and track is not None and \
+                        not self.scheduler.may_spend(track, "reid"):
+                    reuse[index] = True
+        return reuse, [cached[i][0] if r else None for i, r in zip(best.tolist(), reuse.tolist())]
 
     def update(self, detections: list[Detection], frame: npt.NDArray[np.uint8]) -> list[Track]:
-        detections_xywh = []
-
-        for det in detections:
-            detections_xywh.append((det.bbox_xywh, det.confidence, "drone"))  # hard coded as we only have one class
-
-        ds_tracks = self.tracker.update_tracks(detections_xywh, frame=frame)
-
+        self.frame_count += 1
+        batch = DetectionBatch.from_detections(detections)
+        # DeepSort drops boxes without area from the detections, but not from the embeddings and detection indices
+        # passed alongside them, which would then be paired with the wrong detections
+        batch = batch[(batch.bboxes_xywh[:, 2] > 0) & (batch.bboxes_xywh[:, 3] > 0)]
+
+        reuse, embeddings = self._reusable(batch.bboxes_xyxy)
+        if len(embeddings) == 0:
+            embeddings = [None] * len(batch)
+        if not reuse.all():
+            computed = self.embed(frame, batch.bboxes_xyxy[~reuse])
+            for index, embedding in zip(np.flatnonzero(~reuse).tolist(), computed):
+                embeddings[index] = embedding
+        self.embeddings_reused += int(reuse.sum())
+
+        # class hard coded as we only have one class. The detection index is passed through so the new
+        # embeddings can be cached against the track each detection was assigned to.
+        detections_xywh = [(box, conf, "drone") for box, conf in zip(batch.bboxes_xywh, batch.confidences)]
+        ds_tracks = self.tracker.update_tracks(detections_xywh, embeds=embeddings, others=list(range(len(batch))))
 
-        tracked_ids = []
         for ds_track in ds_tracks:
-            if not ds_track.is_confirmed():
-                continue
-
-            track_id = ds_track.track_id
-            track = self.tracks.get(track_id)
-            box_xyxy = ds_track.to_ltrb()
-            xmin, ymin, xmax, ymax = np.rint(box_xyxy).astype(int)
-            detection = Detection(bbox_xyxy=box_xyxy,
-                                  data=frame[ymin:ymax, xmin:xmax, :])
-
-            if track is None:
-                logger.info(f"New Track: {track_id}")
-                track = Track(track_id=track_id, detection=detection, **self.track_kwargs)
-                self.tracks[track_id] = track
-            tracked_ids.append(track_id)
-
-            track.update(detection=detection)
-
-        # update all other tracks
-        for track_id, track in self.tracks.items():
-            if track_id not in tracked_ids:
-                track.update()
-
-        # remove all tracks that are too old
-        for track_id, track in self.tracks.items():
-            if track.time_since_last_seen > self.max_age:
-                logger.info(f"Removing Track: {track_id}")
-                del self.tracks[track_id]
-
-        return list(self.tracks.values())
\ No newline at end of file
+            index = ds_track.get_det_supplementary()
+            if ds_track.time_since_update == 0 and index is not None and not reuse[index]:
+                self._embeddings[ds_track.track_id] = (embeddings[index], self.frame_count)
+        if len(self._embeddings) > len(ds_tracks):
+            alive = {t.track_id for t in ds_tracks}
+            self._embeddings = {k: v for k, v in self._embeddings.items() if k in alive}
+
+        confirmed = [t for t in ds_tracks if t.is_confirmed()]
+        height, width = frame.shape[:2]
+        track_boxes = DetectionBatch(bboxes_xyxy=[t.to_ltrb() for t in confirmed],
+                                     confidences=np.full(len(confirmed), np.nan))
+        track_detections = track_boxes.clip(width, height).to_detections(frame)
+
+        return self.manager.update((ds_track.track_id, detection)
+                                   for ds_track, detection in zip(confirmed, track_detections))
@@ -1,4 +1,6 @@
 import math
+from typing import Any
+
 import numpy as np
 
 from ..utils import cxcywh_to_xyxy
@@ -60,6 +62,12 @@ class KalmanFilter:
 
         self._is_initialized = False
 
+    def reset(self):
+        """Resets the state and its covariance so the filter can be reused for a new track."""
+        self.x = np.zeros((8, 1))
+        self.P = np.eye(8) * 1000
+        self._is_initialized = False
+
     def predict(self):
         """Predicts the next state."""
         self.x = self.F @ self.x
@@ -115,3 +123,125 @@ class KalmanFilter:
     def get_bbox_xyxy(self) -> tuple[float | int, ...]:
         cx, cy, w, h, _, _, _, _ = self.x.flatten()
         return cxcywh_to_xyxy((cx, cy, w, h))
+
+
+
+def batch_predict(filters: list[KalmanFilter]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Predicts the next state of many filters at once, without modifying them.
+    All filters must share the same transition and noise models.
+
+    Args:
+        filters: The Kalman filters to predict.
+
+    Returns:
+        A tuple of the predicted states (N, 8) and covariances (N, 8, 8).
+    """
+    F, Q = filters[0].F, filters[0].Q
+    x = np.stack([f.x[:, 0] for f in filters])
+    P = np.stack([f.P for f in filters])
+    return x @ F.T, F @ P @ F.T + Q
+
+
+def batch_update(x: np.ndarray, P: np.ndarray, R: np.ndarray,
+                 measurements_cxcywh: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Applies the Kalman update to many predicted states at once.
+
+    Args:
+        x: Predicted states (N, 8).
+        P: Predicted state covariances (N, 8, 8).
+        R: Measurement noise covariance (4, 4).
+        measurements_cxcywh: Measurements (N, 4) as [cx, cy, w, h]. Rows containing NaN have no
+                             measurement and keep their predicted state.
+
+    Returns:
+        A tuple of the updated states (N, 8) and covariances (N, 8, 8).
+    """
+    x, P = x.copy(), P.copy()
+    measured = ~np.isnan(measurements_cxcywh).any(axis=1)
+    if not measured.any():
+        return x, P
+
+    xm, Pm = x[measured], P[measured]
+    # H selects the first four state variables, so H P = P[:4, :] and P H^T = P[:, :4]
+    S = Pm[:, :4, :4] + R
+    K = Pm[:, :, :4] @ np.linalg.inv(S)
+    residuals = measurements_cxcywh[measured] - xm[:, :4]
+    x[measured] = xm + (K @ residuals[:, :, None])[:, :, 0]
+    P[measured] = Pm - K @ Pm[:, :4, :]
+    return x, P
+
+
+def batch_states(x: np.ndarray, initialized: np.ndarray | bool = True) -> list[dict[str, Any]]:
+    """
+    Computes KalmanFilter.get_state for many states at once.
+
+    Args:
+        x: States (N, 8).
+        initialized: The is_initialized flag of each state, or one flag for all of them.
+
+    Returns:
+        The state dictionary of each row, with the same keys and values as KalmanFilter.get_state.
+    """
+    cx, cy, w, h, vx, vy, vw, vh = x.T
+    columns = {
+        "cx": cx, "cy": cy, "w": w, "h": h,
+        "vx": vx, "vy": vy, "vw": vw, "vh": vh,
+        "speed_xy": np.hypot(vx, vy),
+        "speed_3d": np.sqrt(vx ** 2 + vy ** 2 + vw ** 2),
+        "area": w * h,
+        "va": (w * vh) + (h * vw),
+        "direction_xy_radians": np.arctan2(vy, vx),
+        "is_initialized": np.broadcast_to(initialized, len(x)),
+    }
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*(column.tolist() for column in columns.values()))]
+
+
+def batch_mahalanobis(x: np.ndarray, P: np.ndarray, R: np.ndarray,
+                      measurements_cxcywh: np.ndarray) -> np.ndarray:
+    """
+    Computes the squared Mahalanobis distance between every predicted state and every measurement.
+
+    Args:
+        x: Predicted states (N, 8).
+        P: Predicted state covariances (N, 8, 8).
+        R: Measurement noise covariance (4, 4).
+        measurements_cxcywh: Measurements (M, 4) as [cx, cy, w, h].
+
+    Returns:
+        An (N, M) array of squared distances. Compare against a chi-square threshold with 4 degrees of freedom.
+    """
+    # innovation covariance S = H P H^T + R
+    S_inv = np.linalg.inv(P[:, :4, :4] + R)
+    mu = x[:, :4]
+    z = measurements_cxcywh
+
+    # expand (z - mu)^T S^-1 (z - mu) so the N x M terms are matrix products rather than an (N, M, 4) residual
+    zz = (z[:, :, None] * z[:, None, :]).reshape(len(z), 16)
+    S_inv_mu = (S_inv @ mu[:, :, None])[:, :, 0]
+    return (S_inv.reshape(len(mu), 16) @ zz.T
+            - 2 * S_inv_mu @ z.T
+            + np.sum(S_inv_mu * mu, axis=1)[:, None])
+
+
+def paired_mahalanobis(x: np.ndarray, P: np.ndarray, R: np.ndarray, measurements_cxcywh: np.ndarray,
+                       state_index: np.ndarray, measurement_index: np.ndarray) -> np.ndarray:
+    """
+    Computes the squared Mahalanobis distance for a sparse set of (state, measurement) pairs.
+
+    Args:
+        x: Predicted states (N, 8).
+        P: Predicted state covariances (N, 8, 8).
+        R: Measurement noise covariance (4, 4).
+        measurements_cxcywh: Measurements (M, 4) as [cx, cy, w, h].
+        state_index: (K,) index into the states of each pair.
+        measurement_index: (K,) index into the measurements of each pair.
+
+    Returns:
+        A (K,) array of squared distances.
+    """
+    S_inv = np.linalg.inv(P[:, :4, :4] + R)
+    residuals = measurements_cxcywh[measurement_index] - x[state_index, :4]
+    return np.einsum("ki,kij,kj->k", residuals, S_inv[state_index], residuals)
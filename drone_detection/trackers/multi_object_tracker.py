@@ -0,0 +1,250 @@
+from typing import Any
+
+import numpy as np
+from numpy import typing as npt
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from ..detectors import Detection, DetectionBatch
+from ..utils import iou_matrix, iou_pairs, boxes_cxcywh_to_xyxy, SpatialGrid
+from . import BaseTracker, Track, TrackManager
+from .kalman_filter import batch_predict, batch_update, batch_mahalanobis, batch_states, paired_mahalanobis
+
+__all__ = ["MultiObjectTracker"]
+
+# chi-square 95% quantile with 4 degrees of freedom
+CHI2_95_4DOF = 9.4877
+
+INVALID_COST = 1e6
+
+
+class MultiObjectTracker(BaseTracker):
+    """
+    A lightweight tracker that associates detections to tracks with the Hungarian algorithm.
+
+    The association cost between each predicted track box and each detection is a weighted sum of
+    (1 - IoU) and the centre distance normalised by the track's box diagonal. The centre distance keeps
+    small, fast targets associated when their boxes no longer overlap. Pairs outside the Kalman filter's
+    Mahalanobis gate are never matched. All costs are computed as arrays, there is no per-pair Python code.
+
+    With many tracks and detections the full cost matrix is replaced by a spatial grid over the predicted
+    track centres: only detections in neighbouring cells are costed, and the assignment is solved
+    separately for each connected group of candidate pairs. The cell size is the largest search radius of the
+    tracks, capped at a multiple of the median, so one large track does not put every track in a few cells; the
+    tracks whose radius is larger than a cell are costed against the detections within their radius directly.
+
+    The Kalman states of all tracks are predicted, updated and converted to state dictionaries as arrays, the only
+    per-track Python code is the bookkeeping in Track.update. This does not reach sub-millisecond frames with
+    hundreds of targets: on one CPU core scripts/benchmark_trackers.py measures about 2 ms per frame at 100 targets
+    and 7 ms at 300, spread over many numpy calls on small arrays that each have a fixed overhead. Getting below
+    1 ms needs the track states kept in preallocated arrays across frames (no per-frame stacking of the Track
+    estimators) and the association compiled (e.g. numba), rather than more numpy.
+    """
+
+    def __init__(self,
+                 max_age: int = 5,
+                 iou_weight: float = 1.0,
+                 distance_weight: float = 1.0,
+                 max_cost: float = 1.5,
+                 gating_threshold: float = CHI2_95_4DOF,
+                 grid_min_pairs: int | None = 40000,
+                 grid_max_cell_ratio: float = 2.0,
+                 track_kwargs: dict[str, Any] | None = None,
+                 **kwargs) -> None:
+        """
+        Initializes the tracker.
+
+        Args:
+            max_age: Remove a track after this many frames without a matched detection.
+            iou_weight: Weight of the (1 - IoU) term in the association cost.
+            distance_weight: Weight of the normalised centre distance term in the association cost.
+            max_cost: Matches with a cost above this are rejected.
+            gating_threshold: Squared Mahalanobis distance above which a detection cannot match a track.
+            grid_min_pairs: Use the spatial grid when tracks x detections is at least this. None to never use it.
+            grid_max_cell_ratio: The grid cell size is at most this times the median search radius of the tracks.
+            track_kwargs: Keyword arguments passed to each new Track.
+            **kwargs: Additional keyword arguments.
+        """
+        self.max_age = max_age
+        self.iou_weight = iou_weight
+        self.distance_weight = distance_weight
+        self.max_cost = max_cost
+        self.gating_threshold = gating_threshold
+        self.grid_min_pairs = grid_min_pairs
+        self.grid_max_cell_ratio = grid_max_cell_ratio
+        self.grid = SpatialGrid(cell_size=1.0)
+
+        self.manager = TrackManager(max_age=max_age, track_kwargs=track_kwargs)
+
+    def cost_matrix(self, x: np.ndarray, P: np.ndarray, R: np.ndarray,
+                    detections_cxcywh: np.ndarray) -> np.ndarray:
+        """
+        Computes the association cost between every predicted track and every detection.
+
+        Args:
+            x: Predicted track states (N, 8).
+            P: Predicted track state covariances (N, 8, 8).
+            R: Measurement noise covariance (4, 4).
+            detections_cxcywh: Detection boxes (M, 4).
+
+        Returns:
+            An (N, M) cost matrix. Gated pairs and pairs above max_cost have a cost of INVALID_COST.
+        """
+        predicted_cxcywh = x[:, :4]
+        iou = iou_matrix(boxes_cxcywh_to_xyxy(predicted_cxcywh), boxes_cxcywh_to_xyxy(detections_cxcywh))
+
+        distance = np.hypot(predicted_cxcywh[:, None, 0] - detections_cxcywh[None, :, 0],
+                            predicted_cxcywh[:, None, 1] - detections_cxcywh[None, :, 1])
+        diagonal = np.maximum(np.hypot(predicted_cxcywh[:, 2], predicted_cxcywh[:, 3]), 1.0)
+
+        cost = self.iou_weight * (1 - iou) + self.distance_weight * distance / diagonal[:, None]
+
+        gated = batch_mahalanobis(x, P, R, detections_cxcywh) > self.gating_threshold
+        cost[gated | (cost > self.max_cost)] = INVALID_COST
+        return cost
+
+    def pair_costs(self, x: np.ndarray, P: np.ndarray, R: np.ndarray, detections_cxcywh: np.ndarray,
+                   track_index: np.ndarray, detection_index: np.ndarray) -> np.ndarray:
+        """
+        Computes the same cost as cost_matrix, for a sparse set of (track, detection) pairs.
+
+        Returns:
+            A (K,) array of costs. Gated pairs and pairs above max_cost have a cost of INVALID_COST.
+        """
+        predicted_cxcywh = x[track_index, :4]
+        pair_detections = detections_cxcywh[detection_index]
+        iou = iou_pairs(boxes_cxcywh_to_xyxy(predicted_cxcywh), boxes_cxcywh_to_xyxy(pair_detections))
+
+        distance = np.hypot(*(predicted_cxcywh[:, :2] - pair_detections[:, :2]).T)
+        diagonal = np.maximum(np.hypot(predicted_cxcywh[:, 2], predicted_cxcywh[:, 3]), 1.0)
+
+        cost = self.iou_weight * (1 - iou) + self.distance_weight * distance / diagonal
+
+        distances = paired_mahalanobis(x, P, R, detections_cxcywh, track_index, detection_index)
+        cost[(distances > self.gating_threshold) | (cost > self.max_cost)] = INVALID_COST
+        return cost
+
+    def associate(self, x: np.ndarray, P: np.ndarray, R: np.ndarray, detections_cxcywh: np.ndarray,
+                  track_ids: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Matches predicted tracks to detections.
+
+        Args:
+            x: Predicted track states (N, 8).
+            P: Predicted track state covariances (N, 8, 8).
+            R: Measurement noise covariance (4, 4).
+            detections_cxcywh: Detection boxes (M, 4).
+            track_ids: Optional (N,) track ids, lets the spatial grid reuse the previous frame's ordering.
+
+        Returns:
+            A tuple of the matched track indices and the matched detection indices.
+        """
+        if len(x) == 0 or len(detections_cxcywh) == 0:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+        use_grid = (self.grid_min_pairs is not None and self.distance_weight > 0
+                    and len(x) * len(detections_cxcywh) >= self.grid_min_pairs)
+        if use_grid:
+            return self._associate_sparse(x, P, R, detections_cxcywh, track_ids)
+
+        cost = self.cost_matrix(x, P, R, detections_cxcywh)
+        rows, cols = linear_sum_assignment(cost)
+        valid = cost[rows, cols] <= self.max_cost
+        return rows[valid], cols[valid]
+
+    def _associate_sparse(self, x: np.ndarray, P: np.ndarray, R: np.ndarray, detections_cxcywh: np.ndarray,
+                          track_ids: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+        # the cost is at least distance_weight * distance / diagonal, so a valid match is within this radius
+        diagonal = np.maximum(np.hypot(x[:, 2], x[:, 3]), 1.0)
+        radius = diagonal * self.max_cost / self.distance_weight
+        # resize the cells with a little headroom, and only when they are too small or 1.3x the size needed:
+        # a stable cell size keeps the previous frame's order a good starting point for the grid's sort
+        cell_size = max(min(radius.max(), self.grid_max_cell_ratio * np.median(radius)), 1.0)
+        if not cell_size <= self.grid.cell_size <= 1.3 * cell_size:
+            self.grid.cell_size = 1.05 * cell_size
+
+        oversize = radius > self.grid.cell_size
+        if not oversize.any():
+            self.grid.update(x[:, :2], ids=track_ids)
+            track_index, detection_index = self.grid.candidate_pairs(detections_cxcywh[:, :2])
+        else:
+            indexed = np.flatnonzero(~oversize)
+            self.grid.update(x[indexed, :2], ids=None if track_ids is None else track_ids[indexed])
+            grid_tracks, grid_detections = self.grid.candidate_pairs(detections_cxcywh[:, :2])
+
+            # tracks too large for the grid: every detection within their radius
+            distance = np.hypot(x[oversize, None, 0] - detections_cxcywh[None, :, 0],
+                                x[oversize, None, 1] - detections_cxcywh[None, :, 1])
+            oversize_tracks, oversize_detections = np.nonzero(distance <= radius[oversize, None])
+
+            track_index = np.concatenate([indexed[grid_tracks], np.flatnonzero(oversize)[oversize_tracks]])
+            detection_index = np.concatenate([grid_detections, oversize_detections])
+
+        cost = self.pair_costs(x, P, R, detections_cxcywh, track_index, detection_index)
+        valid = cost <= self.max_cost
+        track_index, detection_index, cost = track_index[valid], detection_index[valid], cost[valid]
+        if len(cost) == 0:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+        # independent groups of tracks and detections linked by candidate pairs
+        n_tracks = len(x)
+        n_nodes = n_tracks + len(detections_cxcywh)
+        graph = coo_matrix((np.ones(len(cost)), (track_index, n_tracks + detection_index)), shape=(n_nodes, n_nodes))
+        _, labels = connected_components(graph, directed=False)
+        pair_labels = labels[track_index]
+
+        # a group with a single pair is a match without solving anything
+        single = np.bincount(pair_labels)[pair_labels] == 1
+        rows, cols = [track_index[single]], [detection_index[single]]
+
+        order = np.argsort(pair_labels[~single], kind="stable")
+        group_tracks = track_index[~single][order]
+        group_detections = detection_index[~single][order]
+        group_costs = cost[~single][order]
+        bounds = np.flatnonzero(np.diff(pair_labels[~single][order])) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(order)]):
+            tracks, track_local = np.unique(group_tracks[start:stop], return_inverse=True)
+            detections, detection_local = np.unique(group_detections[start:stop], return_inverse=True)
+            sub_cost = np.full((len(tracks), len(detections)), INVALID_COST)
+            sub_cost[track_local, detection_local] = group_costs[start:stop]
+
+            sub_rows, sub_cols = linear_sum_assignment(sub_cost)
+            matched = sub_cost[sub_rows, sub_cols] <= self.max_cost
+            rows.append(tracks[sub_rows[matched]])
+            cols.append(detections[sub_cols[matched]])
+
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def update(self, detections: list[Detection], frame: npt.NDArray[np.uint8] | None = None) -> list[Track]:
+        tracks = list(self.tracks.values())
+        detections_cxcywh = DetectionBatch.from_detections(detections).bboxes_cxcywh
+
+        matched_detections = np.zeros(len(detections), dtype=bool)
+        if tracks:
+            estimators = [t.estimator for t in tracks]
+            x, P = batch_predict(estimators)
+            R = estimators[0].R
+
+            track_ids = np.fromiter(self.tracks.keys(), dtype=np.int64, count=len(tracks))
+            rows, cols = self.associate(x, P, R, detections_cxcywh, track_ids=track_ids)
+            matched_detections[cols] = True
+
+            measurements = np.full((len(tracks), 4), np.nan)
+            measurements[rows] = detections_cxcywh[cols]
+            x, P = batch_update(x, P, R, measurements)
+
+            track_detections: list[Detection | None] = [None] * len(tracks)
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                track_detections[row] = detections[col]
+
+            for track, xi, Pi in zip(tracks, x, P):
+                track.estimator.x = xi[:, None]
+                track.estimator.P = Pi
+            states = batch_states(x, [t.estimator._is_initialized for t in tracks])
+            self.manager.update_tracks(tracks, track_detections, step_estimator=False, states=states)
+
+        for detection_index in np.flatnonzero(~matched_detections).tolist():
+            self.manager.create(detections[detection_index])
+
+        return list(self.tracks.values())
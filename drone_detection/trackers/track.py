@@ -19,23 +19,60 @@ class Track:
     state: dict[str, Any] = None
     state_history_max_length: int = 15
     state_history: deque[dict[str, Any]] | None = None
+    # the cached behaviour classification and threat score, see classifiers.ClassificationCadence
+    classification: dict[str, float] | None = dataclasses.field(default=None, repr=False)
+    threat_score: float | None = None
+    classified_state: dict[str, Any] | None = dataclasses.field(default=None, repr=False)
+    frames_since_classified: int = 0
 
     def __post_init__(self):
         self.state_history = deque(maxlen=self.state_history_max_length)
         self.estimator = KalmanFilter(dt=self.estimator_dt, Q=self.estimator_Q, R=self.estimator_R)
 
-    def update(self, detection: Detection | None = None):
+    def reset(self, track_id: int, detection: Detection):
+        """
+        Reinitializes the track in place for a new object, keeping the allocated estimator and history containers.
 
-        self.estimator.predict()
+        Args:
+            track_id: The new track id.
+            detection: The first detection of the new object.
+        """
+        self.track_id = track_id
+        self.detection = detection
+        self.time_since_last_seen = 0
+        self.history.clear()
+        self.state = None
+        self.state_history.clear()
+        self.estimator.reset()
+        self.classification = None
+        self.threat_score = None
+        self.classified_state = None
+        self.frames_since_classified = 0
+
+    def update(self, detection: Detection | None = None, step_estimator: bool = True,
+               state: dict[str, Any] | None = None):
+        """
+        Updates the track with the detection from the latest frame, or None if it was not detected.
+
+        Args:
+            detection: The matched detection, None if the track was not detected.
+            step_estimator: Predict and update the estimator. Set to False if the caller has already
+                            stepped the estimator, e.g. a tracker that updates all the filters as a batch.
+            state: The estimator's state if the caller already computed it, e.g. with batch_states.
+        """
+        if step_estimator:
+            self.estimator.predict()
+        self.frames_since_classified += 1
         if detection is None:
             self.time_since_last_seen += 1
             self.history.append(None)
         else:
             self.detection = detection
             self.time_since_last_seen = 0
-            self.estimator.update(bbox_cxcywh=detection.bbox_cxcywh)
+            if step_estimator:
+                self.estimator.update(bbox_cxcywh=detection.bbox_cxcywh)
 
-        self.state = self.estimator.get_state()
+        self.state = self.estimator.get_state() if state is None else state
         self.state_history.append(self.state)
 
     @property
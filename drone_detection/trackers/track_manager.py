@@ -0,0 +1,190 @@
+import enum
+from typing import Any, Callable, Hashable, Iterable
+
+from loguru import logger
+
+from ..detectors import Detection
+from .track import Track
+
+__all__ = ["TrackEvent", "TrackManager", "log_track_event"]
+
+
+class TrackEvent(enum.Enum):
+    CREATED = "created"
+    LOST = "lost"
+    REMOVED = "removed"
+
+
+TrackListener = Callable[[TrackEvent, Track], None]
+
+
+def log_track_event(event: TrackEvent, track: Track) -> None:
+    """The default listener, logs track creation and removal."""
+    if event is TrackEvent.CREATED:
+        logger.info(f"New Track: {track.track_id}")
+    elif event is TrackEvent.REMOVED:
+        logger.info(f"Removing Track: {track.track_id}")
+
+
+class TrackManager:
+    """
+    Owns the tracks of a tracker and their lifecycle: creating tracks, updating matched tracks, ageing
+    unmatched tracks and removing tracks that have not been seen for more than max_age frames.
+
+    Trackers only decide which detection belongs to which track id. Matching against the existing tracks
+    uses the track dictionary, so a frame costs O(tracks + detections). Removed Track objects are kept on a
+    free-list and reinitialized for the next new track rather than allocating a new Track and Kalman filter.
+    A removed Track may therefore be reused by a later frame; listeners that need it afterwards should
+    copy what they need when they receive the REMOVED event.
+
+    Listeners are called synchronously with (event, track) and should be cheap:
+        CREATED - a new track was created from its first detection.
+        LOST - a track was not matched in a frame after being matched in the previous one.
+        REMOVED - a track has not been matched for more than max_age frames and was removed.
+    """
+
+    def __init__(self,
+                 max_age: int = 5,
+                 track_kwargs: dict[str, Any] | None = None,
+                 max_free: int = 256,
+                 log_events: bool = True) -> None:
+        """
+        Initializes the track manager.
+
+        Args:
+            max_age: Remove a track after this many frames without a matched detection.
+            track_kwargs: Keyword arguments passed to each new Track.
+            max_free: Maximum number of removed Track objects kept for reuse, 0 to disable reuse.
+            log_events: Subscribe log_track_event to log track creation and removal.
+        """
+        self.max_age = max_age
+        self.track_kwargs = track_kwargs
+        if self.track_kwargs is None:
+            self.track_kwargs = {}
+        self.max_free = max_free
+
+        self.tracks: dict[Hashable, Track] = {}
+        self._free: list[Track] = []
+        self._next_id = 1
+        self._listeners: dict[TrackEvent, list[TrackListener]] = {event: [] for event in TrackEvent}
+        if log_events:
+            self.subscribe(log_track_event, [TrackEvent.CREATED, TrackEvent.REMOVED])
+
+    def subscribe(self, listener: TrackListener, events: Iterable[TrackEvent] | None = None) -> None:
+        """
+        Registers a listener for track lifecycle events.
+
+        Args:
+            listener: Called with (event, track).
+            events: The events to listen to, all events if None.
+        """
+        for event in (TrackEvent if events is None else events):
+            self._listeners[event].append(listener)
+
+    def unsubscribe(self, listener: TrackListener) -> None:
+        """Removes a listener from all events."""
+        for listeners in self._listeners.values():
+            while listener in listeners:
+                listeners.remove(listener)
+
+    def _emit(self, event: TrackEvent, track: Track) -> None:
+        for listener in self._listeners[event]:
+            listener(event, track)
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def __contains__(self, track_id: Hashable) -> bool:
+        return track_id in self.tracks
+
+    def new_track_id(self) -> int:
+        """Returns the next unused track id, for trackers that do not assign their own ids."""
+        track_id = self._next_id
+        self._next_id += 1
+        return track_id
+
+    def create(self, detection: Detection, track_id: Hashable | None = None) -> Track:
+        """
+        Creates a track from its first detection, reusing a removed Track if one is available.
+
+        Args:
+            detection: The first detection of the track.
+            track_id: The track id, a new id from new_track_id if None.
+
+        Returns:
+            The new track.
+        """
+        if track_id is None:
+            track_id = self.new_track_id()
+
+        if self._free:
+            track = self._free.pop()
+            track.reset(track_id=track_id, detection=detection)
+        else:
+            track = Track(track_id=track_id, detection=detection, **self.track_kwargs)
+        track.update(detection=detection)
+
+        self.tracks[track_id] = track
+        self._emit(TrackEvent.CREATED, track)
+        return track
+
+    def remove(self, track_id: Hashable) -> None:
+        """Removes a track and keeps the Track object for reuse."""
+        track = self.tracks.pop(track_id)
+        self._emit(TrackEvent.REMOVED, track)
+        if len(self._free) < self.max_free:
+            # drop the references to old frames held by the detections
+            track.history.clear()
+            self._free.append(track)
+
+    def update_tracks(self, tracks: list[Track], detections: list[Detection | None],
+                      step_estimator: bool = True, states: list[dict[str, Any]] | None = None) -> None:
+        """
+        Updates existing tracks with their matched detection, or None if they were not matched, then removes
+        the tracks that are too old.
+
+        Args:
+            tracks: The tracks to update.
+            detections: The matched detection of each track, or None.
+            step_estimator: Passed to Track.update. Set to False if the estimators were already stepped as a batch.
+            states: The state of each track's estimator if already computed as a batch, passed to Track.update.
+        """
+        if states is None:
+            states = [None] * len(tracks)
+        expired = []
+        for track, detection, state in zip(tracks, detections, states):
+            track.update(detection=detection, step_estimator=step_estimator, state=state)
+            if detection is None:
+                if track.time_since_last_seen == 1:
+                    self._emit(TrackEvent.LOST, track)
+                if track.time_since_last_seen > self.max_age:
+                    expired.append(track.track_id)
+
+        for track_id in expired:
+            self.remove(track_id)
+
+    def update(self, matches: Iterable[tuple[Hashable, Detection]]) -> list[Track]:
+        """
+        Applies a frame of (track id, detection) matches from a tracker that assigns its own track ids.
+        Unknown ids create new tracks, known ids are updated and every other track is aged.
+
+        Args:
+            matches: The (track id, detection) pairs of the frame.
+
+        Returns:
+            The current tracks.
+        """
+        matches = dict(matches)
+
+        # age and remove first, so removed tracks can be reused by this frame's new tracks
+        unmatched = [track for track_id, track in self.tracks.items() if track_id not in matches]
+        self.update_tracks(unmatched, [None] * len(unmatched))
+
+        for track_id, detection in matches.items():
+            track = self.tracks.get(track_id)
+            if track is None:
+                self.create(detection, track_id=track_id)
+            else:
+                track.update(detection=detection)
+
+        return list(self.tracks.values())
@@ -0,0 +1,254 @@
+"""
+Multi-object tracking metrics: MOTA, IDF1, ID switches and HOTA of tracker output against ground truth tracks,
+per sequence and combined over all the sequences, which are evaluated in parallel in a process pool.
+
+The tracker output is the JSON drone_detection/batch.py writes, one file per video. Ground truth is a
+MOTChallenge text file (frame, id, x, y, width, height[, considered, ...], frames from 1) or a JSON file in the
+batch format. Sequences are paired by file stem.
+
+python drone_detection/tracking_evaluation.py tracking_evaluation.gt_dir=<gt_dir>
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import dataclasses
+import json
+import math
+import os
+import pathlib
+from typing import Any
+
+import hydra
+import numpy as np
+from loguru import logger
+from numpy import typing as npt
+from omegaconf import DictConfig
+from scipy.optimize import linear_sum_assignment
+
+from drone_detection.utils import iou_matrix
+
+# HOTA localisation thresholds, as TrackEval
+HOTA_ALPHAS = np.arange(0.05, 0.96, 0.05)
+EPS = np.finfo(float).eps
+
+
+@dataclasses.dataclass()
+class Tracks:
+    """The boxes of a sequence, columnar: frame index, contiguous track id (0..n_ids-1) and [x1, y1, x2, y2]."""
+    frames: npt.NDArray[np.int64]
+    ids: npt.NDArray[np.int64]
+    bboxes_xyxy: npt.NDArray[np.float64]
+
+    @property
+    def n_ids(self) -> int:
+        return int(self.ids.max()) + 1 if len(self.ids) else 0
+
+    def by_frame(self) -> dict[int, tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]]:
+        order = np.argsort(self.frames, kind="stable")
+        frames, ids, boxes = self.frames[order], self.ids[order], self.bboxes_xyxy[order]
+        starts = np.flatnonzero(np.r_[True, frames[1:] != frames[:-1]])
+        ends = np.r_[starts[1:], len(frames)]
+        return {int(frames[s]): (ids[s:e], boxes[s:e]) for s, e in zip(starts, ends)}
+
+
+def _tracks(frames: list[int], ids: list[Any], boxes: list[list[float]]) -> Tracks:
+    _, contiguous = np.unique(np.array([str(i) for i in ids]), return_inverse=True)
+    return Tracks(frames=np.asarray(frames, dtype=np.int64),
+                  ids=contiguous.astype(np.int64).reshape(-1),
+                  bboxes_xyxy=np.asarray(boxes, dtype=float).reshape(-1, 4))
+
+
+def load_tracks(path: str | pathlib.Path) -> Tracks:
+    """
+    Reads tracks from a batch JSON file (frames from 0) or a MOTChallenge text file (frames from 1, rows with a
+    zero "considered" flag in the seventh column are dropped).
+    """
+    path = pathlib.Path(path)
+    if path.suffix == ".json":
+        with open(path) as f:
+            records = json.load(f)["records"]
+        return _tracks([r["frame"] for r in records], [r["track_id"] for r in records],
+                       [r["bbox_xyxy"] for r in records])
+
+    rows = np.loadtxt(path, delimiter=",", ndmin=2)
+    if rows.shape[1] >= 7:
+        rows = rows[rows[:, 6] != 0]
+    boxes = np.concatenate([rows[:, 2:4], rows[:, 2:4] + rows[:, 4:6]], axis=1)
+    return _tracks((rows[:, 0] - 1).astype(int).tolist(), rows[:, 1].astype(int).tolist(), boxes)
+
+
+def evaluate_sequence(gt: Tracks, predicted: Tracks, iou_threshold: float = 0.5) -> dict[str, Any]:
+    """
+    Computes the CLEAR MOT, identity and HOTA counts of one sequence.
+
+    Boxes are matched per frame by the Hungarian algorithm on IoU. For CLEAR MOT the match of the previous frame
+    is kept whenever its IoU is still at least iou_threshold, so an ID switch is only counted when the tracker
+    changes the id given to an object. IDF1 matches whole tracks, each ground truth track to the predicted track
+    it overlaps in the most frames. HOTA follows Luiten et al. 2020 (as TrackEval), at every alpha in HOTA_ALPHAS.
+
+    Returns:
+        The counts, which add across sequences, see combine.
+    """
+    gt_frames, pred_frames = gt.by_frame(), predicted.by_frame()
+    n_gt, n_pred = gt.n_ids, predicted.n_ids
+    empty = (np.zeros(0, dtype=np.int64), np.zeros((0, 4)))
+
+    # per frame: gt ids, predicted ids, IoU
+    frames = []
+    for frame in sorted(set(gt_frames) | set(pred_frames)):
+        gt_ids, gt_boxes = gt_frames.get(frame, empty)
+        pred_ids, pred_boxes = pred_frames.get(frame, empty)
+        frames.append((gt_ids, pred_ids, iou_matrix(gt_boxes, pred_boxes)))
+
+    # CLEAR MOT and the track overlap counts of IDF1
+    tp = id_switches = 0
+    previous = np.full(n_gt, -1)  # the predicted id each gt id was last matched to
+    overlap = np.zeros((n_gt, n_pred))
+    # HOTA: first the global alignment of each pair of ids, the soft overlap of their tracks
+    potential = np.zeros((n_gt, n_pred))
+    gt_id_count, pred_id_count = np.zeros(n_gt), np.zeros(n_pred)
+    for gt_ids, pred_ids, iou in frames:
+        gt_id_count[gt_ids] += 1
+        pred_id_count[pred_ids] += 1
+        if iou.size == 0:
+            continue
+        # keeping the previous frame's match outweighs any IoU
+        continuing = (previous[gt_ids][:, None] == pred_ids[None, :]) & (iou >= iou_threshold)
+        rows, cols = linear_sum_assignment(-(iou + 1000 * continuing))
+        ok = iou[rows, cols] >= iou_threshold - EPS
+        rows, cols = rows[ok], cols[ok]
+        matched_gt, matched_pred = gt_ids[rows], pred_ids[cols]
+        tp += len(rows)
+        id_switches += int(((previous[matched_gt] != -1) & (previous[matched_gt] != matched_pred)).sum())
+        previous[matched_gt] = matched_pred
+        overlap[gt_ids[:, None], pred_ids[None, :]] += iou >= iou_threshold - EPS
+
+        denominator = iou.sum(0)[None, :] + iou.sum(1)[:, None] - iou
+        potential[gt_ids[:, None], pred_ids[None, :]] += np.divide(iou, denominator, out=np.zeros_like(iou),
+                                                                   where=denominator > EPS)
+
+    gt_dets, pred_dets = len(gt.ids), len(predicted.ids)
+    rows, cols = linear_sum_assignment(-overlap) if overlap.size else (np.zeros(0, int), np.zeros(0, int))
+    idtp = float(overlap[rows, cols].sum())
+
+    # HOTA: match per frame by IoU weighted by the global alignment, count the matches at each alpha
+    alignment = potential / np.maximum(gt_id_count[:, None] + pred_id_count[None, :] - potential, EPS)
+    hota_tp = np.zeros(len(HOTA_ALPHAS))
+    loc = np.zeros(len(HOTA_ALPHAS))
+    matches = np.zeros((len(HOTA_ALPHAS), n_gt, n_pred))
+    for gt_ids, pred_ids, iou in frames:
+        if iou.size == 0:
+            continue
+        rows, cols = linear_sum_assignment(-(alignment[gt_ids[:, None], pred_ids[None, :]] * iou))
+        similarity = iou[rows, cols]
+        hit = similarity[None, :] >= HOTA_ALPHAS[:, None] - EPS
+        hota_tp += hit.sum(1)
+        loc += (hit * similarity[None, :]).sum(1)
+        for a in np.flatnonzero(hit.any(1)):
+            matches[a, gt_ids[rows[hit[a]]], pred_ids[cols[hit[a]]]] += 1
+    association = matches / np.maximum(gt_id_count[None, :, None] + pred_id_count[None, None, :] - matches, EPS)
+    # the association accuracy is the mean over the true positives, kept as a sum to combine sequences
+    ass_sum = (matches * association).sum(axis=(1, 2))
+
+    return {"gt_dets": gt_dets, "pred_dets": pred_dets, "gt_ids": n_gt, "pred_ids": n_pred,
+            "tp": tp, "fn": gt_dets - tp, "fp": pred_dets - tp, "id_switches": id_switches, "idtp": idtp,
+            "hota_tp": hota_tp, "hota_fn": gt_dets - hota_tp, "hota_fp": pred_dets - hota_tp,
+            "hota_ass_sum": ass_sum, "hota_loc_sum": loc}
+
+
+def combine(counts: list[dict[str, Any]]) -> dict[str, Any]:
+    """Adds the counts of several sequences."""
+    return {key: sum(c[key] for c in counts) for key in counts[0]} if counts else {}
+
+
+def metrics(counts: dict[str, Any]) -> dict[str, float]:
+    """MOTA, IDF1, HOTA and their components from the counts of evaluate_sequence or combine."""
+    gt_dets, pred_dets = counts["gt_dets"], counts["pred_dets"]
+    hota_tp = counts["hota_tp"]
+    det_a = hota_tp / np.maximum(hota_tp + counts["hota_fn"] + counts["hota_fp"], 1)
+    ass_a = counts["hota_ass_sum"] / np.maximum(hota_tp, 1)
+    loc_a = np.where(hota_tp > 0, counts["hota_loc_sum"] / np.maximum(hota_tp, 1), 1)
+    return {"MOTA": 1 - (counts["fn"] + counts["fp"] + counts["id_switches"]) / gt_dets if gt_dets else math.nan,
+            "IDF1": 2 * counts["idtp"] / (gt_dets + pred_dets) if gt_dets + pred_dets else math.nan,
+            "HOTA": float(np.sqrt(det_a * ass_a).mean()),
+            "DetA": float(det_a.mean()),
+            "AssA": float(ass_a.mean()),
+            "LocA": float(loc_a.mean()),
+            "recall": counts["tp"] / gt_dets if gt_dets else math.nan,
+            "precision": counts["tp"] / pred_dets if pred_dets else math.nan,
+            "id_switches": int(counts["id_switches"]),
+            "gt_ids": int(counts["gt_ids"]),
+            "pred_ids": int(counts["pred_ids"])}
+
+
+def _evaluate_files(gt_path: str, predicted_path: str, iou_threshold: float) -> dict[str, Any]:
+    return evaluate_sequence(load_tracks(gt_path), load_tracks(predicted_path), iou_threshold)
+
+
+def evaluate_sequences(pairs: dict[str, tuple[str | pathlib.Path, str | pathlib.Path]], iou_threshold: float = 0.5,
+                       workers: int | None = None) -> dict[str, dict[str, float]]:
+    """
+    Evaluates sequences in a process pool.
+
+    Args:
+        pairs: Sequence name -> (ground truth file, tracker output file).
+        iou_threshold: The IoU of a match for MOTA and IDF1.
+        workers: Processes, None for one per core, 0 to evaluate in this process.
+
+    Returns:
+        Sequence name -> metrics, and "COMBINED" -> the metrics of all the sequences together.
+    """
+    counts: dict[str, dict[str, Any]] = {}
+    if workers == 0 or len(pairs) <= 1:
+        for name, (gt_path, predicted_path) in pairs.items():
+            counts[name] = _evaluate_files(str(gt_path), str(predicted_path), iou_threshold)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(pairs))) as pool:
+            futures = {pool.submit(_evaluate_files, str(gt_path), str(predicted_path), iou_threshold): name
+                       for name, (gt_path, predicted_path) in pairs.items()}
+            for future in concurrent.futures.as_completed(futures):
+                counts[futures[future]] = future.result()
+
+    results = {name: metrics(counts[name]) for name in sorted(counts)}
+    if counts:
+        results["COMBINED"] = metrics(combine(list(counts.values())))
+    return results
+
+
+def pair_sequences(gt_dir: str | pathlib.Path,
+                   predictions_dir: str | pathlib.Path) -> dict[str, tuple[pathlib.Path, pathlib.Path]]:
+    """Pairs ground truth and tracker output files by stem, MOTChallenge <sequence>/gt/gt.txt included."""
+    gt_files = {p.stem: p for p in pathlib.Path(gt_dir).glob("*") if p.suffix in (".txt", ".json")}
+    gt_files.update({p.parents[1].name: p for p in pathlib.Path(gt_dir).glob("*/gt/gt.txt")})
+    predicted = {p.stem: p for p in pathlib.Path(predictions_dir).glob("*.json")}
+    for name in sorted(set(gt_files) ^ set(predicted)):
+        logger.warning(f"Sequence {name} has {'no tracker output' if name in gt_files else 'no ground truth'}")
+    return {name: (gt_files[name], predicted[name]) for name in sorted(set(gt_files) & set(predicted))}
+
+
+def format_report(results: dict[str, dict[str, float]]) -> str:
+    """A table of the metrics of each sequence."""
+    columns = ["HOTA", "DetA", "AssA", "MOTA", "IDF1", "recall", "precision", "id_switches"]
+    lines = [f"{'sequence':>20} " + " ".join(f"{c:>9}" for c in columns)]
+    for name, m in results.items():
+        lines.append(f"{name:>20} " + " ".join(f"{m[c]:>9}" if isinstance(m[c], int) else f"{m[c]:>9.3f}"
+                                               for c in columns))
+    return "\n".join(lines)
+
+
+@hydra.main(version_base=None, config_path="../config", config_name="config")
+def main(cfg: DictConfig):
+    evaluation = cfg.tracking_evaluation
+    pairs = pair_sequences(evaluation.gt_dir, evaluation.predictions_dir)
+    logger.info(f"Evaluating {len(pairs)} sequences")
+    results = evaluate_sequences(pairs, iou_threshold=evaluation.get("iou_threshold", 0.5),
+                                 workers=evaluation.get("workers"))
+    print(format_report(results))
+    if evaluation.get("output"):
+        with open(evaluation.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Wrote {evaluation.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Training data tools. The ultralytics integration lives in drone_detection.training.ultralytics_packed so this
+package imports without ultralytics.
+"""
+from .packed import *
@@ -0,0 +1,193 @@
+import concurrent.futures
+import json
+import math
+import pathlib
+from typing import Iterator
+
+import cv2
+import numpy as np
+from loguru import logger
+from numpy import typing as npt
+
+__all__ = ["PackedDataset", "pack_dataset", "packed_path"]
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# files of a packed dataset directory
+IMAGES_FILE = "images.bin"
+INDEX_FILE = "index.npy"
+LABELS_FILE = "labels.npy"
+LABEL_OFFSETS_FILE = "label_offsets.npy"
+META_FILE = "meta.json"
+
+
+def packed_path(images_dir: str | pathlib.Path, imgsz: int) -> pathlib.Path:
+    """The packed dataset directory for an images directory and training size, e.g. train/images_640.pack."""
+    images_dir = pathlib.Path(images_dir)
+    return images_dir.with_name(f"{images_dir.name}_{imgsz}.pack")
+
+
+def _resize_long_side(image: npt.NDArray[np.uint8], imgsz: int) -> npt.NDArray[np.uint8]:
+    """Resizes the long side to imgsz keeping the aspect ratio, like the ultralytics loader does before augmenting."""
+    h0, w0 = image.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r == 1:
+        return image
+    size = (min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz))
+    return cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+
+
+def _read_labels(path: pathlib.Path) -> npt.NDArray[np.float32]:
+    if not path.exists():
+        return np.zeros((0, 5), dtype=np.float32)
+    labels = np.loadtxt(path, dtype=np.float32, ndmin=2)
+    return labels[:, :5] if labels.size else np.zeros((0, 5), dtype=np.float32)
+
+
+def _source_signature(images_dir: pathlib.Path, labels_dir: pathlib.Path) -> dict[str, list[int | None]]:
+    """The size and mtime of every image file and of its label file (None if it has none), by image name."""
+    signature = {}
+    for path in sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS):
+        image = path.stat()
+        try:
+            label = (labels_dir / f"{path.stem}.txt").stat()
+            label_signature = [label.st_size, label.st_mtime_ns]
+        except FileNotFoundError:
+            label_signature = [None, None]
+        signature[path.name] = [image.st_size, image.st_mtime_ns, *label_signature]
+    return signature
+
+
+def pack_dataset(images_dir: str | pathlib.Path,
+                 imgsz: int = 640,
+                 labels_dir: str | pathlib.Path | None = None,
+                 output_dir: str | pathlib.Path | None = None,
+                 workers: int = 8) -> pathlib.Path:
+    """
+    Packs a YOLO image folder (the layout scripts/prepare_data.py writes) into one memory-mappable file.
+
+    Every image is decoded once, resized so its long side is imgsz (as the ultralytics loader would on every
+    epoch) and appended to images.bin. index.npy holds the byte offset, resized shape and original shape of each
+    image, and the YOLO labels (normalised, so unchanged by the resize) are stored in labels.npy with per-image
+    offsets in label_offsets.npy. meta.json records the size and mtime of every source image and label file, see
+    PackedDataset.is_current.
+
+    Args:
+        images_dir: The images directory.
+        imgsz: The training image size.
+        labels_dir: The YOLO labels directory, default the "labels" directory beside images_dir.
+        output_dir: The packed dataset directory, default packed_path(images_dir, imgsz).
+        workers: Decoding threads.
+
+    Returns:
+        The packed dataset directory.
+    """
+    images_dir = pathlib.Path(images_dir)
+    labels_dir = pathlib.Path(labels_dir) if labels_dir is not None else images_dir.with_name("labels")
+    output_dir = pathlib.Path(output_dir) if output_dir is not None else packed_path(images_dir, imgsz)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # taken before reading, so a file changed while packing makes the pack stale rather than silently outdated
+    sources = _source_signature(images_dir, labels_dir)
+    files = [images_dir / name for name in sources]
+
+    def load(path: pathlib.Path) -> tuple[npt.NDArray[np.uint8] | None, tuple[int, int]]:
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            return None, (0, 0)
+        return _resize_long_side(image, imgsz), image.shape[:2]
+
+    index, labels, names = [], [], []
+    offset = 0
+    # written through a temporary name, so an interrupted run never leaves a pack that looks complete
+    with open(output_dir / (IMAGES_FILE + ".tmp"), "wb") as f, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for path, (image, original_shape) in zip(files, pool.map(load, files)):
+            if image is None:
+                logger.warning(f"Skipping image that could not be decoded: {path}")
+                continue
+            f.write(np.ascontiguousarray(image).data)
+            index.append((offset, *image.shape[:2], *original_shape))
+            offset += image.nbytes
+            labels.append(_read_labels(labels_dir / f"{path.stem}.txt"))
+            names.append(path.name)
+
+    np.save(output_dir / INDEX_FILE, np.array(index, dtype=np.int64).reshape(-1, 5))
+    np.save(output_dir / LABELS_FILE, np.concatenate(labels) if labels else np.zeros((0, 5), dtype=np.float32))
+    np.save(output_dir / LABEL_OFFSETS_FILE, np.cumsum([0] + [len(lb) for lb in labels], dtype=np.int64))
+    (output_dir / (IMAGES_FILE + ".tmp")).replace(output_dir / IMAGES_FILE)
+    with open(output_dir / META_FILE, "w") as f:
+        json.dump({"imgsz": imgsz, "images_dir": str(images_dir.resolve()), "labels_dir": str(labels_dir.resolve()),
+                   "files": names, "sources": sources}, f)
+
+    logger.info(f"Packed {len(names)} images from {images_dir} at {imgsz} px into {output_dir} "
+                f"({offset / 2 ** 20:.0f} MiB)")
+    return output_dir
+
+
+class PackedDataset:
+    """
+    Read access to a dataset written by pack_dataset. Images are zero-copy, read-only views of the memory
+    mapped images.bin.
+    """
+
+    def __init__(self, path: str | pathlib.Path) -> None:
+        self.path = pathlib.Path(path)
+        if not (self.path / META_FILE).exists():
+            raise FileNotFoundError(f"No packed dataset at {self.path}")
+        with open(self.path / META_FILE) as f:
+            meta = json.load(f)
+        self.imgsz: int = meta["imgsz"]
+        self.images_dir = pathlib.Path(meta["images_dir"])
+        self.labels_dir = pathlib.Path(meta["labels_dir"]) if "labels_dir" in meta else None
+        self.sources: dict[str, list[int | None]] | None = meta.get("sources")
+        self.files = [self.images_dir / name for name in meta["files"]]
+        self.index = np.load(self.path / INDEX_FILE)
+        self._labels = np.load(self.path / LABELS_FILE)
+        self._label_offsets = np.load(self.path / LABEL_OFFSETS_FILE)
+        self._images = self._map()
+
+    def is_current(self) -> bool:
+        """
+        Whether the source images and labels are unchanged since the pack was written: the same files, with the
+        same sizes and mtimes. Packs written without the source list are never current.
+        """
+        if self.sources is None or self.labels_dir is None:
+            return False
+        try:
+            return _source_signature(self.images_dir, self.labels_dir) == self.sources
+        except FileNotFoundError:
+            return False
+
+    def _map(self) -> npt.NDArray[np.uint8]:
+        if (self.path / IMAGES_FILE).stat().st_size == 0:
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(self.path / IMAGES_FILE, dtype=np.uint8, mode="r")
+
+    def __getstate__(self) -> dict:
+        # a pickled memmap carries a copy of its data, data loader workers map the file again instead
+        return {**self.__dict__, "_images": None}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._images = self._map()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def image(self, i: int) -> npt.NDArray[np.uint8]:
+        """The resized BGR image, a view of the memory map."""
+        offset, height, width = self.index[i, :3].tolist()
+        return self._images[offset:offset + height * width * 3].reshape(height, width, 3)
+
+    def original_shape(self, i: int) -> tuple[int, int]:
+        """The (height, width) of the image before it was resized."""
+        return tuple(self.index[i, 3:5].tolist())
+
+    def labels(self, i: int) -> npt.NDArray[np.float32]:
+        """The (K, 5) YOLO labels of an image: class, x centre, y centre, width, height, normalised."""
+        return self._labels[self._label_offsets[i]:self._label_offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[tuple[npt.NDArray[np.uint8], npt.NDArray[np.float32]]]:
+        for i in range(len(self)):
+            yield self.image(i), self.labels(i)
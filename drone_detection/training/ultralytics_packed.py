@@ -0,0 +1,154 @@
+"""
+Ultralytics integration of the packed training image cache: a YOLODataset that reads images and labels from a
+pack_dataset directory instead of decoding JPEGs, and a trainer and validator that build it.
+
+    model = YOLO("yolo11s.pt")
+    model.train(data="data/drone.yaml", imgsz=640, trainer=PackedDetectionTrainer)
+    model.val(data="data/drone.yaml", imgsz=640, validator=PackedDetectionValidator)
+
+The pack of each images directory is written beside it (see packed_path) on first use and reused afterwards, until
+an image or label file is added, removed or modified.
+"""
+from __future__ import annotations
+
+import pathlib
+from typing import Any
+
+import cv2
+import numpy as np
+from loguru import logger
+from ultralytics.data import YOLODataset
+from ultralytics.data.build import build_yolo_dataset
+from ultralytics.data.utils import get_split_fraction
+from ultralytics.models.yolo.detect import DetectionTrainer, DetectionValidator
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import unwrap_model
+
+from .packed import PackedDataset, pack_dataset, packed_path
+
+__all__ = ["PackedYOLODataset", "PackedDetectionTrainer", "PackedDetectionValidator", "build_packed_dataset"]
+
+
+def open_pack(images_dir: str | pathlib.Path, imgsz: int) -> PackedDataset:
+    """Opens the pack of an images directory at imgsz, packing it first if there is none or it is out of date."""
+    path = packed_path(images_dir, imgsz)
+    try:
+        pack = PackedDataset(path)
+        if pack.is_current():
+            return pack
+        logger.info(f"Repacking {images_dir}: the images or labels changed since {path} was written")
+    except FileNotFoundError:
+        pass
+    return PackedDataset(pack_dataset(images_dir, imgsz=imgsz, output_dir=path))
+
+
+class PackedYOLODataset(YOLODataset):
+    """
+    A YOLODataset over a packed images directory. Images come from the memory map already resized, so the
+    loader only copies them (training augmentations write in place) or, for validation, passes the mapped view
+    straight to the letterbox. Augmentations and labels are the same as YOLODataset's.
+    """
+
+    def get_img_files(self, img_path: str | list[str]) -> list[str]:
+        self.pack = open_pack(img_path, self.imgsz)
+        count = self.fraction if isinstance(self.fraction, int) else max(1, round(len(self.pack) * self.fraction))
+        return [str(f) for f in self.pack.files[:count]]
+
+    def get_labels(self) -> list[dict[str, Any]]:
+        # rect mode re-sorts im_files and labels by aspect ratio, so each label keeps the index of its pack entry
+        labels = []
+        for i, im_file in enumerate(self.im_files):
+            lb = self.pack.labels(i)
+            labels.append({"im_file": im_file,
+                           "pack_index": i,
+                           "shape": self.pack.original_shape(i),
+                           "cls": lb[:, 0:1].copy(),
+                           "bboxes": lb[:, 1:5].copy(),
+                           "segments": [],
+                           "keypoints": None,
+                           "normalized": True,
+                           "bbox_format": "xywh"})
+        return labels
+
+    def get_image_and_label(self, index: int) -> dict[str, Any]:
+        label = super().get_image_and_label(index)
+        # not a key the transforms or collate_fn expect
+        label.pop("pack_index", None)
+        return label
+
+    def load_image(self, i: int, rect_mode: bool = True,
+                   resize_short: bool = False) -> tuple[np.ndarray, tuple[int, int], tuple[int, int]]:
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+        if not rect_mode or resize_short:
+            # resizes the pack does not hold come from the image files
+            return super().load_image(i, rect_mode=rect_mode, resize_short=resize_short)
+
+        pack_index = self.labels[i]["pack_index"]
+        im, hw0 = self.pack.image(pack_index), self.pack.original_shape(pack_index)
+        if self.pack.imgsz != self.imgsz:
+            r = self.imgsz / max(hw0)
+            size = (min(int(np.ceil(hw0[1] * r)), self.imgsz), min(int(np.ceil(hw0[0] * r)), self.imgsz))
+            im = cv2.resize(im, size, interpolation=cv2.INTER_LINEAR)
+        elif self.augment:
+            im = im.copy()
+
+        # the mosaic buffer, as YOLODataset.load_image keeps it
+        if self.augment and self.cache != "ram":
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, im.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, hw0, im.shape[:2]
+
+
+def build_packed_dataset(cfg: Any, img_path: str | list[str], batch: int, data: dict[str, Any], mode: str = "train",
+                         rect: bool = False, stride: int = 32, fraction: float | None = None) -> YOLODataset:
+    """
+    build_yolo_dataset with a PackedYOLODataset. Image lists and non-detection tasks are not packed and fall
+    back to build_yolo_dataset.
+    """
+    if cfg.task != "detect" or not (isinstance(img_path, (str, pathlib.Path)) and pathlib.Path(img_path).is_dir()):
+        logger.warning(f"Not packing {img_path}: only directories of a detection dataset are packed")
+        return build_yolo_dataset(cfg, img_path, batch, data, mode=mode, rect=rect, stride=stride,
+                                  fraction=fraction)
+    if data.get("complete"):
+        fraction = 1.0
+    elif fraction is None:
+        fraction = get_split_fraction(cfg.fraction, "train" if mode == "train" else cfg.split)
+    return PackedYOLODataset(img_path=str(img_path),
+                             imgsz=cfg.imgsz,
+                             batch_size=batch,
+                             augment=mode == "train",
+                             hyp=cfg,
+                             rect=cfg.rect or rect,
+                             cache=cfg.cache or None,
+                             single_cls=cfg.single_cls or False,
+                             stride=stride,
+                             pad=0.0 if mode == "train" else 0.5,
+                             prefix=colorstr(f"{mode}: "),
+                             task=cfg.task,
+                             classes=cfg.classes,
+                             data=data,
+                             fraction=fraction)
+
+
+class PackedDetectionTrainer(DetectionTrainer):
+    """
+    A DetectionTrainer whose train and validation datasets read from the packed image cache. The validation run
+    after each epoch uses the trainer's validation loader, so it reads from the pack as well.
+    """
+
+    def build_dataset(self, img_path: str, mode: str = "train", batch: int | None = None) -> YOLODataset:
+        gs = max(int(unwrap_model(self.model).stride.max()), 32)
+        return build_packed_dataset(self.args, img_path, batch, self.data, mode=mode, rect=mode == "val", stride=gs)
+
+
+class PackedDetectionValidator(DetectionValidator):
+    """A DetectionValidator whose dataset reads from the packed image cache."""
+
+    def build_dataset(self, img_path: str, mode: str = "val", batch: int | None = None) -> YOLODataset:
+        fraction = get_split_fraction(self.args.fraction, self.args.split or "val")
+        return build_packed_dataset(self.args, img_path, batch, self.data, mode=mode, stride=self.stride,
+                                    fraction=fraction)
@@ -1,2 +1,12 @@
 from .draw import *
-from .bbox import *
\ No newline at end of file
+from .bbox import *
+from .geometry import *
+from .spatial import *
+from .model_registry import *
+from .plugins import *
+from .runtime import *
+from .realtime import *
+from .scheduler import *
+from .metrics import *
+from .profiling import *
+from .overlay import *
@@ -1,9 +1,18 @@
+import functools
+
 import cv2
 import math
 import numpy as np
 from numpy import typing as npt
 
 
+@functools.lru_cache(maxsize=4096)
+def _text_size(text: str, font_scale: float, thickness: int,
+               font: int = cv2.FONT_HERSHEY_SIMPLEX) -> tuple[tuple[int, int], int]:
+    """cv2.getTextSize, cached: the same labels are laid out every frame."""
+    return cv2.getTextSize(text, font, font_scale, thickness)
+
+
 def draw_bbox(image: npt.NDArray[np.uint8], bbox_xyxy: tuple[float | int, ...],
               confidence: float | None = None, colour=(0, 255, 0),
               thickness=2) -> np.ndarray:
@@ -30,6 +39,26 @@ def draw_bbox(image: npt.NDArray[np.uint8], bbox_xyxy: tuple[float | int, ...],
     return image
 
 
+def draw_bboxes(image: npt.NDArray[np.uint8], bboxes_xyxy: npt.ArrayLike,
+                colour=(0, 255, 0), thickness=1) -> np.ndarray:
+    """
+    Draws many bounding boxes on an image.
+
+    Args:
+        image: The image to draw on.
+        bboxes_xyxy: An (N, 4) array of bounding boxes, e.g. DetectionBatch.bboxes_xyxy.
+        colour: The color of the bounding boxes.
+        thickness: The thickness of the bounding box lines.
+
+    Returns:
+        The image with the bounding boxes drawn on it.
+    """
+    corners = np.rint(np.asarray(bboxes_xyxy, dtype=float).reshape(-1, 4)).astype(int).tolist()
+    for x1, y1, x2, y2 in corners:
+        cv2.rectangle(image, (x1, y1), (x2, y2), colour, thickness)
+    return image
+
+
 def draw_track(image: np.ndarray,
                bbox_xyxy: tuple[float | int, ...], track_id: int,
                velocity_xy: tuple[float, float] | None = None,
@@ -103,7 +132,7 @@ def draw_classification(image: np.ndarray, bbox_xyxy: tuple[int, ...], classific
     for class_name, probability in classifications.items():
         label = f"{class_name[0]}"
         # Get the width of the text label
-        text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_size, thickness)[0]
+        text_size = _text_size(label, font_size, thickness)[0]
         text_width = text_size[0]
 
         # Position the text
@@ -218,9 +247,7 @@ def draw_threat_scores(
         # 3. Prepare the text and calculate box size
         text = f"[{label}] Threat Score: {int(round(score))}"
 
-        (text_width, text_height), baseline = cv2.getTextSize(
-            text, font, font_scale, thickness
-        )
+        (text_width, text_height), baseline = _text_size(text, font_scale, thickness, font)
 
         # 4. Define box and text positions
         # Box top-left corner
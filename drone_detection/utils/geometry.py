@@ -0,0 +1,183 @@
+import numpy as np
+from numpy import typing as npt
+
+__all__ = ["boxes_xyxy_to_xywh", "boxes_xywh_to_xyxy", "boxes_xyxy_to_cxcywh", "boxes_cxcywh_to_xyxy",
+           "clip_boxes", "box_areas", "iou_matrix", "iou_pairs", "giou_matrix", "nms"]
+
+
+def boxes_xyxy_to_xywh(boxes: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Convert an (N, 4) array of bounding boxes from [x1, y1, x2, y2] to [x, y, width, height].
+
+    Args:
+        boxes: Bounding boxes in [x1, y1, x2, y2] format.
+
+    Returns:
+        An (N, 4) array of bounding boxes in [x, y, width, height] format.
+    """
+    boxes = np.asarray(boxes, dtype=float)
+    return np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+
+
+def boxes_xywh_to_xyxy(boxes: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Convert an (N, 4) array of bounding boxes from [x, y, width, height] to [x1, y1, x2, y2].
+
+    Args:
+        boxes: Bounding boxes in [x, y, width, height] format.
+
+    Returns:
+        An (N, 4) array of bounding boxes in [x1, y1, x2, y2] format.
+    """
+    boxes = np.asarray(boxes, dtype=float)
+    return np.concatenate([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]], axis=1)
+
+
+def boxes_xyxy_to_cxcywh(boxes: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Convert an (N, 4) array of bounding boxes from [x1, y1, x2, y2] to [center_x, center_y, width, height].
+
+    Args:
+        boxes: Bounding boxes in [x1, y1, x2, y2] format.
+
+    Returns:
+        An (N, 4) array of bounding boxes in [center_x, center_y, width, height] format.
+    """
+    boxes = np.asarray(boxes, dtype=float)
+    return np.concatenate([(boxes[:, :2] + boxes[:, 2:]) / 2, boxes[:, 2:] - boxes[:, :2]], axis=1)
+
+
+def boxes_cxcywh_to_xyxy(boxes: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Convert an (N, 4) array of bounding boxes from [center_x, center_y, width, height] to [x1, y1, x2, y2].
+
+    Args:
+        boxes: Bounding boxes in [center_x, center_y, width, height] format.
+
+    Returns:
+        An (N, 4) array of bounding boxes in [x1, y1, x2, y2] format.
+    """
+    boxes = np.asarray(boxes, dtype=float)
+    half = boxes[:, 2:] / 2
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+
+def clip_boxes(boxes: npt.ArrayLike, width: int, height: int) -> npt.NDArray[np.float64]:
+    """
+    Clip an (N, 4) array of [x1, y1, x2, y2] bounding boxes to a frame.
+
+    Args:
+        boxes: Bounding boxes in [x1, y1, x2, y2] format.
+        width: Frame width.
+        height: Frame height.
+
+    Returns:
+        An (N, 4) array of clipped bounding boxes.
+    """
+    boxes = np.asarray(boxes, dtype=float)
+    return np.clip(boxes, 0, [width, height, width, height])
+
+
+def box_areas(boxes: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Returns the (N,) areas of an (N, 4) array of [x1, y1, x2, y2] bounding boxes.
+    """
+    boxes = np.asarray(boxes, dtype=float)
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def _intersection_union(boxes_a: npt.NDArray[np.float64],
+                        boxes_b: npt.NDArray[np.float64]) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    width = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2]) - np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    height = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3]) - np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    intersection = np.clip(width, 0, None) * np.clip(height, 0, None)
+    union = box_areas(boxes_a)[:, None] + box_areas(boxes_b)[None, :] - intersection
+    return intersection, union
+
+
+def iou_matrix(boxes_a: npt.ArrayLike, boxes_b: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Computes the intersection over union of every pair of boxes.
+
+    Args:
+        boxes_a: An (N, 4) array of [x1, y1, x2, y2] bounding boxes.
+        boxes_b: An (M, 4) array of [x1, y1, x2, y2] bounding boxes.
+
+    Returns:
+        An (N, M) array of IoU values in [0, 1].
+    """
+    boxes_a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+    intersection, union = _intersection_union(boxes_a, boxes_b)
+    return intersection / np.maximum(union, 1e-9)
+
+
+def iou_pairs(boxes_a: npt.ArrayLike, boxes_b: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Computes the intersection over union of corresponding boxes, e.g. for a sparse set of candidate pairs.
+
+    Args:
+        boxes_a: An (N, 4) array of [x1, y1, x2, y2] bounding boxes.
+        boxes_b: An (N, 4) array of [x1, y1, x2, y2] bounding boxes.
+
+    Returns:
+        An (N,) array of IoU values in [0, 1].
+    """
+    boxes_a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+    width = np.minimum(boxes_a[:, 2], boxes_b[:, 2]) - np.maximum(boxes_a[:, 0], boxes_b[:, 0])
+    height = np.minimum(boxes_a[:, 3], boxes_b[:, 3]) - np.maximum(boxes_a[:, 1], boxes_b[:, 1])
+    intersection = np.clip(width, 0, None) * np.clip(height, 0, None)
+    union = box_areas(boxes_a) + box_areas(boxes_b) - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+def giou_matrix(boxes_a: npt.ArrayLike, boxes_b: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Computes the generalised intersection over union of every pair of boxes.
+    Unlike IoU it is still informative for boxes that do not overlap.
+
+    Args:
+        boxes_a: An (N, 4) array of [x1, y1, x2, y2] bounding boxes.
+        boxes_b: An (M, 4) array of [x1, y1, x2, y2] bounding boxes.
+
+    Returns:
+        An (N, M) array of GIoU values in [-1, 1].
+    """
+    boxes_a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+    intersection, union = _intersection_union(boxes_a, boxes_b)
+    union = np.maximum(union, 1e-9)
+
+    # area of the smallest box enclosing both boxes
+    width = np.maximum(boxes_a[:, None, 2], boxes_b[None, :, 2]) - np.minimum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    height = np.maximum(boxes_a[:, None, 3], boxes_b[None, :, 3]) - np.minimum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    enclosing = np.maximum(width * height, 1e-9)
+
+    return intersection / union - (enclosing - union) / enclosing
+
+
+def nms(boxes: npt.ArrayLike, scores: npt.ArrayLike, iou_threshold: float = 0.5) -> npt.NDArray[np.int64]:
+    """
+    Class agnostic non-maximum suppression.
+
+    Args:
+        boxes: An (N, 4) array of [x1, y1, x2, y2] bounding boxes.
+        scores: An (N,) array of scores.
+        iou_threshold: Boxes overlapping a higher scoring kept box by more than this are suppressed.
+
+    Returns:
+        The indices of the kept boxes, highest score first.
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    order = np.argsort(-np.asarray(scores, dtype=float), kind="stable")
+    overlaps = iou_matrix(boxes[order], boxes[order]) > iou_threshold
+
+    suppressed = np.zeros(len(order), dtype=bool)
+    keep = []
+    for i in range(len(order)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= overlaps[i]
+    return order[keep]
@@ -0,0 +1,283 @@
+import bisect
+import http.server
+import json
+import math
+import os
+import pathlib
+import threading
+import time
+
+from loguru import logger
+
+__all__ = ["Counter", "Gauge", "Histogram", "MetricsRegistry", "MetricsExporter", "METRICS", "LATENCY_BUCKETS",
+           "COUNT_BUCKETS"]
+
+# histogram buckets (upper bounds) for stage latencies in seconds and for per-frame counts
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: tuple[tuple[str, str], ...]) -> None:
+        self._registry = registry
+        self.name = name
+        self.labels = labels
+
+
+class Counter(_Metric):
+    """A value that only goes up, e.g. frames processed."""
+    kind = "counter"
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        if self._registry.enabled:
+            self.value += amount
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        return [(self.name + "_total", _format_labels(self.labels), self.value)]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. active tracks."""
+    kind = "gauge"
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        if self._registry.enabled:
+            self.value = value
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        return [(self.name, _format_labels(self.labels), self.value)]
+
+
+class Histogram(_Metric):
+    """Observations counted in buckets, with their sum and count, e.g. stage latency."""
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets))
+        # per bucket counts, not cumulative, the last is +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        if self._registry.enabled:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> "_Timer":
+        """A context manager that observes the duration of its body in seconds."""
+        return _Timer(self)
+
+    def quantile(self, q: float) -> float:
+        """An estimate of the q quantile, the upper bound of the bucket it falls in."""
+        if self.count == 0:
+            return math.nan
+        target, total = q * self.count, 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            if total >= target:
+                return bound
+        return math.inf
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        samples, total = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), list(self.counts)):
+            total += count
+            le = "+Inf" if bound == math.inf else repr(bound)
+            samples.append((self.name + "_bucket", _format_labels(self.labels, f'le="{le}"'), total))
+        samples.append((self.name + "_sum", _format_labels(self.labels), self.sum))
+        samples.append((self.name + "_count", _format_labels(self.labels), total))
+        return samples
+
+
+class _Timer:
+    # a plain class rather than contextlib.contextmanager, which costs several times more per use
+    __slots__ = ("histogram", "t0")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self.histogram = histogram
+
+    def __enter__(self) -> None:
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.t0)
+
+
+class MetricsRegistry:
+    """
+    The pipeline's counters, gauges and histograms, rendered in the Prometheus text format.
+
+    Metrics are created once, by name and labels, and updated with plain attribute arithmetic, no locks: the
+    pipeline updates them from its own thread and the exporter only reads them. When the registry is disabled
+    the update methods return straight away.
+    """
+
+    def __init__(self, prefix: str = "drone_", enabled: bool = True) -> None:
+        self.prefix = prefix
+        self.enabled = enabled
+        self._metrics: dict[tuple[str, tuple[tuple[str, str], ...]], _Metric] = {}
+        self._help: dict[str, tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls: type, name: str, help: str, labels: dict[str, str], **kwargs) -> _Metric:
+        name = self.prefix + name
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    if self._help.get(name, (cls.kind,))[0] != cls.kind:
+                        raise ValueError(f"Metric {name} is already registered as a {self._help[name][0]}")
+                    metric = self._metrics[key] = cls(self, name, key[1], **kwargs)
+                    self._help.setdefault(name, (cls.kind, help))
+        return metric
+
+    def counter(self, name: str, help: str = "", **labels: str) -> Counter:
+        """Returns the counter of this name and labels, creating it on first use."""
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels: str) -> Gauge:
+        """Returns the gauge of this name and labels, creating it on first use."""
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str = "", buckets: tuple[float, ...] = LATENCY_BUCKETS,
+                  **labels: str) -> Histogram:
+        """Returns the histogram of this name and labels, creating it on first use."""
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, (kind, help) in sorted(self._help.items()):
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric_name, _), metric in sorted(self._metrics.items()):
+                if metric_name == name:
+                    lines.extend(f"{sample}{labels} {float(value)!r}" for sample, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, float]:
+        """The current value of every sample, keyed by sample name and labels."""
+        return {sample + labels: value for metric in list(self._metrics.values())
+                for sample, labels, value in metric.samples()}
+
+    def clear(self) -> None:
+        """Removes every metric."""
+        with self._lock:
+            self._metrics.clear()
+            self._help.clear()
+
+
+# the process wide registry the pipeline components record to
+METRICS = MetricsRegistry()
+
+
+class MetricsExporter:
+    """
+    Exposes a registry on a local HTTP /metrics endpoint and/or dumps it to a file periodically, from background
+    threads, so a scrape or a dump never blocks the pipeline.
+    """
+
+    def __init__(self,
+                 registry: MetricsRegistry = METRICS,
+                 host: str = "127.0.0.1",
+                 port: int | None = None,
+                 dump_path: str | None = None,
+                 dump_interval: float = 10.0,
+                 **kwargs) -> None:
+        """
+        Args:
+            registry: The registry to export.
+            host: The address the endpoint listens on, local only by default.
+            port: The endpoint port, None for no endpoint, 0 for any free port (see `port` after start).
+            dump_path: File the metrics are written to every dump_interval seconds and on stop, None for no
+                       dumps. A .json suffix writes a JSON snapshot, anything else the Prometheus text format.
+            dump_interval: Seconds between dumps.
+            **kwargs: Additional keyword arguments.
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.dump_path = pathlib.Path(dump_path) if dump_path else None
+        self.dump_interval = dump_interval
+        self._server: http.server.ThreadingHTTPServer | None = None
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+
+    def start(self) -> "MetricsExporter":
+        if self.port is not None:
+            registry = self.registry
+
+            class Handler(http.server.BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = registry.render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format: str, *args) -> None:
+                    logger.trace(format % args)
+
+            self._server = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+            self.port = self._server.server_address[1]
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name="metrics-http",
+                                                  daemon=True))
+            logger.info(f"Metrics at http://{self.host}:{self.port}/metrics")
+        if self.dump_path is not None:
+            self._threads.append(threading.Thread(target=self._dump_loop, name="metrics-dump", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def dump(self) -> None:
+        """Writes the metrics to dump_path, through a temporary file so readers never see a partial dump."""
+        if self.dump_path.suffix == ".json":
+            text = json.dumps({"time": time.time(), "metrics": self.registry.snapshot()})
+        else:
+            text = self.registry.render()
+        self.dump_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.dump_path.with_name(self.dump_path.name + ".tmp")
+        tmp.write_text(text)
+        os.replace(tmp, self.dump_path)
+
+    def _dump_loop(self) -> None:
+        while not self._stop.wait(self.dump_interval):
+            self.dump()
+
+    def stop(self) -> None:
+        """Stops the endpoint and writes a last dump."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+        if self.dump_path is not None:
+            self.dump()
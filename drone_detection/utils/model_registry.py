@@ -0,0 +1,149 @@
+import contextlib
+import copy
+import functools
+import pathlib
+import threading
+from typing import Any, Callable
+
+import numpy as np
+from loguru import logger
+
+__all__ = ["ModelRegistry", "MODEL_REGISTRY", "get_model"]
+
+
+_shared_lock = threading.Lock()
+_shared_depth: dict[int, int] = {}
+
+
+@contextlib.contextmanager
+def _shared_network(network: Any):
+    """
+    Makes deep copies of the network return the network itself inside the block.
+
+    Every ultralytics predictor deep copies the network it wraps when it is set up, so inside this block the
+    handles' predictors are built around one shared set of weights. Outside it deep copies are real copies.
+    A deep copy made by another thread while a handle is predicting is still aliased, which is why registry
+    handles refuse to train or export.
+    """
+    key = id(network)
+    with _shared_lock:
+        if _shared_depth.setdefault(key, 0) == 0:
+            network.__deepcopy__ = lambda memo: network
+        _shared_depth[key] += 1
+    try:
+        yield
+    finally:
+        with _shared_lock:
+            _shared_depth[key] -= 1
+            if _shared_depth[key] == 0:
+                del network.__deepcopy__
+                del _shared_depth[key]
+
+
+def _shared_predict(handle: Any, *args, **kwargs) -> Any:
+    # model.track and model(...) also predict through handle.predict
+    with _shared_network(handle.model):
+        return type(handle).predict(handle, *args, **kwargs)
+
+
+def _inference_only(name: str) -> Callable[..., Any]:
+    def refuse(*args, **kwargs) -> Any:
+        raise RuntimeError(f"Registry models share their weights and are for inference only, cannot {name}. "
+                           f"Load the weights with ultralytics.YOLO to {name}.")
+    return refuse
+
+
+def _load_ultralytics(model_path: str, device: str | None, warmup_imgsz: int | None) -> Any:
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    if warmup_imgsz:
+        # builds a predictor, fuses the layers and moves the weights to the device once for every handle
+        with _shared_network(model.model):
+            model.predict(np.zeros((warmup_imgsz, warmup_imgsz, 3), dtype=np.uint8), verbose=False, device=device)
+    return model
+
+
+def _ultralytics_handle(model: Any) -> Any:
+    from ultralytics.utils import callbacks
+
+    # A handle shares the network weights but has its own predictor and callbacks. model.track registers
+    # tracker callbacks on the model, which must not leak into a detector sharing the same weights.
+    handle = copy.copy(model)
+    handle.callbacks = callbacks.get_default_callbacks()
+    handle.overrides = dict(model.overrides)
+    handle.predictor = None
+    handle.predict = functools.partial(_shared_predict, handle)
+    # training or exporting would modify or copy the weights every other handle predicts with
+    handle.train = _inference_only("train")
+    handle.export = _inference_only("export")
+    return handle
+
+
+# backend name -> (load the model once, create a handle to the loaded model)
+BACKENDS: dict[str, tuple[Callable[[str, str | None, int | None], Any], Callable[[Any], Any]]] = {
+    "ultralytics": (_load_ultralytics, _ultralytics_handle),
+}
+
+
+class ModelRegistry:
+    """
+    A process wide cache of loaded models, keyed by weights path, backend and device.
+
+    Each model is loaded and warmed up once. Every call to get returns a new lightweight handle that shares
+    the loaded weights, so a detector and a tracker using the same weights do not each hold a copy. Handles are for
+    inference only, ultralytics handles refuse to train or export.
+    """
+
+    def __init__(self, warmup_imgsz: int | None = 640) -> None:
+        """
+        Initializes an empty registry.
+
+        Args:
+            warmup_imgsz: Size of the blank image used to warm up each model when it is loaded, None to disable.
+        """
+        self.warmup_imgsz = warmup_imgsz
+        self._models: dict[tuple[str, str, str | None], Any] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def __contains__(self, key: tuple[str, str, str | None]) -> bool:
+        return key in self._models
+
+    def get(self, model_path: str | pathlib.Path, backend: str = "ultralytics", device: str | None = None) -> Any:
+        """
+        Returns a handle to a model, loading it on first use.
+
+        Args:
+            model_path: Path to the weights.
+            backend: The library used to load and run the model, one of BACKENDS.
+            device: The device to run on, e.g. "cpu" or "cuda:0". None lets the backend choose.
+
+        Returns:
+            A model handle that shares its weights with every other handle to the same key.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend {backend}")
+        load, handle = BACKENDS[backend]
+
+        key = (str(pathlib.Path(model_path).resolve()), backend, None if device is None else str(device))
+        with self._lock:
+            if key not in self._models:
+                logger.info(f"Loading model {key[0]} ({backend}, device={device})")
+                self._models[key] = load(key[0], device, self.warmup_imgsz)
+            return handle(self._models[key])
+
+    def clear(self) -> None:
+        """Drops the registry's references to all loaded models."""
+        with self._lock:
+            self._models.clear()
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+
+def get_model(model_path: str | pathlib.Path, backend: str = "ultralytics", device: str | None = None) -> Any:
+    """Returns a handle to a model from the process wide MODEL_REGISTRY, see ModelRegistry.get."""
+    return MODEL_REGISTRY.get(model_path, backend=backend, device=device)
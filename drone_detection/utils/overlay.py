@@ -0,0 +1,171 @@
+from typing import Any, Iterable
+
+import cv2
+import numpy as np
+from numpy import typing as npt
+
+from .draw import _text_size, draw_bboxes
+
+__all__ = ["OverlayRenderer"]
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class _Sprite:
+    """Pre-rendered anti-aliased text in one colour, blended onto a frame with two OpenCV calls."""
+    __slots__ = ("inverse_alpha", "premultiplied", "dx", "dy", "height", "width")
+
+    def __init__(self, alpha: npt.NDArray[np.uint8], colour: tuple[int, int, int], dx: int, dy: int) -> None:
+        alpha = cv2.merge([alpha, alpha, alpha])
+        self.inverse_alpha = 255 - alpha
+        self.premultiplied = cv2.multiply(alpha, np.full_like(alpha, colour), scale=1 / 255)
+        # offset of the top left corner from the point the sprite is drawn at
+        self.dx, self.dy = dx, dy
+        self.height, self.width = alpha.shape[:2]
+
+
+def _render_text(texts: tuple[tuple[str, int, int], ...], font_scale: float, colour: tuple[int, int, int],
+                 thickness: int) -> _Sprite:
+    """Renders texts at their origins, relative to the point the sprite will be drawn at."""
+    pad = thickness + 1  # anti-aliasing reaches past the text size
+    x0 = y0 = x1 = y1 = None
+    for text, x, y in texts:
+        (width, height), baseline = _text_size(text, font_scale, thickness)
+        x0 = x - pad if x0 is None else min(x0, x - pad)
+        y0 = y - height - pad if y0 is None else min(y0, y - height - pad)
+        x1 = x + width + pad if x1 is None else max(x1, x + width + pad)
+        y1 = y + baseline + pad if y1 is None else max(y1, y + baseline + pad)
+    alpha = np.zeros((y1 - y0, x1 - x0), np.uint8)
+    for text, x, y in texts:
+        cv2.putText(alpha, text, (x - x0, y - y0), FONT, font_scale, 255, thickness, lineType=cv2.LINE_AA)
+    return _Sprite(alpha, colour, x0, y0)
+
+
+class OverlayRenderer:
+    """
+    Draws the track overlay of a frame (boxes, track ids, classification bars and the threat score panel) in one
+    pass, with the same layout as draw_track, draw_classification and draw_threat_scores.
+
+    Text is the expensive part of drawing: each label is laid out and rendered once into a sprite, cached by its
+    text and colour, and blended onto later frames. Only the boxes and bars are drawn per frame. With a
+    display_width the frame is first downscaled and the overlay drawn at that size, for a display smaller than
+    the source.
+    """
+
+    def __init__(self,
+                 display_width: int | None = None,
+                 cache_size: int = 4096,
+                 colour: tuple[int, int, int] = (0, 255, 0),
+                 **kwargs) -> None:
+        """
+        Args:
+            display_width: Width the frame is downscaled to before drawing, None to draw at the source resolution.
+            cache_size: Sprites kept, the oldest are evicted first.
+            colour: Colour of the boxes, ids and classification bars.
+            **kwargs: Additional keyword arguments.
+        """
+        self.display_width = display_width
+        self.cache_size = cache_size
+        self.colour = tuple(colour)
+        self._sprites: dict[tuple, _Sprite] = {}
+        # per classification: the first letter of each class as one sprite, and the x of each bar
+        self._columns: dict[tuple[str, ...], tuple[_Sprite, tuple[int, ...]]] = {}
+
+    def sprite(self, text: str, font_scale: float, colour: tuple[int, int, int], thickness: int = 1) -> _Sprite:
+        """The cached sprite of a label, drawn with its origin (bottom left) at the point it is blitted at."""
+        key = (text, font_scale, colour, thickness)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            if len(self._sprites) >= self.cache_size:
+                del self._sprites[next(iter(self._sprites))]
+            sprite = self._sprites[key] = _render_text(((text, 0, 0),), font_scale, colour, thickness)
+        return sprite
+
+    @staticmethod
+    def blit(image: npt.NDArray[np.uint8], sprite: _Sprite, x: int, y: int) -> None:
+        """Blends a sprite onto the image at (x, y), clipped to the image."""
+        x0, y0 = x + sprite.dx, y + sprite.dy
+        x1, y1 = x0 + sprite.width, y0 + sprite.height
+        height, width = image.shape[:2]
+        if x0 >= 0 and y0 >= 0 and x1 <= width and y1 <= height:
+            inverse_alpha, premultiplied = sprite.inverse_alpha, sprite.premultiplied
+        else:
+            cx0, cy0, cx1, cy1 = max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)
+            if cx0 >= cx1 or cy0 >= cy1:
+                return
+            crop = np.s_[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+            inverse_alpha, premultiplied = sprite.inverse_alpha[crop], sprite.premultiplied[crop]
+            x0, y0, x1, y1 = cx0, cy0, cx1, cy1
+        roi = image[y0:y1, x0:x1]
+        cv2.add(cv2.multiply(roi, inverse_alpha, scale=1 / 255), premultiplied, dst=roi)
+
+    def _column(self, class_names: tuple[str, ...]) -> tuple[_Sprite, tuple[int, ...]]:
+        column = self._columns.get(class_names)
+        if column is None:
+            # the layout of draw_classification: a letter per class, 9 px apart, each followed by its bar
+            letters = tuple((name[0], 0, 4 + 9 * i) for i, name in enumerate(class_names))
+            bars_x = tuple(_text_size(letter, 0.3, 1)[0][0] + 5 for letter, _, _ in letters)
+            column = self._columns[class_names] = (_render_text(letters, 0.3, self.colour, 1), bars_x)
+        return column
+
+    def resize(self, image: npt.NDArray[np.uint8]) -> npt.NDArray[np.uint8]:
+        """Downscales a frame to the display width, as render does, e.g. for the frames that are not drawn on."""
+        if self.display_width and image.shape[1] > self.display_width:
+            scale = self.display_width / image.shape[1]
+            image = cv2.resize(image, (self.display_width, round(image.shape[0] * scale)),
+                               interpolation=cv2.INTER_AREA)
+        return image
+
+    def render(self,
+               image: npt.NDArray[np.uint8],
+               tracks: Iterable[Any],
+               classifications: dict[int, dict[str, float]] | None = None,
+               threat_scores: dict[int, float] | None = None) -> npt.NDArray[np.uint8]:
+        """
+        Draws the overlay, in place unless the frame is downscaled to the display width.
+
+        Args:
+            image: The frame.
+            tracks: The tracks to draw, with bbox_xyxy and track_id.
+            classifications: Behaviour probabilities by track id, drawn as bars to the right of the box.
+            threat_scores: Threat scores by track id, drawn as a panel at the top left.
+
+        Returns:
+            The frame with the overlay, at the display width if set.
+        """
+        source_width = image.shape[1]
+        image = self.resize(image)
+        scale = image.shape[1] / source_width
+        classifications = classifications or {}
+        colour = self.colour
+
+        # the boxes are scaled and drawn as one array, the labels and classification columns per track
+        tracks = list(tracks)
+        boxes = np.array([track.bbox_xyxy for track in tracks], dtype=float).reshape(-1, 4) * scale
+        draw_bboxes(image, boxes, colour, 1)
+        for track, (x1, y1, x2, y2) in zip(tracks, boxes.tolist()):
+            classification = classifications.get(track.track_id)
+            if classification:
+                sprite, bars_x = self._column(tuple(classification))
+                x, y = int(x2) + 5, int(y1)
+                self.blit(image, sprite, x, y)
+                for bar_x, probability in zip(bars_x, classification.values()):
+                    cv2.rectangle(image, (x + bar_x, y), (x + bar_x + int(probability * 50), y + 4), colour,
+                                  thickness=cv2.FILLED)
+                    y += 9
+            self.blit(image, self.sprite(f"[{track.track_id}]", 0.4, colour), round(x1), round(y1) - 10)
+
+        # the threat score panel, stacked down from the top left until it leaves the frame
+        y = 10
+        for track_id, score in (threat_scores or {}).items():
+            if y >= image.shape[0]:
+                break
+            score = max(0, min(100, score))
+            text = f"[{track_id}] Threat Score: {int(round(score))}"
+            (text_width, text_height), _ = _text_size(text, 0.5, 1)
+            sprite = self.sprite(text, 0.5, (255, 255, 255))
+            box_colour = (0, int(255 * (1 - score / 100)), int(255 * score / 100))
+            cv2.rectangle(image, (10, y), (30 + text_width, y + text_height + 20), box_colour, 2)
+            self.blit(image, sprite, 20, y + text_height + 10)
+            y += text_height + 30
+        return image
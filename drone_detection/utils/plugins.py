@@ -0,0 +1,59 @@
+import importlib
+from typing import Any, Callable
+
+__all__ = ["EntryPoint", "lazy_getattr"]
+
+
+class EntryPoint:
+    """
+    A class or function that is only imported when it is first used.
+
+    Factories hold entry points rather than the classes themselves, so importing a package does not import
+    every backend (ultralytics, torch, deep_sort_realtime, ...) when the config only selects one of them.
+    Calling the entry point imports the target and calls it, so it can be used in place of the class.
+    """
+
+    def __init__(self, module: str, name: str, package: str | None = None) -> None:
+        """
+        Args:
+            module: The module containing the target, relative to package if it starts with a dot.
+            name: The name of the target in the module.
+            package: The package relative module names are resolved against.
+        """
+        self.module = module
+        self.name = name
+        self.package = package
+        self._target: Any = None
+
+    def load(self) -> Any:
+        """Imports and returns the target."""
+        if self._target is None:
+            self._target = getattr(importlib.import_module(self.module, self.package), self.name)
+        return self._target
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._target is not None
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"EntryPoint({self.package or ''}{self.module}:{self.name})"
+
+
+def lazy_getattr(package: str, entry_points: dict[str, EntryPoint]) -> Callable[[str], Any]:
+    """
+    Returns a module level __getattr__ (PEP 562) that resolves the given names from their entry points,
+    so `from package import Name` keeps working for lazily imported classes.
+
+    Args:
+        package: The name of the package, used in the AttributeError message.
+        entry_points: Attribute name -> entry point.
+    """
+    def __getattr__(name: str) -> Any:
+        if name in entry_points:
+            return entry_points[name].load()
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    return __getattr__
@@ -0,0 +1,230 @@
+import cProfile
+import functools
+import io
+import pathlib
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+
+from loguru import logger
+
+__all__ = ["Profiler", "PROFILED_PACKAGES"]
+
+PACKAGE_ROOT = pathlib.Path(__file__).resolve().parents[1]
+# the parts of the package cost and allocations are attributed to, by path relative to the package root
+PROFILED_PACKAGES = ("detectors", "trackers", "classifiers", "grabbers", "utils/draw.py", "utils/overlay.py")
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _ProfiledStage:
+    __slots__ = ("profile",)
+
+    def __init__(self, profile: cProfile.Profile) -> None:
+        self.profile = profile
+
+    def __enter__(self) -> None:
+        self.profile.enable()
+
+    def __exit__(self, *exc_info) -> None:
+        self.profile.disable()
+
+
+@functools.lru_cache(maxsize=4096)
+def _package(filename: str) -> str | None:
+    """The PROFILED_PACKAGES entry a source file belongs to, None if outside them."""
+    try:
+        relative = pathlib.Path(filename).resolve().relative_to(PACKAGE_ROOT).as_posix()
+    except ValueError:
+        return None
+    for package in PROFILED_PACKAGES:
+        if relative == package or relative.startswith(package + "/"):
+            return package
+    return None
+
+
+class Profiler:
+    """
+    On-demand profiling of the pipeline loop: periodic windows of cProfile per stage and tracemalloc snapshots.
+
+    While enabled, every `interval` frames the next `window` frames are profiled, each stage with its own
+    cProfile. At the end of a window a report directory is written with, per stage, the raw profile (.prof, for
+    pstats or snakeviz) and the top functions by cumulative time (.txt), the time of each stage spent in
+    each of PROFILED_PACKAGES (packages.txt), and with memory on the allocations of each package and their growth
+    since the previous window (memory.txt). The text reports are sorted and formatted stably so two windows can be
+    diffed.
+
+    The mode can be toggled at run time by a signal (e.g. kill -USR1 <pid>). When it is off stage() returns a
+    shared no-op context manager and nothing is traced.
+    """
+
+    def __init__(self,
+                 enabled: bool = False,
+                 output_dir: str = "outputs/profiles",
+                 interval: int = 300,
+                 window: int = 30,
+                 memory: bool = True,
+                 memory_frames: int = 1,
+                 top: int = 25,
+                 signal_name: str | None = "SIGUSR1",
+                 **kwargs) -> None:
+        """
+        Args:
+            enabled: Start with profiling on.
+            output_dir: The directory the reports are written to, one subdirectory per window.
+            interval: Frames from the start of one profiling window to the start of the next.
+            window: Frames profiled per window.
+            memory: Trace allocations with tracemalloc while profiling is on and snapshot them each window.
+            memory_frames: The traceback depth tracemalloc records, deeper attributes better but costs more.
+            top: Lines per report.
+            signal_name: The signal that toggles profiling, None to disable. Only installed from the main thread
+                         on platforms that have the signal.
+            **kwargs: Additional keyword arguments.
+        """
+        self.enabled = enabled
+        self.output_dir = pathlib.Path(output_dir)
+        self.interval = max(interval, window, 1)
+        self.window = max(window, 1)
+        self.memory = memory
+        self.memory_frames = memory_frames
+        self.top = top
+        self.reports: list[pathlib.Path] = []
+
+        self._toggle_requested = False
+        self._frame = 0
+        self._in_window = False
+        self._window_frames = 0
+        self._stages: dict[str, _ProfiledStage] = {}
+        self._previous_snapshot: tracemalloc.Snapshot | None = None
+        self._started_tracemalloc = False
+
+        signum = getattr(signal, signal_name, None) if signal_name else None
+        if signal_name and signum is None:
+            logger.warning(f"Signal {signal_name} is not available on this platform, profiling cannot be toggled")
+        elif signum is not None and threading.current_thread() is threading.main_thread():
+            signal.signal(signum, self._on_signal)
+        if self.enabled:
+            self._start()
+
+    def _on_signal(self, signum: int, frame) -> None:
+        # only sets a flag, the switch happens between frames
+        self._toggle_requested = True
+
+    @property
+    def profiling(self) -> bool:
+        """Whether the current frame is in a profiling window."""
+        return self._in_window
+
+    def stage(self, name: str) -> _NullStage | _ProfiledStage:
+        """A context manager that profiles its body as the named stage while in a profiling window."""
+        if not self._in_window:
+            return _NULL_STAGE
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _ProfiledStage(cProfile.Profile())
+        return stage
+
+    def start_frame(self) -> None:
+        """Called at the start of every frame: applies a signalled toggle and opens or closes windows."""
+        if self._toggle_requested:
+            self._toggle_requested = False
+            self.toggle()
+        if not self.enabled:
+            return
+        if self._in_window:
+            self._window_frames += 1
+            if self._window_frames > self.window:
+                self._write_report()
+        elif self._frame % self.interval == 0:
+            # stage() creates the profile of each stage on first use
+            self._in_window = True
+            self._window_frames = 1
+        self._frame += 1
+
+    def toggle(self) -> None:
+        """Switches profiling on or off, writing the report of an open window."""
+        if self.enabled:
+            self.stop()
+        else:
+            self.enabled = True
+            self._start()
+        logger.info(f"Profiling {'on' if self.enabled else 'off'}")
+
+    def _start(self) -> None:
+        self._frame = 0
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_frames)
+            self._started_tracemalloc = True
+
+    def stop(self) -> None:
+        """Switches profiling off, writing the report of an open window."""
+        if self._in_window:
+            self._write_report()
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self._previous_snapshot = None
+
+    def _write_report(self) -> None:
+        profiles = {name: stage.profile for name, stage in self._stages.items()}
+        frames = min(self._window_frames, self.window)
+        self._in_window, self._stages = False, {}
+        directory = self.output_dir / f"{time.strftime('%Y%m%d_%H%M%S')}_frame{self._frame:07d}"
+        directory.mkdir(parents=True, exist_ok=True)
+
+        packages: dict[str, dict[str, float]] = {}
+        for name, profile in sorted(profiles.items()):
+            profile.dump_stats(directory / f"{name}.prof")
+            stream = io.StringIO()
+            stats = pstats.Stats(profile, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE, pstats.SortKey.NAME).print_stats(self.top)
+            (directory / f"{name}.txt").write_text(stream.getvalue())
+            totals = packages[name] = {}
+            for (filename, _, _), (_, _, tottime, _, _) in stats.stats.items():
+                package = _package(filename) or "other"
+                totals[package] = totals.get(package, 0.0) + tottime
+
+        lines = [f"# seconds of own time over {frames} frames, by stage and package"]
+        for stage, totals in packages.items():
+            for package, seconds in sorted(totals.items()):
+                lines.append(f"{stage:<12} {package:<16} {seconds:10.4f}")
+        (directory / "packages.txt").write_text("\n".join(lines) + "\n")
+
+        if self.memory and tracemalloc.is_tracing():
+            (directory / "memory.txt").write_text(self._memory_report())
+        self.reports.append(directory)
+        logger.info(f"Profile written to {directory}")
+
+    def _memory_report(self) -> str:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*")])
+        lines = []
+        by_package: dict[str, list[tracemalloc.Statistic]] = {}
+        for statistic in snapshot.statistics("lineno"):
+            by_package.setdefault(_package(statistic.traceback[0].filename) or "other", []).append(statistic)
+        lines.append("# allocated bytes by package")
+        for package, statistics in sorted(by_package.items()):
+            lines.append(f"{package:<16} {sum(s.size for s in statistics):>12} bytes "
+                         f"{sum(s.count for s in statistics):>9} blocks")
+        for package in PROFILED_PACKAGES:
+            lines.append(f"\n# top allocations in {package}")
+            lines.extend(str(s) for s in by_package.get(package, [])[:self.top])
+        if self._previous_snapshot is not None:
+            lines.append("\n# growth since the previous window")
+            lines.extend(str(s) for s in snapshot.compare_to(self._previous_snapshot, "lineno")[:self.top])
+        self._previous_snapshot = snapshot
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,181 @@
+import collections
+import time
+from typing import Any, Iterable
+
+from loguru import logger
+
+__all__ = ["DEGRADATION_STEPS", "RealtimeController"]
+
+# the sites that can be degraded, cheapest loss of quality first
+DEGRADATION_STEPS = ("skip_drawing", "skip_low_threat_classification", "reduce_imgsz", "detection_stride",
+                     "drop_frames")
+
+
+class RealtimeController:
+    """
+    Keeps a live pipeline within a per-frame time budget by degrading quality when it falls behind.
+
+    The steps in `order` are expanded into a ladder of rungs, e.g. reduce_imgsz gives one rung per size in
+    imgsz_steps. The controller keeps a moving average of the frame time. When it has been over budget for
+    `patience` frames the next rung is enabled, and when it has been under `headroom` x budget for `recovery`
+    frames the last rung is disabled again. Every change is logged and counted per step.
+
+    The pipeline asks the controller what to do each frame:
+        should_drop() - skip the frame entirely.
+        should_detect() - run the detector and tracker on this frame (False on detection stride frames).
+        draw - draw the overlay.
+        should_classify(threat_score) - run behaviour classification for a track with this previous score.
+        imgsz - the detector inference size, None for the model default.
+    """
+
+    def __init__(self,
+                 fps: float = 30.0,
+                 budget_ms: float | None = None,
+                 order: Iterable[str] = DEGRADATION_STEPS,
+                 imgsz_steps: Iterable[int] = (480, 320),
+                 max_stride: int = 3,
+                 low_threat_threshold: float = 30.0,
+                 headroom: float = 0.7,
+                 patience: int = 5,
+                 recovery: int = 30,
+                 smoothing: float = 0.2,
+                 enabled: bool = True,
+                 **kwargs) -> None:
+        """
+        Initializes the controller at full quality.
+
+        Args:
+            fps: The frame rate of the feed, the budget is 1000 / fps ms unless budget_ms is given.
+            budget_ms: The per-frame time budget in ms.
+            order: The steps to degrade, in order. A subset of DEGRADATION_STEPS.
+            imgsz_steps: The decreasing inference sizes used by reduce_imgsz.
+            max_stride: detection_stride runs the detector every 2, ..., max_stride frames.
+            low_threat_threshold: skip_low_threat_classification skips tracks whose last threat score is below this.
+            headroom: Restore quality when the frame time is below headroom x budget.
+            patience: Frames over budget before degrading.
+            recovery: Frames under headroom x budget before restoring.
+            smoothing: Weight of the latest frame in the moving average of the frame time.
+            enabled: If False the controller never degrades.
+            **kwargs: Additional keyword arguments.
+        """
+        self.budget_ms = budget_ms if budget_ms is not None else 1000.0 / fps
+        self.low_threat_threshold = low_threat_threshold
+        self.headroom = headroom
+        self.patience = patience
+        self.recovery = recovery
+        self.smoothing = smoothing
+        self.enabled = enabled
+
+        self.ladder: list[tuple[str, Any]] = []
+        for step in order:
+            if step not in DEGRADATION_STEPS:
+                raise ValueError(f"Unknown degradation step {step}, expected one of {DEGRADATION_STEPS}")
+            if step == "reduce_imgsz":
+                self.ladder.extend((step, size) for size in imgsz_steps)
+            elif step == "detection_stride":
+                self.ladder.extend((step, stride) for stride in range(2, max_stride + 1))
+            else:
+                self.ladder.append((step, True))
+
+        self.level = 0
+        self.frame_time_ms: float | None = None
+        self._over = 0
+        self._under = 0
+        self._frame_index = 0
+        self._debt_ms = 0.0
+        self._t0: float | None = None
+
+        self.degradations: collections.Counter[str] = collections.Counter()
+        self.restorations: collections.Counter[str] = collections.Counter()
+        self.frames_degraded: collections.Counter[str] = collections.Counter()
+        self.frames_dropped = 0
+        self.frames = 0
+
+    def _active(self, step: str) -> Any:
+        """The value of the most degraded active rung of a step, or None if the step is not active."""
+        value = None
+        for name, rung_value in self.ladder[:self.level]:
+            if name == step:
+                value = rung_value
+        return value
+
+    @property
+    def draw(self) -> bool:
+        return self._active("skip_drawing") is None
+
+    @property
+    def imgsz(self) -> int | None:
+        return self._active("reduce_imgsz")
+
+    @property
+    def stride(self) -> int:
+        return self._active("detection_stride") or 1
+
+    def should_classify(self, threat_score: float | None) -> bool:
+        """Whether to classify a track, given its previous threat score (None if it has never been scored)."""
+        if threat_score is None or self._active("skip_low_threat_classification") is None:
+            return True
+        return threat_score >= self.low_threat_threshold
+
+    def should_drop(self) -> bool:
+        """
+        Call once per grabbed frame. Frames are only dropped on the last rung, while the time spent over
+        budget on previous frames has not been caught up.
+        """
+        if self._active("drop_frames") is not None and self._debt_ms >= self.budget_ms:
+            self._debt_ms -= self.budget_ms
+            self.frames_dropped += 1
+            self.frames_degraded["drop_frames"] += 1
+            return True
+        return False
+
+    def should_detect(self) -> bool:
+        """Whether to run the detector and tracker on the current frame."""
+        return self._frame_index % self.stride == 0
+
+    def start_frame(self) -> None:
+        self._t0 = time.perf_counter()
+
+    def end_frame(self) -> None:
+        """Records the time of the processed frame and degrades or restores quality."""
+        frame_ms = (time.perf_counter() - self._t0) * 1000
+        self.frames += 1
+        self._frame_index += 1
+        for step in {name for name, _ in self.ladder[:self.level]}:
+            self.frames_degraded[step] += 1
+
+        if self.frame_time_ms is None:
+            self.frame_time_ms = frame_ms
+        else:
+            self.frame_time_ms += self.smoothing * (frame_ms - self.frame_time_ms)
+        self._debt_ms = max(self._debt_ms + frame_ms - self.budget_ms, 0.0)
+
+        if not self.enabled:
+            return
+
+        self._over = self._over + 1 if self.frame_time_ms > self.budget_ms else 0
+        self._under = self._under + 1 if self.frame_time_ms < self.headroom * self.budget_ms else 0
+
+        if self._over >= self.patience and self.level < len(self.ladder):
+            step, value = self.ladder[self.level]
+            self.level += 1
+            self.degradations[step] += 1
+            logger.info(f"Real-time: degrading {step}={value} (level {self.level}), "
+                        f"frame time {self.frame_time_ms:.1f} ms > budget {self.budget_ms:.1f} ms")
+            self._over = 0
+        elif self._under >= self.recovery and self.level > 0:
+            self.level -= 1
+            step, value = self.ladder[self.level]
+            self.restorations[step] += 1
+            logger.info(f"Real-time: restoring {step} (level {self.level}), "
+                        f"frame time {self.frame_time_ms:.1f} ms < {self.headroom * self.budget_ms:.1f} ms")
+            self._under = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Counters of how often and for how long each step was degraded."""
+        return {"frames": self.frames,
+                "frames_dropped": self.frames_dropped,
+                "level": self.level,
+                "degradations": dict(self.degradations),
+                "restorations": dict(self.restorations),
+                "frames_degraded": dict(self.frames_degraded)}
@@ -0,0 +1,110 @@
+import contextlib
+import os
+import sys
+from typing import Iterable, Iterator
+
+from loguru import logger
+
+__all__ = ["Runtime", "parse_cores"]
+
+
+def parse_cores(cores: str | int | Iterable[int] | None) -> frozenset[int] | None:
+    """
+    Parses a core set, e.g. "0-3,8", 2 or [0, 1].
+
+    Returns:
+        The set of core ids, or None if cores is None.
+    """
+    if cores is None:
+        return None
+    if isinstance(cores, int):
+        return frozenset([cores])
+    if isinstance(cores, str):
+        result = set()
+        for part in cores.replace(" ", "").split(","):
+            if "-" in part:
+                first, last = part.split("-")
+                result.update(range(int(first), int(last) + 1))
+            elif part:
+                result.add(int(part))
+        return frozenset(result)
+    return frozenset(int(c) for c in cores)
+
+
+class Runtime:
+    """
+    CPU thread and core affinity settings for the pipeline.
+
+    By default torch's intra-op pool and OpenCV's pool each use every core, on top of the pipeline's own
+    threads, which oversubscribes the CPU. apply() sets the thread counts, and stage() pins the calling
+    thread to the cores configured for a pipeline stage while it runs. Thread pools created by a stage
+    (e.g. torch's OpenMP threads on the first inference) inherit that stage's cores.
+    """
+
+    def __init__(self,
+                 torch_threads: int | None = None,
+                 torch_interop_threads: int | None = None,
+                 opencv_threads: int | None = None,
+                 affinity: dict[str, str | int | Iterable[int] | None] | None = None,
+                 **kwargs) -> None:
+        """
+        Args:
+            torch_threads: torch intra-op threads (torch.set_num_threads), None for the default.
+            torch_interop_threads: torch inter-op threads, None for the default. Can only be set before torch
+                                   runs any inter-op work.
+            opencv_threads: OpenCV threads (cv2.setNumThreads), 0 to disable threading, None for the default.
+            affinity: Stage name (grabber, detector, tracker, ...) -> core set, e.g. "0-3". Stages without a
+                      core set run on all the cores available to the process.
+            **kwargs: Additional keyword arguments.
+        """
+        self.torch_threads = torch_threads
+        self.torch_interop_threads = torch_interop_threads
+        self.opencv_threads = opencv_threads
+
+        self.affinity: dict[str, frozenset[int]] = {}
+        self._all_cores: frozenset[int] | None = None
+        self._current: frozenset[int] | None = None
+        affinity = {name: parse_cores(cores) for name, cores in (affinity or {}).items()}
+        affinity = {name: cores for name, cores in affinity.items() if cores}
+        if affinity and not hasattr(os, "sched_setaffinity"):
+            logger.warning("Core affinity is not supported on this platform, ignoring runtime.affinity")
+        elif affinity:
+            self._all_cores = frozenset(os.sched_getaffinity(0))
+            self._current = self._all_cores
+            for name, cores in affinity.items():
+                if not cores <= self._all_cores:
+                    raise ValueError(f"Cores {sorted(cores - self._all_cores)} for stage {name} are not available, "
+                                     f"available cores: {sorted(self._all_cores)}")
+                self.affinity[name] = cores
+
+    def apply(self) -> None:
+        """
+        Applies the thread counts. Call after the components are created, torch is only configured if a
+        component has imported it.
+        """
+        if self.opencv_threads is not None:
+            import cv2
+            cv2.setNumThreads(self.opencv_threads)
+
+        if "torch" in sys.modules and (self.torch_threads is not None or self.torch_interop_threads is not None):
+            import torch
+            if self.torch_threads is not None:
+                torch.set_num_threads(self.torch_threads)
+            if self.torch_interop_threads is not None:
+                try:
+                    torch.set_num_interop_threads(self.torch_interop_threads)
+                except RuntimeError as e:
+                    logger.warning(f"Could not set torch inter-op threads: {e}")
+
+        logger.info(f"Runtime: torch_threads={self.torch_threads}, opencv_threads={self.opencv_threads}, "
+                    f"affinity={ {k: sorted(v) for k, v in self.affinity.items()} }")
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Runs the body on the cores configured for the stage. Only makes a system call when the cores change."""
+        if self.affinity:
+            cores = self.affinity.get(name, self._all_cores)
+            if cores != self._current:
+                os.sched_setaffinity(0, cores)
+                self._current = cores
+        yield
@@ -0,0 +1,132 @@
+import collections
+import math
+from typing import Any, Hashable, Iterable
+
+__all__ = ["TRACK_WORK", "ComputeScheduler"]
+
+# the optional per-track work the scheduler allocates, a track without any of it only gets Kalman prediction
+TRACK_WORK = ("reid", "high_res", "classification")
+
+
+class ComputeScheduler:
+    """
+    Allocates the expensive per-track work to the most threatening tracks within a per-frame budget.
+
+    Each frame plan() ranks the tracks by priority: their last threat score plus their proximity (area) and
+    approach speed (vw), scored like the threat score calculator. Tracks that have never been scored rank first.
+    Going down the ranking, tracks are admitted while the cost of all the work in `costs` for the admitted tracks
+    fits in `budget_ms`. The pipeline stages then ask may_spend(track, work) before doing optional work for a
+    track; admitted tracks get it, the others are deferred and counted. Tracks created after plan() are admitted
+    while there is budget left.
+    """
+
+    def __init__(self,
+                 budget_ms: float | None = None,
+                 costs: dict[str, float] | None = None,
+                 proximity_weight: float = 50.0,
+                 approach_weight: float = 25.0,
+                 proximity_threshold: float = 1000.0,
+                 approach_threshold: float = 10.0,
+                 unscored_priority: float = 1000.0,
+                 min_priority: float = 0.0,
+                 enabled: bool = True,
+                 **kwargs) -> None:
+        """
+        Args:
+            budget_ms: The per-frame time budget for optional per-track work, None for no limit.
+            costs: Estimated ms per track for each kind of work in TRACK_WORK.
+            proximity_weight: Priority of a track whose area is far above proximity_threshold.
+            approach_weight: Priority of a track approaching far faster than approach_threshold.
+            proximity_threshold: px^2, the area considered close.
+            approach_threshold: px/s, the growth rate (vw) considered a fast approach.
+            unscored_priority: Priority of tracks without a threat score yet.
+            min_priority: Tracks below this priority never get optional work.
+            enabled: If False every request is granted.
+            **kwargs: Additional keyword arguments.
+        """
+        self.budget_ms = budget_ms
+        self.costs = {"reid": 2.0, "high_res": 1.0, "classification": 0.1, **(costs or {})}
+        for work in self.costs:
+            if work not in TRACK_WORK:
+                raise ValueError(f"Unknown track work {work}, expected one of {TRACK_WORK}")
+        self.proximity_weight = proximity_weight
+        self.approach_weight = approach_weight
+        self.proximity_threshold = proximity_threshold
+        self.approach_threshold = approach_threshold
+        self.unscored_priority = unscored_priority
+        self.min_priority = min_priority
+        self.enabled = enabled
+
+        self.priorities: dict[Hashable, float] = {}
+        self._admitted: set[Hashable] = set()
+        self._slots = math.inf
+
+        self.frames = 0
+        self.tracks_admitted = 0
+        self.tracks_deferred = 0
+        self.granted: collections.Counter[str] = collections.Counter()
+        self.deferred: collections.Counter[str] = collections.Counter()
+
+    def priority(self, track) -> float:
+        """The priority of a track, higher first."""
+        if track.threat_score is None or track.state is None:
+            return self.unscored_priority
+        proximity = 1 - math.exp(-track.state["area"] / self.proximity_threshold)
+        approach = 1 - math.exp(-max(0.0, track.state["vw"]) / self.approach_threshold)
+        return track.threat_score + self.proximity_weight * proximity + self.approach_weight * approach
+
+    def ranked(self, tracks: Iterable) -> list:
+        """The tracks sorted by priority, highest first."""
+        return sorted(tracks, key=self.priority, reverse=True)
+
+    def plan(self, tracks: Iterable) -> None:
+        """Ranks the tracks and admits the highest priority ones that fit in the budget. Call once per frame."""
+        self.frames += 1
+        ranked = self.ranked(tracks)
+        self.priorities = {track.track_id: self.priority(track) for track in ranked}
+
+        per_track = sum(self.costs.values())
+        self._slots = math.inf if self.budget_ms is None or per_track <= 0 else int(self.budget_ms // per_track)
+        self._admitted = set()
+        for track in ranked:
+            self._admit(track.track_id, self.priorities[track.track_id])
+        self.tracks_deferred += len(ranked) - len(self._admitted)
+
+    def _admit(self, track_id: Hashable, priority: float) -> bool:
+        if priority < self.min_priority or len(self._admitted) >= self._slots:
+            return False
+        self._admitted.add(track_id)
+        self.tracks_admitted += 1
+        return True
+
+    def may_spend(self, track, work: str) -> bool:
+        """
+        Whether to do optional work for a track this frame.
+
+        Args:
+            track: The track, or None for work that cannot be attributed to a track yet (always granted).
+            work: One of TRACK_WORK.
+        """
+        if not self.enabled or track is None:
+            self.granted[work] += 1
+            return True
+
+        track_id = track.track_id
+        if track_id not in self._admitted and track_id not in self.priorities:
+            # created since plan()
+            self.priorities[track_id] = self.priority(track)
+            self._admit(track_id, self.priorities[track_id])
+
+        if track_id in self._admitted:
+            self.granted[work] += 1
+            return True
+        self.deferred[work] += 1
+        return False
+
+    def stats(self) -> dict[str, Any]:
+        """Counters of the granted and deferred work."""
+        return {"frames": self.frames,
+                "tracks_admitted": self.tracks_admitted,
+                "tracks_deferred": self.tracks_deferred,
+                "granted": dict(self.granted),
+                "deferred": dict(self.deferred)}
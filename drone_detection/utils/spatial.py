@@ -0,0 +1,156 @@
+import numpy as np
+from numpy import typing as npt
+
+from .geometry import boxes_xyxy_to_cxcywh, iou_pairs
+
+__all__ = ["SpatialGrid", "grid_nms"]
+
+# cell coordinates are offset so they are positive and packed into a single int64 key
+_CELL_OFFSET = 1 << 20
+_CELL_STRIDE = 1 << 22
+_NEIGHBOUR_OFFSETS = np.array([dx * _CELL_STRIDE + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+
+
+class SpatialGrid:
+    """
+    A uniform grid index over 2D points, e.g. predicted track centres.
+
+    Points are stored sorted by the key of the cell they fall in, so finding every point in the 3x3 cells
+    around a query is a binary search rather than a comparison against every point. Any point within
+    `cell_size` of a query is guaranteed to be returned, along with some further away.
+
+    The index is rebuilt every frame with `update`. When the same ids are passed each frame the previous
+    cell order is reused as the starting point, so the sort only has to move the points that changed cell.
+    """
+
+    def __init__(self, cell_size: float) -> None:
+        """
+        Initializes an empty grid.
+
+        Args:
+            cell_size: The width and height of a grid cell. Should be at least the largest search radius.
+        """
+        if cell_size <= 0:
+            raise ValueError(f"cell_size must be positive, got {cell_size}")
+        self.cell_size = float(cell_size)
+        self._order = np.empty(0, dtype=np.int64)
+        self._keys = np.empty(0, dtype=np.int64)
+        self._ids: npt.NDArray | None = None
+
+    def cell_keys(self, points: npt.ArrayLike) -> npt.NDArray[np.int64]:
+        """Returns the cell key of each of the (N, 2) points."""
+        cells = np.floor(np.asarray(points, dtype=float).reshape(-1, 2) / self.cell_size).astype(np.int64)
+        return (cells[:, 0] + _CELL_OFFSET) * _CELL_STRIDE + (cells[:, 1] + _CELL_OFFSET)
+
+    def update(self, points: npt.ArrayLike, ids: npt.ArrayLike | None = None) -> None:
+        """
+        Rebuilds the index for a new set of points.
+
+        Args:
+            points: (N, 2) array of point coordinates.
+            ids: Optional (N,) array of unique integer ids, e.g. track ids. If given, points that were in the
+                 previous update keep their previous position in the sort order.
+        """
+        keys = self.cell_keys(points)
+        order = np.arange(len(keys))
+
+        if ids is not None:
+            ids = np.asarray(ids)
+            if self._ids is not None and len(self._ids) and len(ids):
+                # previous sorted order, expressed as indices into the new points, followed by new points
+                sorter = np.argsort(ids)
+                position = np.searchsorted(ids, self._ids[self._order], sorter=sorter)
+                position = np.minimum(position, len(ids) - 1)
+                previous = sorter[position]
+                previous = previous[ids[previous] == self._ids[self._order]]
+                is_new = np.ones(len(ids), dtype=bool)
+                is_new[previous] = False
+                order = np.concatenate([previous, np.flatnonzero(is_new)])
+            self._ids = ids
+        else:
+            self._ids = None
+
+        # stable sort of a nearly sorted sequence is close to linear
+        order = order[np.argsort(keys[order], kind="stable")]
+        self._order = order
+        self._keys = keys[order]
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def candidate_pairs(self, queries: npt.ArrayLike) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """
+        Finds the indexed points in the 3x3 cells around each query point.
+
+        Args:
+            queries: (M, 2) array of query coordinates.
+
+        Returns:
+            A tuple of (point indices, query indices), one entry per candidate pair.
+        """
+        query_keys = self.cell_keys(queries)
+        if len(self._keys) == 0 or len(query_keys) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        neighbour_keys = (query_keys[:, None] + _NEIGHBOUR_OFFSETS[None, :]).ravel()
+        starts = np.searchsorted(self._keys, neighbour_keys, side="left")
+        counts = np.searchsorted(self._keys, neighbour_keys, side="right") - starts
+
+        total = counts.sum()
+        query_index = np.repeat(np.arange(len(neighbour_keys)) // len(_NEIGHBOUR_OFFSETS), counts)
+        # positions within each [start, start + count) range
+        run_starts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        positions = run_starts + np.arange(total)
+        return self._order[positions], query_index
+
+
+def grid_nms(boxes: npt.ArrayLike, scores: npt.ArrayLike, iou_threshold: float = 0.5) -> npt.NDArray[np.int64]:
+    """
+    Class agnostic non-maximum suppression that only compares boxes in neighbouring grid cells.
+
+    Gives the same result as utils.nms, but the cost grows with the number of nearby boxes rather than
+    the square of the number of boxes.
+
+    Args:
+        boxes: An (N, 4) array of [x1, y1, x2, y2] bounding boxes.
+        scores: An (N,) array of scores.
+        iou_threshold: Boxes overlapping a higher scoring kept box by more than this are suppressed.
+
+    Returns:
+        The indices of the kept boxes, highest score first.
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=float)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # overlapping boxes have centres closer than the largest box diagonal
+    cxcywh = boxes_xyxy_to_cxcywh(boxes)
+    grid = SpatialGrid(cell_size=max(np.hypot(cxcywh[:, 2], cxcywh[:, 3]).max(), 1e-6))
+    grid.update(cxcywh[:, :2])
+    a, b = grid.candidate_pairs(cxcywh[:, :2])
+
+    # rank 0 is the highest score, ties broken by index like utils.nms
+    order = np.argsort(-scores, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    # keep each pair once, a dominates b
+    dominates = rank[a] < rank[b]
+    a, b = a[dominates], b[dominates]
+    overlapping = iou_pairs(boxes[a], boxes[b]) > iou_threshold
+    a, b = a[overlapping], b[overlapping]
+
+    # resolve greedily in parallel: a box is kept once all the boxes dominating it are suppressed,
+    # and suppressed as soon as one box dominating it is kept
+    undecided, kept, suppressed = 0, 1, -1
+    status = np.zeros(len(boxes), dtype=np.int8)
+    while (status == undecided).any():
+        dominated_by_kept = np.bincount(b[status[a] == kept], minlength=len(boxes)) > 0
+        dominated_by_undecided = np.bincount(b[status[a] == undecided], minlength=len(boxes)) > 0
+        open_boxes = status == undecided
+        status[open_boxes & dominated_by_kept] = suppressed
+        status[open_boxes & ~dominated_by_kept & ~dominated_by_undecided] = kept
+
+    keep = np.flatnonzero(status == kept)
+    return keep[np.argsort(rank[keep])]
@@ -0,0 +1,93 @@
+# Benchmark the cached classification cadence against classifying every track on every frame.
+#
+# Synthetic targets move with randomly drifting velocities and are tracked with Track objects. Each frame every
+# track is classified from scratch (the reference) and through a ClassificationCadence with the settings from
+# config/config.yaml. Reports the classification time per frame of both, the fraction of results reused, and the
+# staleness of the cached output: the largest number of frames since a reused result was computed, and the
+# mean and max difference of its threat score from the fresh one.
+#
+# python scripts/benchmark_classification_cadence.py --tracks 10 100 500 --frames 200
+import argparse
+import pathlib
+import time
+
+import numpy as np
+from omegaconf import OmegaConf
+
+from drone_detection import classifiers
+from drone_detection.classifiers import ClassificationCadence
+from drone_detection.detectors import Detection
+from drone_detection.trackers import Track
+
+package_root = pathlib.Path(__file__).resolve().parents[1]
+
+
+def run(n_tracks: int, args: argparse.Namespace, cfg) -> dict[str, float]:
+    rng = np.random.default_rng(args.seed)
+    behaviour_classifier, threat_score_calculator = classifiers.create(cfg.classifier)
+    cadence = ClassificationCadence(**cfg.classifier.get("cadence", {}))
+    empty = np.zeros((0, 0, 3), dtype=np.uint8)
+
+    centres = rng.uniform(100, 1800, size=(n_tracks, 2))
+    sizes = rng.uniform(10, 80, size=(n_tracks, 1)).repeat(2, axis=1)
+    velocities = rng.normal(0, 2, size=(n_tracks, 2))
+    growth = rng.normal(0, 0.1, size=(n_tracks, 1))
+
+    def detections() -> list[Detection]:
+        boxes = np.hstack([centres - sizes / 2, centres + sizes / 2])
+        return [Detection(bbox_xyxy=tuple(box), data=empty) for box in boxes.tolist()]
+
+    tracks = [Track(track_id=i, detection=d, **cfg.tracker.parameters.track_kwargs)
+              for i, d in enumerate(detections())]
+
+    reference_s = cadence_s = 0.0
+    errors, staleness = [], []
+    for frame in range(args.frames):
+        velocities += rng.normal(0, args.velocity_noise, size=velocities.shape)
+        centres += velocities
+        sizes = np.clip(sizes + growth, 4, None)
+        for track, detection in zip(tracks, detections()):
+            track.update(detection)
+        if frame < cfg.classifier.min_track_length:
+            continue
+
+        t0 = time.perf_counter()
+        fresh = []
+        for track in tracks:
+            probs = behaviour_classifier(state_history=list(track.state_history))
+            fresh.append(threat_score_calculator(state=track.state, behavior_probs=probs))
+        t1 = time.perf_counter()
+        for track in tracks:
+            cadence.classify(track, behaviour_classifier, threat_score_calculator)
+        t2 = time.perf_counter()
+
+        reference_s += t1 - t0
+        cadence_s += t2 - t1
+        errors.extend(abs(track.threat_score - score) for track, score in zip(tracks, fresh))
+        staleness.extend(track.frames_since_classified for track in tracks)
+
+    frames = args.frames - cfg.classifier.min_track_length
+    return {"reference_ms": 1000 * reference_s / frames, "cadence_ms": 1000 * cadence_s / frames,
+            "reuse": cadence.stats()["reuse_fraction"], "max_stale": max(staleness),
+            "mean_error": float(np.mean(errors)), "max_error": float(np.max(errors))}
+
+
+def main(args: argparse.Namespace) -> None:
+    cfg = OmegaConf.load(package_root / "config/config.yaml")
+    print(f"cadence: {OmegaConf.to_container(cfg.classifier.get('cadence', {}))}")
+    print(f"{'tracks':>7} {'ref ms':>8} {'cached ms':>10} {'speedup':>8} {'reused':>7} {'max stale':>10} "
+          f"{'mean err':>9} {'max err':>8}")
+    for n_tracks in args.tracks:
+        r = run(n_tracks, args, cfg)
+        print(f"{n_tracks:>7} {r['reference_ms']:>8.2f} {r['cadence_ms']:>10.2f} "
+              f"{r['reference_ms'] / max(r['cadence_ms'], 1e-9):>7.1f}x {r['reuse']:>7.1%} {r['max_stale']:>10} "
+              f"{r['mean_error']:>9.2f} {r['max_error']:>8.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark cached per-track classification")
+    parser.add_argument("--tracks", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--velocity-noise", type=float, default=0.2, help="px/frame random walk of the velocity")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
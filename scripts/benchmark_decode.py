@@ -0,0 +1,84 @@
+# Benchmark video decode throughput of the VideoGrabber backends.
+#
+# Decodes the whole video with OpenCV and with PyAV (FFmpeg threading, 1 thread and automatic), at full
+# resolution and scaled to --width (OpenCV decodes then resizes, PyAV scales in swscale). Reports frames per
+# second and CPU time per frame. Also times building the PyAV frame index, and compares random seeks: the
+# latency and, against a sequential decode, whether the frame returned is the one asked for.
+#
+# python scripts/benchmark_decode.py --video data/demo.mp4 --width 640 --repeats 3
+import argparse
+import pathlib
+import time
+
+import cv2
+import numpy as np
+
+from drone_detection.grabbers import VideoGrabber
+from drone_detection.grabbers.pyav_decoder import PyAVDecoder, INDEX_SUFFIX
+
+package_root = pathlib.Path(__file__).resolve().parents[1]
+
+
+def decode_all(grabber: VideoGrabber) -> int:
+    return sum(1 for _ in grabber)
+
+
+def main(args: argparse.Namespace) -> None:
+    video = pathlib.Path(args.video)
+    configs = {
+        "opencv": {"backend": "opencv"},
+        "pyav-1": {"backend": "pyav", "decoder_threads": 1},
+        "pyav-auto": {"backend": "pyav", "decoder_threads": 0},
+    }
+    if args.width:
+        configs.update({f"{name}@{args.width}": {**params, "width": args.width}
+                        for name, params in list(configs.items())})
+
+    index_path = video.with_name(video.name + INDEX_SUFFIX)
+    index_path.unlink(missing_ok=True)
+    t0 = time.perf_counter()
+    PyAVDecoder(video).release()
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    decoder = PyAVDecoder(video)
+    t_cached = time.perf_counter() - t0
+    print(f"Frame index: {len(decoder.index)} frames, {int(decoder.index.keyframes.sum())} keyframes, "
+          f"built in {1000 * t_build:.1f} ms, opened with the cached index in {1000 * t_cached:.1f} ms")
+
+    print(f"{'backend':>16} {'fps':>8} {'cpu ms/frame':>13}")
+    for name, params in configs.items():
+        fps, cpu = [], []
+        for _ in range(args.repeats):
+            grabber = VideoGrabber(video_path=str(video), video_root_dir=str(package_root), **params)
+            t0, c0 = time.perf_counter(), time.process_time()
+            n = decode_all(grabber)
+            fps.append(n / (time.perf_counter() - t0))
+            cpu.append(1000 * (time.process_time() - c0) / n)
+        print(f"{name:>16} {np.median(fps):>8.1f} {np.median(cpu):>13.2f}")
+
+    # random seeks, checked against the sequentially decoded frames
+    frames = []
+    while (frame := decoder.read())[0]:
+        frames.append(frame[1])
+    targets = np.random.default_rng(0).integers(0, len(frames), size=args.seeks).tolist()
+    capture = cv2.VideoCapture(str(video))
+    for name, seek, read in (("opencv", lambda f: capture.set(cv2.CAP_PROP_POS_FRAMES, f), capture.read),
+                             ("pyav", decoder.seek, decoder.read)):
+        times, exact = [], 0
+        for target in targets:
+            t0 = time.perf_counter()
+            seek(target)
+            ret, frame = read()
+            times.append(1000 * (time.perf_counter() - t0))
+            exact += ret and np.array_equal(frame, frames[target])
+        print(f"Seek {name:>6}: {np.mean(times):.2f} ms mean, {np.percentile(times, 95):.2f} ms p95, "
+              f"{exact}/{len(targets)} exact")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark video decoding with OpenCV and PyAV")
+    parser.add_argument("--video", default=str(package_root / "data/demo.mp4"))
+    parser.add_argument("--width", type=int, default=320, help="also decode scaled to this width, 0 to skip")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seeks", type=int, default=50)
+    main(parser.parse_args())
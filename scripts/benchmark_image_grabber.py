@@ -0,0 +1,71 @@
+# Benchmark reading an image folder with the IMAGES grabber against serial cv2.imread.
+#
+# Without --images a folder of synthetic JPEGs is written to a temporary directory. Each configuration reads
+# every image once (after one untimed pass to warm the page cache), and reports images per second and the
+# speedup over serial cv2.imread.
+#
+# python scripts/benchmark_image_grabber.py --images data/images/train --workers 1 2 4 8
+import argparse
+import pathlib
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from drone_detection.grabbers.image_grabber import ImageGrabber
+
+
+def write_images(directory: pathlib.Path, count: int, width: int, height: int) -> None:
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8), (0, 0), 5)
+    for i in range(count):
+        image = np.roll(base, 7 * i, axis=1)
+        cv2.imwrite(str(directory / f"frame_{i}.jpg"), image)
+
+
+def timed(read) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    n = read()
+    return time.perf_counter() - t0, n
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = pathlib.Path(args.images) if args.images else pathlib.Path(tmp)
+        if not args.images:
+            write_images(directory, args.count, args.width, args.height)
+        paths = ImageGrabber(image_path=str(directory), pattern=args.pattern).paths
+        print(f"{len(paths)} images in {directory}")
+
+        def serial() -> int:
+            return sum(cv2.imread(str(p)) is not None for p in paths)
+
+        configs = {"cv2.imread": serial}
+        for workers in args.workers:
+            for use_mmap in (False, True):
+                configs[f"{workers} workers{' mmap' if use_mmap else ''}"] = \
+                    lambda w=workers, m=use_mmap: sum(1 for _ in ImageGrabber(
+                        image_path=str(directory), pattern=args.pattern, workers=w, read_ahead=args.read_ahead,
+                        use_mmap=m))
+
+        serial()
+        baseline = None
+        print(f"{'reader':>18} {'images/s':>10} {'speedup':>8}")
+        for name, read in configs.items():
+            seconds, n = min((timed(read) for _ in range(args.repeats)), key=lambda r: r[0])
+            baseline = baseline or seconds
+            print(f"{name:>18} {n / seconds:>10.1f} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark parallel image folder reading")
+    parser.add_argument("--images", help="image folder, synthetic images if not given")
+    parser.add_argument("--pattern", default="*")
+    parser.add_argument("--count", type=int, default=500, help="number of synthetic images")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--read-ahead", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+# Benchmark the cold start of the main pipeline: a fresh interpreter imports the packages, builds the components
+# from config/config.yaml like main.py and processes the first frame.
+#
+# The lazy mode is the normal behaviour, only the selected backends are imported. The eager mode loads every
+# registered backend first, as the packages used to on import. Reports the time to import the packages, the
+# wall time from process start to the first processed frame and the number of loaded modules.
+#
+# python scripts/benchmark_import_time.py --overrides detector.type=MOG2 tracker.type=MultiObject
+import argparse
+import json
+import pathlib
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+package_root = pathlib.Path(__file__).resolve().parents[1]
+
+
+def child(args: argparse.Namespace) -> None:
+    t0 = time.perf_counter()
+    from hydra import compose, initialize_config_dir
+    from loguru import logger
+
+    from drone_detection import grabbers, detectors, trackers, classifiers
+    if args.child == "eager":
+        for factory in (detectors.DETECTOR_FACTORY, trackers.TRACKER_FACTORY, grabbers.GRABBER_FACTORY):
+            for entry_point in factory.values():
+                entry_point.load()
+    t_import = time.perf_counter() - t0
+
+    logger.remove()
+    with initialize_config_dir(config_dir=str(package_root / "config"), version_base=None):
+        cfg = compose(config_name="config", overrides=args.overrides)
+
+    detector = detectors.create(cfg.detector)
+    grabber = grabbers.create(cfg.grabber)
+    tracker = trackers.create(cfg.tracker)
+    classifiers.create(cfg.classifier)
+
+    image = next(iter(grabber))
+    tracker.update(detections=detector.run(image), frame=image)
+
+    print(json.dumps({"import_s": t_import, "first_frame_time": time.time(), "modules": len(sys.modules)}))
+
+
+def main(args: argparse.Namespace) -> None:
+    overrides = [f"grabber.parameters.video_path=[{args.video}]", *args.overrides]
+    print(f"{'mode':>6} {'import s':>10} {'first frame s':>14} {'modules':>8}")
+    for mode in ("eager", "lazy"):
+        results = []
+        for _ in range(args.repeats):
+            t0 = time.time()
+            out = subprocess.run([sys.executable, __file__, "--child", mode, "--overrides", *overrides],
+                                 check=True, capture_output=True, text=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            result["first_frame_s"] = result.pop("first_frame_time") - t0
+            results.append(result)
+        r = {k: float(np.median([x[k] for x in results])) for k in results[0]}
+        print(f"{mode:>6} {r['import_s']:>10.3f} {r['first_frame_s']:>14.3f} {r['modules']:>8.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of the pipeline to the first frame")
+    parser.add_argument("--overrides", nargs="*", default=[], help="hydra overrides of config/config.yaml")
+    parser.add_argument("--video", default=str(package_root / "data/demo.mp4"))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--child", choices=["eager", "lazy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    child(args) if args.child else main(args)
@@ -0,0 +1,110 @@
+# Benchmark the overhead of the pipeline metrics.
+#
+# The frames of a video are decoded once, then a headless MOG2 detector + MultiObject tracker pipeline runs over
+# them with the same instrumentation as drone_detection/main.py, alternating metrics on and off for each repeat.
+# Reports the time per frame of both and the overhead, and the cost of the instrumentation calls of one frame
+# on their own.
+#
+# python scripts/benchmark_metrics.py --video data/demo.mp4 --frames 300
+import argparse
+import pathlib
+import time
+
+import numpy as np
+
+from drone_detection.detectors import DetectorMOG2
+from drone_detection.grabbers import VideoGrabber
+from drone_detection.trackers import MultiObjectTracker
+from drone_detection.trackers.track_manager import TrackEvent, log_track_event
+from drone_detection.utils import MetricsRegistry, COUNT_BUCKETS
+
+package_root = pathlib.Path(__file__).resolve().parents[1]
+
+
+class Instruments:
+    """The metrics main.py records, per frame."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.stage_seconds = {stage: registry.histogram("stage_seconds", stage=stage)
+                              for stage in ("grabber", "detector", "tracker", "classifier", "writer")}
+        self.frames = registry.counter("frames")
+        self.detections = registry.histogram("detections_per_frame", buckets=COUNT_BUCKETS)
+        self.active_tracks = registry.gauge("active_tracks")
+        self.track_events = {event: registry.counter("track_events", event=event.value) for event in TrackEvent}
+
+
+def run(frames: list[np.ndarray], registry: MetricsRegistry) -> float:
+    metrics = Instruments(registry)
+    detector = DetectorMOG2()
+    tracker = MultiObjectTracker(max_age=10, track_kwargs={"state_history_max_length": 15})
+    tracker.manager.unsubscribe(log_track_event)
+    tracker.manager.subscribe(lambda event, track: metrics.track_events[event].inc())
+
+    t0 = time.perf_counter()
+    for frame in frames:
+        with metrics.stage_seconds["grabber"].time():
+            pass
+        metrics.frames.inc()
+        with metrics.stage_seconds["detector"].time():
+            detections = detector.run(frame)
+        metrics.detections.observe(len(detections))
+        with metrics.stage_seconds["tracker"].time():
+            tracks = tracker.update(detections=detections, frame=frame) or []
+        classify_s = 0.0
+        for _ in tracks:
+            t = time.perf_counter()
+            classify_s += time.perf_counter() - t
+        metrics.stage_seconds["classifier"].observe(classify_s)
+        metrics.active_tracks.set(len(tracks))
+    return (time.perf_counter() - t0) / len(frames)
+
+
+def instrumentation_cost(registry: MetricsRegistry, n: int, tracks: int) -> float:
+    """The time of one frame's metric updates with `tracks` classified tracks, in seconds."""
+    metrics = Instruments(registry)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        for stage in ("grabber", "detector", "tracker"):
+            with metrics.stage_seconds[stage].time():
+                pass
+        metrics.frames.inc()
+        metrics.detections.observe(3)
+        classify_s = 0.0
+        for _ in range(tracks):
+            t = time.perf_counter()
+            classify_s += time.perf_counter() - t
+        metrics.stage_seconds["classifier"].observe(classify_s)
+        metrics.active_tracks.set(tracks)
+    return (time.perf_counter() - t0) / n
+
+
+def main(args: argparse.Namespace) -> None:
+    grabber = VideoGrabber(video_path=args.video, video_root_dir=str(package_root))
+    frames = []
+    for frame in grabber:
+        if frame is None or len(frames) >= args.frames:
+            break
+        frames.append(frame)
+
+    on, off = MetricsRegistry(enabled=True), MetricsRegistry(enabled=False)
+    times = {"off": [], "on": []}
+    for _ in range(args.repeats):
+        times["off"].append(run(frames, off))
+        times["on"].append(run(frames, on))
+    best = {name: min(t) * 1000 for name, t in times.items()}
+    print(f"{len(frames)} frames, best of {args.repeats}")
+    print(f"metrics off: {best['off']:.3f} ms/frame")
+    print(f"metrics on:  {best['on']:.3f} ms/frame ({(best['on'] / best['off'] - 1) * 100:+.2f}%)")
+    for tracks in (0, 10, 100):
+        cost = {name: instrumentation_cost(registry, 20000, tracks) * 1e6 for name, registry in
+                (("off", off), ("on", on))}
+        print(f"instrumentation of one frame with {tracks:>3} tracks: {cost['on']:.1f} us on, "
+              f"{cost['off']:.1f} us off")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the overhead of the pipeline metrics")
+    parser.add_argument("--video", default="data/demo.mp4")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=5)
+    main(parser.parse_args())
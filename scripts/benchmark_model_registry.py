@@ -0,0 +1,72 @@
+# Benchmark the startup cost of the default detector + tracker pair with and without the shared model registry.
+#
+# Each mode runs in a fresh interpreter and reports the time to construct the detector and tracker (including the
+# registry's warm-up), the latency of the first detected and tracked frame, and the resident memory afterwards.
+#
+# python scripts/benchmark_model_registry.py --model-path yolov11s_640_best.pt
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def child(args: argparse.Namespace) -> None:
+    from loguru import logger
+    from omegaconf import DictConfig
+
+    logger.remove()
+    from drone_detection import detectors, trackers
+
+    shared = args.child == "shared"
+    frame = np.random.default_rng(0).integers(0, 255, size=(1080, 1920, 3), dtype=np.uint8)
+    rss_before = rss_mb()
+
+    t0 = time.perf_counter()
+    detector = detectors.create(DictConfig({"type": "YOLO",
+                                            "parameters": {"model_path": args.model_path, "share_model": shared}}))
+    tracker = trackers.create(DictConfig({"type": "YOLO",
+                                          "parameters": {"model_path": args.model_path, "share_model": shared,
+                                                         "config_file": args.yolo_config}}))
+    t1 = time.perf_counter()
+    detections = detector.run(frame)
+    tracker.update(detections=detections, frame=frame)
+    t2 = time.perf_counter()
+
+    print(json.dumps({"create_s": t1 - t0, "first_frame_s": t2 - t1, "total_s": t2 - t0,
+                      "rss_mb": rss_mb(), "model_rss_mb": rss_mb() - rss_before}))
+
+
+def main(args: argparse.Namespace) -> None:
+    print(f"{'mode':>10} {'create s':>10} {'first frame s':>14} {'total s':>10} {'RSS MB':>10} {'model RSS MB':>13}")
+    for mode in ("separate", "shared"):
+        results = []
+        for _ in range(args.repeats):
+            out = subprocess.run([sys.executable, __file__, "--child", mode, "--model-path", args.model_path,
+                                  "--yolo-config", args.yolo_config],
+                                 check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+        r = {k: float(np.median([x[k] for x in results])) for k in results[0]}
+        print(f"{mode:>10} {r['create_s']:>10.3f} {r['first_frame_s']:>14.3f} {r['total_s']:>10.3f} "
+              f"{r['rss_mb']:>10.1f} {r['model_rss_mb']:>13.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark startup time and memory with the shared model registry")
+    parser.add_argument("--model-path", default="yolov11s_640_best.pt",
+                        help="weights for the detector and tracker, relative to data/weights or absolute")
+    parser.add_argument("--yolo-config", default="botsort.yml", help="YOLO tracker config in config/")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--child", choices=["separate", "shared"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    child(args) if args.child else main(args)
@@ -0,0 +1,97 @@
+# Benchmark the MOG2 motion gate in front of the YOLO detector.
+#
+# Every frame is run through the plain YOLO detector (the reference) and through the motion gated
+# detector. Reports the fraction of frames the gate skipped, the wall and CPU time per frame of both,
+# and the recall of the gated detector against the reference detections.
+#
+# python scripts/benchmark_motion_gate.py --video data/demo.mp4 --model-path yolov11s_640_best.pt
+import argparse
+import pathlib
+import time
+
+import numpy as np
+from loguru import logger
+
+from drone_detection.detectors import DetectorYOLO, DetectorMotionGated, Detection, DetectionBatch
+from drone_detection.utils import iou_matrix
+from drone_detection.grabbers import VideoGrabber
+
+package_root = pathlib.Path(__file__).resolve().parents[1]
+
+
+def count_matches(reference: list[Detection], detections: list[Detection], iou_threshold: float) -> int:
+    """Greedily matches detections to the reference detections, returns the number matched."""
+    if not reference or not detections:
+        return 0
+    iou = iou_matrix(DetectionBatch.from_detections(reference).bboxes_xyxy,
+                     DetectionBatch.from_detections(detections).bboxes_xyxy)
+    matched = 0
+    while iou.size and iou.max() >= iou_threshold:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        iou[i, :] = 0
+        iou[:, j] = 0
+        matched += 1
+    return matched
+
+
+def main(args: argparse.Namespace) -> None:
+    detector = DetectorYOLO(model_path=args.model_path, min_confidence=args.min_confidence)
+    gated = DetectorMotionGated(detector=detector,
+                                mode=args.mode,
+                                hold_frames=args.hold_frames,
+                                refresh_interval=args.refresh_interval,
+                                motion={"scale": args.scale})
+    grabber = VideoGrabber(video_path=args.video, video_root_dir=str(package_root))
+
+    wall = {"reference": 0.0, "gated": 0.0}
+    cpu = {"reference": 0.0, "gated": 0.0}
+    n_reference = 0
+    n_matched = 0
+    frames = 0
+
+    for frame in grabber:
+        if frame is None or (args.max_frames and frames >= args.max_frames):
+            break
+        frames += 1
+
+        t0, c0 = time.perf_counter(), time.process_time()
+        reference = detector.run(frame)
+        t1, c1 = time.perf_counter(), time.process_time()
+        detections = gated.run(frame)
+        t2, c2 = time.perf_counter(), time.process_time()
+
+        wall["reference"] += t1 - t0
+        wall["gated"] += t2 - t1
+        cpu["reference"] += c1 - c0
+        cpu["gated"] += c2 - c1
+
+        n_reference += len(reference)
+        n_matched += count_matches(reference, detections, args.iou_threshold)
+
+    if frames == 0:
+        logger.error("No frames were read")
+        return
+
+    recall = n_matched / n_reference if n_reference else float("nan")
+    logger.info(f"Frames: {frames}, skipped by gate: {gated.frames_skipped} ({100 * gated.skip_fraction:.1f}%), "
+                f"roi: {gated.frames_roi}")
+    for name in ("reference", "gated"):
+        logger.info(f"{name:>9}: {1000 * wall[name] / frames:7.2f} ms/frame wall, "
+                    f"{1000 * cpu[name] / frames:7.2f} ms/frame cpu")
+    logger.info(f"CPU saving: {100 * (1 - cpu['gated'] / max(cpu['reference'], 1e-9)):.1f}%")
+    logger.info(f"Recall vs reference: {recall:.3f} ({n_matched}/{n_reference} detections, IoU>={args.iou_threshold})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the MOG2 motion gate in front of YOLO")
+    parser.add_argument("--video", default=str(package_root / "data/demo.mp4"))
+    parser.add_argument("--model-path", default="yolov11s_640_best.pt",
+                        help="weights file, relative to data/weights or absolute")
+    parser.add_argument("--min-confidence", type=float, default=0.3)
+    parser.add_argument("--mode", choices=["frame", "roi"], default="frame")
+    parser.add_argument("--scale", type=float, default=0.5, help="MOG2 downscale factor")
+    parser.add_argument("--hold-frames", type=int, default=10)
+    parser.add_argument("--refresh-interval", type=int, default=30)
+    parser.add_argument("--iou-threshold", type=float, default=0.5)
+    parser.add_argument("--max-frames", type=int, default=0, help="0 for the whole video")
+    main(parser.parse_args())
@@ -0,0 +1,89 @@
+# Benchmark drawing the track overlay.
+#
+# Synthetic tracks with classifications and threat scores are drawn on a frame of a video (or a random frame),
+# with the draw_* functions as main.py used to, and with the OverlayRenderer at the source resolution and at a
+# display width. Reports the time per frame of each for a range of track counts; the frame copy every
+# iteration needs is measured separately and subtracted.
+#
+# python scripts/benchmark_overlay.py --video data/demo.mp4 --tracks 10 50 100 200
+import argparse
+import pathlib
+import time
+import types
+
+import numpy as np
+
+from drone_detection.grabbers import VideoGrabber
+from drone_detection.utils import draw_track, draw_classification, draw_threat_scores, OverlayRenderer
+
+package_root = pathlib.Path(__file__).resolve().parents[1]
+
+CLASSES = ("Hovering", "Attacking", "Retreating", "Travelling", "Evading")
+
+
+def make_tracks(n: int, height: int, width: int, rng: np.random.Generator) -> tuple[list, dict, dict]:
+    tracks, classifications, threat_scores = [], {}, {}
+    for track_id in range(n):
+        x, y = rng.uniform(0, width - 60), rng.uniform(0, height - 40)
+        w, h = rng.uniform(10, 60), rng.uniform(10, 40)
+        tracks.append(types.SimpleNamespace(track_id=track_id, bbox_xyxy=np.array([x, y, x + w, y + h])))
+        probabilities = rng.dirichlet(np.ones(len(CLASSES)))
+        classifications[track_id] = dict(zip(CLASSES, probabilities.tolist()))
+        threat_scores[track_id] = float(rng.uniform(0, 100))
+    return tracks, classifications, threat_scores
+
+
+def draw_functions(image: np.ndarray, tracks: list, classifications: dict, threat_scores: dict) -> np.ndarray:
+    for track in tracks:
+        image = draw_classification(image, classifications=classifications[track.track_id],
+                                    bbox_xyxy=track.bbox_xyxy)
+        image = draw_track(image, bbox_xyxy=track.bbox_xyxy, track_id=track.track_id)
+    return draw_threat_scores(image, scores=threat_scores)
+
+
+def best_times(fns: list, repeats: int) -> list[float]:
+    """The best time of each function, interleaved so a slow phase of the machine affects them all alike."""
+    times = [[] for _ in fns]
+    for fn in fns:
+        fn()  # warm up, fills the caches
+    for _ in range(repeats):
+        for fn, fn_times in zip(fns, times):
+            t0 = time.perf_counter()
+            fn()
+            fn_times.append(time.perf_counter() - t0)
+    return [min(fn_times) for fn_times in times]
+
+
+def main(args: argparse.Namespace) -> None:
+    frame = None
+    if args.video:
+        grabber = VideoGrabber(video_path=args.video, video_root_dir=str(package_root))
+        frame = next(iter(grabber), None)
+    if frame is None:
+        frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    height, width = frame.shape[:2]
+    print(f"frame {width}x{height}, best of {args.repeats}, ms/frame")
+
+    renderer = OverlayRenderer()
+    display = OverlayRenderer(display_width=args.display_width)
+    print(f"{'tracks':>6} {'draw_*':>8} {'renderer':>9} {'speedup':>8} {f'@{args.display_width}px':>9}")
+    for n in args.tracks:
+        tracks, classifications, threat_scores = make_tracks(n, height, width, np.random.default_rng(n))
+        copy_s, old, new, small = best_times([
+            frame.copy,
+            lambda: draw_functions(frame.copy(), tracks, classifications, threat_scores),
+            lambda: renderer.render(frame.copy(), tracks, classifications, threat_scores),
+            # downscaling makes a new frame, no copy needed
+            lambda: display.render(frame, tracks, classifications, threat_scores),
+        ], args.repeats)
+        old, new = old - copy_s, new - copy_s
+        print(f"{n:>6} {old * 1000:>8.3f} {new * 1000:>9.3f} {old / new:>7.2f}x {small * 1000:>9.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark drawing the track overlay")
+    parser.add_argument("--video", default="data/demo.mp4", help="the first frame is drawn on, '' for random")
+    parser.add_argument("--tracks", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--display-width", type=int, default=960)
+    parser.add_argument("--repeats", type=int, default=50)
+    main(parser.parse_args())
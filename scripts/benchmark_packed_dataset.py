@@ -0,0 +1,79 @@
+# Benchmark ultralytics data loading from JPEG files against the packed training image cache.
+#
+# Without --images a YOLO folder of synthetic JPEGs and labels is written to a temporary directory. The images
+# are packed (timed once), then each dataset is iterated through every sample with and without training
+# augmentation, and images per second are reported. Only the loading is timed, no model is run.
+#
+# python scripts/benchmark_packed_dataset.py --images /path/to/yolo_drone_train/train/images --imgsz 640
+import argparse
+import pathlib
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from ultralytics.cfg import get_cfg
+from ultralytics.data import YOLODataset
+
+from drone_detection.training import pack_dataset, packed_path
+from drone_detection.training.ultralytics_packed import PackedYOLODataset
+
+
+def write_dataset(root: pathlib.Path, count: int, width: int, height: int) -> pathlib.Path:
+    images, labels = root / "images", root / "labels"
+    images.mkdir()
+    labels.mkdir()
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8), (0, 0), 5)
+    for i in range(count):
+        cv2.imwrite(str(images / f"frame_{i}.jpg"), np.roll(base, 7 * i, axis=1))
+        x, y = rng.uniform(0.1, 0.9, size=2)
+        (labels / f"frame_{i}.txt").write_text(f"0 {x:.4f} {y:.4f} 0.05 0.05\n")
+    return images
+
+
+def throughput(dataset: YOLODataset) -> float:
+    t0 = time.perf_counter()
+    for i in range(len(dataset)):
+        dataset[i]
+    return len(dataset) / (time.perf_counter() - t0)
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        images = pathlib.Path(args.images) if args.images else write_dataset(pathlib.Path(tmp), args.count,
+                                                                             args.width, args.height)
+        t0 = time.perf_counter()
+        pack_dataset(images, imgsz=args.imgsz, output_dir=pathlib.Path(tmp) / packed_path(images, args.imgsz).name,
+                     workers=args.workers)
+        print(f"packed {images} in {time.perf_counter() - t0:.1f} s")
+        # PackedYOLODataset looks for the pack beside the images, which must not be written into --images
+        pack_images = pathlib.Path(tmp) / images.name
+        if pack_images != images:
+            pack_images.symlink_to(images.resolve(), target_is_directory=True)
+            (pathlib.Path(tmp) / "labels").symlink_to(images.resolve().with_name("labels"), target_is_directory=True)
+
+        hyp = get_cfg(overrides={"imgsz": args.imgsz})
+        print(f"{'dataset':>10} {'augment':>8} {'images/s':>10} {'speedup':>8}")
+        for augment in (False, True):
+            baseline = None
+            for name, cls, path in (("jpeg", YOLODataset, images), ("packed", PackedYOLODataset, pack_images)):
+                dataset = cls(img_path=str(path), imgsz=args.imgsz, batch_size=args.batch, augment=augment, hyp=hyp,
+                              rect=False, stride=32, pad=0.0 if augment else 0.5, data={"names": {0: "drone"}},
+                              task="detect")
+                rate = max(throughput(dataset) for _ in range(args.repeats))
+                baseline = baseline or rate
+                print(f"{name:>10} {str(augment):>8} {rate:>10.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark data loading from JPEGs and from the packed cache")
+    parser.add_argument("--images", help="a YOLO images directory with labels beside it, synthetic if not given")
+    parser.add_argument("--count", type=int, default=300, help="number of synthetic images")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=8, help="packing threads")
+    parser.add_argument("--repeats", type=int, default=2)
+    main(parser.parse_args())
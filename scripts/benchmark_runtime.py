@@ -0,0 +1,117 @@
+# Sweep the runtime thread and core affinity settings on this host.
+#
+# Every combination of torch threads, OpenCV threads and stage affinity layout runs the pipeline from
+# config/config.yaml (grab, detect, track) in a fresh interpreter. Reports FPS and per-frame latency and prints
+# the runtime section with the best FPS and the one with the best 95th percentile latency.
+#
+# python scripts/benchmark_runtime.py --frames 200 --overrides detector.parameters.model_path=yolov11s_640_best.pt
+import argparse
+import itertools
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+package_root = pathlib.Path(__file__).resolve().parents[1]
+
+
+def affinity_layouts(cores: list[int]) -> dict[str, dict[str, str] | None]:
+    """
+    Candidate stage layouts: no pinning, and the detector on most of the cores with the other stages on the rest.
+    The cores are the ids this process may run on, which need not start at 0 or be contiguous (containers, taskset).
+    """
+    layouts: dict[str, dict[str, str] | None] = {"none": None}
+    if len(cores) >= 2:
+        split = max(1, len(cores) // 4)
+        others = ",".join(str(c) for c in cores[:split])
+        layouts["split"] = {"grabber": others, "tracker": others,
+                            "detector": ",".join(str(c) for c in cores[split:])}
+    return layouts
+
+
+def child(args: argparse.Namespace) -> None:
+    from hydra import compose, initialize_config_dir
+    from loguru import logger
+
+    from drone_detection import grabbers, detectors, trackers
+    from drone_detection.utils import Runtime
+
+    logger.remove()
+    with initialize_config_dir(config_dir=str(package_root / "config"), version_base=None):
+        cfg = compose(config_name="config", overrides=args.overrides)
+
+    detector = detectors.create(cfg.detector)
+    grabber = grabbers.create(cfg.grabber)
+    tracker = trackers.create(cfg.tracker)
+    runtime = Runtime(**json.loads(args.child))
+    runtime.apply()
+
+    frames = iter(grabber)
+    times = []
+    t_start = None
+    for i in range(args.frames + args.warmup):
+        if i == args.warmup:
+            t_start = time.perf_counter()
+        t0 = time.perf_counter()
+        with runtime.stage("grabber"):
+            image = next(frames, None)
+        if image is None:
+            break
+        with runtime.stage("detector"):
+            detections = detector.run(image)
+        with runtime.stage("tracker"):
+            tracker.update(detections=detections, frame=image)
+        if i >= args.warmup:
+            times.append(time.perf_counter() - t0)
+
+    times = np.array(times) * 1000
+    print(json.dumps({"fps": len(times) / (time.perf_counter() - t_start), "p50_ms": float(np.percentile(times, 50)),
+                      "p95_ms": float(np.percentile(times, 95))}))
+
+
+def main(args: argparse.Namespace) -> None:
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    n_cores = len(cores)
+    torch_threads = sorted({min(2 ** i, n_cores) for i in range(n_cores.bit_length() + 1)})
+    opencv_threads = sorted({0, 1, n_cores})
+    overrides = [f"grabber.parameters.video_path=[{args.video}]", *args.overrides]
+
+    results = []
+    print(f"{n_cores} cores")
+    print(f"{'torch':>6} {'opencv':>7} {'affinity':>9} {'fps':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for (n_torch, n_cv, (layout, affinity)) in itertools.product(torch_threads, opencv_threads,
+                                                                  affinity_layouts(cores).items()):
+        runtime = {"torch_threads": n_torch, "opencv_threads": n_cv, "affinity": affinity}
+        out = subprocess.run([sys.executable, __file__, "--child", json.dumps(runtime), "--frames", str(args.frames),
+                              "--warmup", str(args.warmup), "--overrides", *overrides],
+                             check=True, capture_output=True, text=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        results.append((runtime, result))
+        print(f"{n_torch:>6} {n_cv:>7} {layout:>9} {result['fps']:>8.1f} {result['p50_ms']:>8.2f} "
+              f"{result['p95_ms']:>8.2f}")
+
+    for label, best in (("FPS", max(results, key=lambda r: r[1]["fps"])),
+                        ("p95 latency", min(results, key=lambda r: r[1]["p95_ms"]))):
+        runtime, result = best
+        print(f"\nBest {label}: {result['fps']:.1f} FPS, p95 {result['p95_ms']:.2f} ms")
+        print("runtime:")
+        print(f"  torch_threads: {runtime['torch_threads']}")
+        print(f"  opencv_threads: {runtime['opencv_threads']}")
+        print("  affinity:" + ("" if runtime["affinity"] else " null"))
+        for stage, cores in (runtime["affinity"] or {}).items():
+            print(f"    {stage}: \"{cores}\"")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sweep runtime thread and affinity settings")
+    parser.add_argument("--overrides", nargs="*", default=[], help="hydra overrides of config/config.yaml")
+    parser.add_argument("--video", default=str(package_root / "data/demo.mp4"))
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    child(args) if args.child else main(args)
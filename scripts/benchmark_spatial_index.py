@@ -0,0 +1,86 @@
+# Scaling benchmark of the spatial grid index against the dense all-pairs computations.
+#
+# For each target count a synthetic scene is generated at a constant target density (so large counts
+# correspond to wide-area / tiled frames). Reports, per frame:
+#   - MultiObjectTracker association time with the dense cost matrix and with the spatial grid
+#   - the full tracker.update time with the grid
+#   - duplicate suppression time with utils.nms and utils.grid_nms
+#
+# python scripts/benchmark_spatial_index.py --targets 10 100 1000 5000
+import argparse
+import math
+import time
+
+import numpy as np
+from loguru import logger
+
+from scripts.benchmark_trackers import synthetic_scene
+from drone_detection.detectors import DetectionBatch
+from drone_detection.trackers import MultiObjectTracker
+from drone_detection.utils import nms, grid_nms
+
+
+def timed(func, times: list[float]):
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        result = func(*args, **kwargs)
+        times.append(time.perf_counter() - t0)
+        return result
+    return wrapper
+
+
+def benchmark(n_targets: int, n_frames: int, density: float, dense: bool) -> dict[str, float]:
+    # keep the number of targets per megapixel constant, 16:9 frame
+    height = int(math.sqrt(n_targets / density * 1e6 * 9 / 16))
+    width = int(height * 16 / 9)
+    frames = list(synthetic_scene(n_targets, n_frames, width=max(width, 640), height=max(height, 360),
+                                  render=False))
+
+    results = {}
+    modes = {"grid": 0, "dense": None} if dense else {"grid": 0}
+    for mode, grid_min_pairs in modes.items():
+        tracker = MultiObjectTracker(grid_min_pairs=grid_min_pairs)
+        association, update = [], []
+        tracker.associate = timed(tracker.associate, association)
+        for _, detections in frames:
+            t0 = time.perf_counter()
+            tracker.update(detections)
+            update.append(time.perf_counter() - t0)
+        # skip the first frames, there are no tracks to associate with
+        results[f"assoc_{mode}"] = 1000 * np.mean(association[2:])
+        results[f"update_{mode}"] = 1000 * np.mean(update[2:])
+
+    nms_times, grid_nms_times = [], []
+    for _, detections in frames:
+        batch = DetectionBatch.from_detections(detections)
+        scores = np.random.default_rng(0).random(len(batch))
+        if dense:
+            t0 = time.perf_counter()
+            nms(batch.bboxes_xyxy, scores, 0.5)
+            nms_times.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        grid_nms(batch.bboxes_xyxy, scores, 0.5)
+        grid_nms_times.append(time.perf_counter() - t0)
+    results["nms_dense"] = 1000 * np.mean(nms_times) if nms_times else float("nan")
+    results["nms_grid"] = 1000 * np.mean(grid_nms_times)
+    return results
+
+
+def main(args: argparse.Namespace) -> None:
+    logger.remove()
+
+    columns = ["assoc_dense", "assoc_grid", "update_dense", "update_grid", "nms_dense", "nms_grid"]
+    print(f"{'targets':>8} " + " ".join(f"{c + ' ms':>16}" for c in columns))
+    for n_targets in args.targets:
+        result = benchmark(n_targets, args.frames, args.density, dense=n_targets <= args.max_dense)
+        print(f"{n_targets:>8} " + " ".join(f"{result.get(c, float('nan')):>16.3f}" for c in columns))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scaling benchmark of the spatial grid index")
+    parser.add_argument("--targets", nargs="+", type=int, default=[10, 50, 100, 500, 1000, 2000, 5000])
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--density", type=float, default=100, help="targets per megapixel")
+    parser.add_argument("--max-dense", type=int, default=2000,
+                        help="skip the dense computations above this many targets (memory is quadratic)")
+    main(parser.parse_args())
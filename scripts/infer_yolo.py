@@ -2,10 +2,10 @@
 import pathlib
 
 import cv2
-from drone_detection.multiobject_tracker import MultiObjectTracker
 from omegaconf import DictConfig
 
 from drone_detection import grabbers, detectors
+from drone_detection.trackers import MultiObjectTracker
 from drone_detection.utils import draw_bbox
 
 package_root = pathlib.Path(__file__).resolve().parents[1]
@@ -0,0 +1,134 @@
+# Load generator for the inference service (drone_detection/service.py).
+#
+# Each simulated stream has its own connection and sends the frames of a video, JPEG encoded once up front. With
+# --fps every stream sends at that rate without waiting for responses (open loop, the latency includes queueing
+# when the service falls behind); without it each stream sends its next frame when the last response arrives
+# (closed loop). Reports, for each stream count, the throughput, the client measured latency percentiles, and the
+# service's mean batch size and queueing time.
+#
+# python scripts/load_test_service.py --port 8765 --streams 1 4 16 --fps 10
+# python scripts/load_test_service.py --local --streams 1 4 16 detector.parameters.model_path=<weights.pt>
+#
+# --local starts the service in this process with the repo config and the given overrides. Client and service
+# then share the CPU, run against a separate service process for figures to quote.
+import argparse
+import asyncio
+import dataclasses
+import pathlib
+import time
+
+import numpy as np
+
+from drone_detection.grabbers import VideoGrabber
+from drone_detection.service import ServiceClient, encode_frame
+
+package_root = pathlib.Path(__file__).resolve().parents[1]
+
+
+@dataclasses.dataclass()
+class Results:
+    latencies: list[float] = dataclasses.field(default_factory=list)
+    batch_sizes: list[int] = dataclasses.field(default_factory=list)
+    queue_ms: list[float] = dataclasses.field(default_factory=list)
+    errors: int = 0
+
+
+async def send(client: ServiceClient, stream_id: str, header: dict, payload: bytes, results: Results) -> None:
+    t0 = time.perf_counter()
+    try:
+        response = await client.request({**header, "stream": stream_id}, payload)
+    except RuntimeError:
+        results.errors += 1
+        return
+    results.latencies.append(time.perf_counter() - t0)
+    results.batch_sizes.append(response["timing"]["batch_size"])
+    results.queue_ms.append(response["timing"]["queue_ms"])
+
+
+async def run_stream(host: str, port: int, stream_id: str, frames: list[tuple[dict, bytes]], fps: float,
+                     duration: float, results: Results) -> None:
+    client = await ServiceClient(host, port).connect()
+    in_flight = set()
+    start = time.perf_counter()
+    for i in range(10 ** 9):
+        due = start + i / fps if fps else time.perf_counter()
+        if due - start >= duration:
+            break
+        header, payload = frames[i % len(frames)]
+        if fps:
+            await asyncio.sleep(max(due - time.perf_counter(), 0))
+            task = asyncio.create_task(send(client, stream_id, header, payload, results))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        else:
+            await send(client, stream_id, header, payload, results)
+    await asyncio.gather(*in_flight)
+    await client.end_stream(stream_id)
+    await client.close()
+
+
+async def load_test(host: str, port: int, streams: int, frames: list[tuple[dict, bytes]], fps: float,
+                    duration: float) -> tuple[Results, float]:
+    results = Results()
+    t0 = time.perf_counter()
+    await asyncio.gather(*[run_stream(host, port, f"load{i}", frames[i:] + frames[:i], fps, duration, results)
+                           for i in range(streams)])
+    return results, time.perf_counter() - t0
+
+
+async def main(args: argparse.Namespace) -> None:
+    grabber = VideoGrabber(video_path=args.video, video_root_dir=str(package_root))
+    frames = []
+    for frame in grabber:
+        if frame is None or len(frames) >= args.frames:
+            break
+        frames.append(encode_frame(frame, args.encoding))
+
+    service = server = None
+    host, port = args.host, args.port
+    if args.local:
+        from hydra import compose, initialize_config_dir
+        from drone_detection.service import create_service
+
+        with initialize_config_dir(config_dir=str(package_root / "config"), version_base=None):
+            cfg = compose(config_name="config", overrides=args.overrides)
+        service = await create_service(cfg).start()
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        host, port = "127.0.0.1", server.sockets[0].getsockname()[1]
+        # warm up the detector
+        await load_test(host, port, 1, frames, 0, 1.0)
+
+    mode = f"open loop at {args.fps:g} fps per stream" if args.fps else "closed loop"
+    print(f"{len(frames)} {args.encoding} frames, {args.duration:g} s per run, {mode}")
+    print(f"{'streams':>7} {'frames':>7} {'errors':>6} {'fps':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'batch':>6} {'queue ms':>9}")
+    for streams in args.streams:
+        results, elapsed = await load_test(host, port, streams, frames, args.fps, args.duration)
+        if not results.latencies:
+            print(f"{streams:>7} {0:>7} {results.errors:>6}")
+            continue
+        p50, p90, p99 = np.percentile(results.latencies, [50, 90, 99]) * 1000
+        print(f"{streams:>7} {len(results.latencies):>7} {results.errors:>6} "
+              f"{len(results.latencies) / elapsed:>7.1f} {p50:>8.1f} {p90:>8.1f} {p99:>8.1f} "
+              f"{max(results.latencies) * 1000:>8.1f} {np.mean(results.batch_sizes):>6.2f} "
+              f"{np.mean(results.queue_ms):>9.1f}")
+
+    if service is not None:
+        server.close()
+        await server.wait_closed()
+        await service.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load generator for the inference service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--local", action="store_true", help="start the service in this process")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--fps", type=float, default=0, help="frames per second per stream, 0 for closed loop")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per stream count")
+    parser.add_argument("--video", default="data/demo.mp4")
+    parser.add_argument("--frames", type=int, default=100, help="frames of the video sent, in a loop")
+    parser.add_argument("--encoding", default="jpeg", choices=["jpeg", "png", "raw"])
+    parser.add_argument("overrides", nargs="*", help="config overrides for --local, e.g. service.max_batch=8")
+    asyncio.run(main(parser.parse_args()))
@@ -1,6 +1,15 @@
 import xml.etree.ElementTree as ET
+import argparse
+import collections
+import concurrent.futures
+import errno
+import functools
+import hashlib
+import json
+import os
 import shutil  # For file copying
-from typing import Dict, List, Tuple, Optional
+import time
+from typing import Dict, List, Tuple, Optional, Any
 from pathlib import Path  # Using pathlib for more robust path handling
 from loguru import logger
 import sys  # For configuring loguru
@@ -12,75 +21,72 @@ logger.remove()
 logger.add(sys.stderr, format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}", level="INFO")
 
 
-def convert_voc_to_yolo(
+def parse_voc_annotation(
         xml_file_path: Path,
-        output_labels_dir: Path,
         class_mapping: Dict[str, int]
-) -> Tuple[Optional[Path], Optional[str]]:
+) -> Tuple[Optional[str], List[str], List[str]]:
     """
-    Converts a single PASCAL VOC XML annotation file to YOLO format and saves it.
+    Parses a single PASCAL VOC XML annotation file into YOLO format lines, without writing anything.
 
     Args:
         xml_file_path (Path): Path to the PASCAL VOC XML file.
-        output_labels_dir (Path): Directory to save the YOLO format .txt label file.
         class_mapping (Dict[str, int]): A dictionary mapping class names to class IDs.
 
     Returns:
-        Tuple[Optional[Path], Optional[str]]:
-            - Path to the created .txt label file if successful, else None.
+        Tuple[Optional[str], List[str], List[str]]:
             - The image filename extracted from the XML, else None.
+            - The YOLO annotation lines, empty if there are no valid objects.
+            - Messages describing anything that was skipped.
     """
     image_filename_from_xml: Optional[str] = None
+    problems: List[str] = []
     try:
         tree: ET.ElementTree = ET.parse(str(xml_file_path))
         root: ET.Element = tree.getroot()
 
         image_filename_element: Optional[ET.Element] = root.find('filename')
         if image_filename_element is None or image_filename_element.text is None:
-            logger.warning(f"'filename' tag not found or empty in {xml_file_path}. Skipping.")
-            return None, None
+            return None, [], [f"'filename' tag not found or empty in {xml_file_path}. Skipping."]
         image_filename_from_xml = image_filename_element.text
 
         size_element: Optional[ET.Element] = root.find('size')
         if size_element is None:
-            logger.warning(f"'size' tag not found in {xml_file_path} (image: {image_filename_from_xml}). Skipping.")
-            return None, image_filename_from_xml
+            return image_filename_from_xml, [], [
+                f"'size' tag not found in {xml_file_path} (image: {image_filename_from_xml}). Skipping."]
 
         img_width_element: Optional[ET.Element] = size_element.find('width')
         img_height_element: Optional[ET.Element] = size_element.find('height')
 
         if img_width_element is None or img_width_element.text is None or \
                 img_height_element is None or img_height_element.text is None:
-            logger.warning(
-                f"Image width or height tags are missing or empty in {xml_file_path} (image: {image_filename_from_xml}). Skipping.")
-            return None, image_filename_from_xml
+            return image_filename_from_xml, [], [
+                f"Image width or height tags are missing or empty in {xml_file_path} (image: {image_filename_from_xml}). Skipping."]
 
         img_width: int = int(img_width_element.text)
         img_height: int = int(img_height_element.text)
 
         if img_width == 0 or img_height == 0:
-            logger.warning(
-                f"Image width or height is 0 in {xml_file_path} (Width: {img_width}, Height: {img_height}, image: {image_filename_from_xml}). Skipping.")
-            return None, image_filename_from_xml
+            return image_filename_from_xml, [], [
+                f"Image width or height is 0 in {xml_file_path} (Width: {img_width}, Height: {img_height}, image: {image_filename_from_xml}). Skipping."]
 
         yolo_annotations: List[str] = []
         for obj_element in root.findall('object'):
             class_name_element: Optional[ET.Element] = obj_element.find('name')
             if class_name_element is None or class_name_element.text is None:
-                logger.warning(
+                problems.append(
                     f"Object 'name' tag not found or empty in an object in {xml_file_path} (image: {image_filename_from_xml}). Skipping object.")
                 continue
             class_name: str = class_name_element.text
 
             if class_name not in class_mapping:
-                logger.warning(
+                problems.append(
                     f"Class '{class_name}' not in class_mapping. Skipping object in {xml_file_path} (image: {image_filename_from_xml}).")
                 continue
             class_id: int = class_mapping[class_name]
 
             bndbox_element: Optional[ET.Element] = obj_element.find('bndbox')
             if bndbox_element is None:
-                logger.warning(
+                problems.append(
                     f"Object 'bndbox' tag not found for class '{class_name}' in {xml_file_path} (image: {image_filename_from_xml}). Skipping object.")
                 continue
 
@@ -90,12 +96,12 @@ def convert_voc_to_yolo(
                 xmax: float = float(bndbox_element.findtext('xmax', '0'))
                 ymax: float = float(bndbox_element.findtext('ymax', '0'))
             except (ValueError, TypeError) as e:
-                logger.error(
+                problems.append(
                     f"Could not parse bounding box coordinates for an object in {xml_file_path} (image: {image_filename_from_xml}). Error: {e}. Skipping object.")
                 continue
 
             if xmax <= xmin or ymax <= ymin:
-                logger.warning(
+                problems.append(
                     f"Invalid bounding box (xmax <= xmin or ymax <= ymin) for class '{class_name}' in {xml_file_path} (image: {image_filename_from_xml}): "
                     f"xmin={xmin}, ymin={ymin}, xmax={xmax}, ymax={ymax}. Skipping object.")
                 continue
@@ -118,32 +124,60 @@ def convert_voc_to_yolo(
             yolo_annotations.append(
                 f"{class_id} {x_center_norm:.6f} {y_center_norm:.6f} {width_norm:.6f} {height_norm:.6f}")
 
-        if not yolo_annotations:
-            logger.info(
-                f"No valid objects found or converted for {xml_file_path.name} (image: {image_filename_from_xml}). No label file created.")
-            return None, image_filename_from_xml
+        return image_filename_from_xml, yolo_annotations, problems
 
-        output_labels_dir.mkdir(parents=True, exist_ok=True)
-        base_filename_stem: str = Path(image_filename_from_xml).stem  # e.g., "VS_P65" from "VS_P65.jpg"
-        output_label_file_path: Path = output_labels_dir / f"{base_filename_stem}.txt"
+    except ET.ParseError:
+        return None, [], [f"Could not parse XML file {xml_file_path}. It might be corrupted or not a valid XML."]
+    except FileNotFoundError:
+        return None, [], [f"XML file not found at {xml_file_path}."]
+    except Exception as e:
+        # Return filename if extracted before error
+        return image_filename_from_xml, [], [f"An unexpected error occurred while processing {xml_file_path}: {e}"]
 
-        with open(output_label_file_path, 'w') as f:
-            for ann in yolo_annotations:
-                f.write(ann + '\n')
 
-        logger.info(
-            f"Successfully converted {xml_file_path.name} to {output_label_file_path.name} (image: {image_filename_from_xml})")
-        return output_label_file_path, image_filename_from_xml
+def convert_voc_to_yolo(
+        xml_file_path: Path,
+        output_labels_dir: Path,
+        class_mapping: Dict[str, int]
+) -> Tuple[Optional[Path], Optional[str]]:
+    """
+    Converts a single PASCAL VOC XML annotation file to YOLO format and saves it.
 
-    except ET.ParseError:
-        logger.error(f"Could not parse XML file {xml_file_path}. It might be corrupted or not a valid XML.")
-        return None, None  # No image filename if XML can't be parsed
-    except FileNotFoundError:
-        logger.error(f"XML file not found at {xml_file_path}.")
+    Args:
+        xml_file_path (Path): Path to the PASCAL VOC XML file.
+        output_labels_dir (Path): Directory to save the YOLO format .txt label file.
+        class_mapping (Dict[str, int]): A dictionary mapping class names to class IDs.
+
+    Returns:
+        Tuple[Optional[Path], Optional[str]]:
+            - Path to the created .txt label file if successful, else None.
+            - The image filename extracted from the XML, else None.
+    """
+    image_filename_from_xml, yolo_annotations, problems = parse_voc_annotation(xml_file_path, class_mapping)
+    for problem in problems:
+        logger.warning(problem)
+    if image_filename_from_xml is None:
         return None, None
-    except Exception as e:
-        logger.exception(f"An unexpected error occurred while processing {xml_file_path}: {e}")
-        return None, image_filename_from_xml  # Return filename if extracted before error
+
+    if not yolo_annotations:
+        logger.info(
+            f"No valid objects found or converted for {xml_file_path.name} (image: {image_filename_from_xml}). No label file created.")
+        return None, image_filename_from_xml
+
+    output_label_file_path: Path = write_label_file(output_labels_dir, image_filename_from_xml, yolo_annotations)
+    logger.info(
+        f"Successfully converted {xml_file_path.name} to {output_label_file_path.name} (image: {image_filename_from_xml})")
+    return output_label_file_path, image_filename_from_xml
+
+
+def write_label_file(output_labels_dir: Path, image_filename: str, yolo_annotations: List[str]) -> Path:
+    """Writes the YOLO annotation lines of an image to <output_labels_dir>/<image stem>.txt."""
+    output_labels_dir.mkdir(parents=True, exist_ok=True)
+    base_filename_stem: str = Path(image_filename).stem  # e.g., "VS_P65" from "VS_P65.jpg"
+    output_label_file_path: Path = output_labels_dir / f"{base_filename_stem}.txt"
+    with open(output_label_file_path, 'w') as f:
+        f.write(''.join(ann + '\n' for ann in yolo_annotations))
+    return output_label_file_path
 
 
 def process_dataset_folders(
@@ -246,23 +280,245 @@ def process_dataset_folders(
     logger.info(f"Check '{output_images_dir}' for images and '{output_labels_dir}' for labels.")
 
 
+MANIFEST_NAME = ".prepare_data_manifest.json"
+LINK_MODES = ("auto", "hardlink", "reflink", "copy")
+FICLONE = 0x40049409  # Linux ioctl to share the data blocks of a file (btrfs, xfs)
+
+
+def file_signature(path: Path, check: str) -> Optional[str]:
+    """Signature of a file for incremental runs: size and mtime ("mtime") or a content hash ("hash")."""
+    try:
+        if check == "hash":
+            with open(path, 'rb') as f:
+                return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        stat = path.stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    except FileNotFoundError:
+        return None
+
+
+def link_or_copy(source: Path, target: Path, mode: str = "auto") -> str:
+    """
+    Places source at target as a hardlink, a reflink or a copy.
+
+    Args:
+        source (Path): The source file.
+        target (Path): The target path, replaced if it exists.
+        mode (str): "hardlink", "reflink" or "copy", or "auto" to use the first one the filesystem allows.
+
+    Returns:
+        str: The method used.
+    """
+    if target.exists() or target.is_symlink():
+        target.unlink()
+    if mode in ("auto", "hardlink"):
+        try:
+            os.link(source, target)
+            return "hardlink"
+        except OSError as e:
+            if mode == "hardlink" or e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+    if mode in ("auto", "reflink"):
+        try:
+            try:
+                import fcntl  # not available on Windows
+            except ImportError:
+                raise OSError(errno.ENOTSUP, "reflinks need fcntl") from None
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return "reflink"
+        except OSError:
+            target.unlink(missing_ok=True)
+            if mode == "reflink":
+                raise
+    shutil.copy2(source, target)
+    return "copy"
+
+
+def _remove_outputs(image_filename: str, output_images_dir: Path, output_labels_dir: Path) -> None:
+    """Removes the label and image written for an image by an earlier run."""
+    (output_labels_dir / f"{Path(image_filename).stem}.txt").unlink(missing_ok=True)
+    (output_images_dir / image_filename).unlink(missing_ok=True)
+
+
+def _is_up_to_date(entry: Dict[str, Any], xml_signature: Optional[str], image_input_dir: Path,
+                   output_images_dir: Path, output_labels_dir: Path, check: str) -> bool:
+    """Whether an XML file, its image and its outputs are unchanged since the run that wrote the manifest entry."""
+    if entry["xml"] != xml_signature:
+        return False
+    image_filename = entry["image_filename"]
+    if image_filename is None:
+        return True
+    if entry["image"] != file_signature(image_input_dir / image_filename, check):
+        return False
+    return not entry["label"] or ((output_labels_dir / f"{Path(image_filename).stem}.txt").exists()
+                                  and (output_images_dir / image_filename).exists())
+
+
+def process_dataset_folders_parallel(
+        image_input_dir: Path,
+        annotation_input_dir: Path,
+        yolo_base_output_dir: Path,
+        class_mapping: Dict[str, int],
+        workers: Optional[int] = None,
+        link_mode: str = "auto",
+        check: str = "mtime",
+        chunksize: int = 64,
+        max_problem_logs: int = 10
+) -> Dict[str, Any]:
+    """
+    Converts a PASCAL VOC dataset into the same YOLO layout as process_dataset_folders, in parallel and
+    incrementally.
+
+    The XML files are parsed in a process pool and the labels are written as the results stream back. Images
+    are hardlinked or reflinked into the output instead of copied where the filesystem allows. A manifest in the
+    output directory records the signature of every converted XML file and image, and files whose outputs are
+    up to date are skipped on the next run. The outputs of XML files that no longer produce a label, or were
+    deleted, are removed. Only counters are logged, plus the first few skipped objects.
+
+    Args:
+        image_input_dir (Path): Path to the folder containing source image files.
+        annotation_input_dir (Path): Path to the folder containing PASCAL VOC XML annotation files.
+        yolo_base_output_dir (Path): Base directory to save the structured YOLO dataset.
+        class_mapping (Dict[str, int]): Dictionary mapping class names to class IDs.
+        workers (Optional[int]): Parser processes, None for one per core.
+        link_mode (str): One of LINK_MODES.
+        check (str): "mtime" or "hash", how to decide whether a file changed since the last run.
+        chunksize (int): XML files sent to a worker at a time.
+        max_problem_logs (int): Log at most this many skipped objects or files, the rest are only counted.
+
+    Returns:
+        Dict[str, Any]: The counters of the run.
+    """
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode {link_mode}, expected one of {LINK_MODES}")
+    if check not in ("mtime", "hash"):
+        raise ValueError(f"Unknown check {check}, expected mtime or hash")
+    if not annotation_input_dir.is_dir() or not image_input_dir.is_dir():
+        raise FileNotFoundError(f"Input directories not found: {annotation_input_dir}, {image_input_dir}")
+
+    t_start = time.perf_counter()
+    output_images_dir: Path = yolo_base_output_dir / 'images'
+    output_labels_dir: Path = yolo_base_output_dir / 'labels'
+    output_images_dir.mkdir(parents=True, exist_ok=True)
+    output_labels_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = yolo_base_output_dir / MANIFEST_NAME
+    manifest: Dict[str, Dict[str, Any]] = {}
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("check") != check:
+            manifest = {}
+    entries: Dict[str, Dict[str, Any]] = manifest.get("files", {})
+
+    counters: collections.Counter = collections.Counter()
+    xml_files: List[Path] = sorted(annotation_input_dir.glob('*.xml'))
+    counters["xml_files"] = len(xml_files)
+
+    # a file is up to date if it, its image and its outputs are unchanged since the last run
+    to_process: List[Path] = []
+    signatures: Dict[str, Optional[str]] = {}
+    for xml_file_path in xml_files:
+        signatures[xml_file_path.name] = file_signature(xml_file_path, check)
+        entry = entries.get(xml_file_path.name)
+        if entry is not None and _is_up_to_date(entry, signatures[xml_file_path.name], image_input_dir,
+                                                output_images_dir, output_labels_dir, check):
+            counters["up_to_date"] += 1
+        else:
+            to_process.append(xml_file_path)
+
+    # outputs of earlier runs that may no longer be produced, removed at the end unless still in use
+    stale: List[str] = []
+    for name in set(entries) - set(signatures):
+        entry = entries.pop(name)
+        if entry["label"]:
+            stale.append(entry["image_filename"])
+
+    parse = functools.partial(parse_voc_annotation, class_mapping=class_mapping)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for xml_file_path, (image_filename, annotations, problems) in zip(
+                to_process, pool.map(parse, to_process, chunksize=chunksize)):
+            for problem in problems:
+                if counters["problems"] < max_problem_logs:
+                    logger.warning(problem)
+                counters["problems"] += 1
+            previous = entries.get(xml_file_path.name)
+            if previous is not None and previous["label"]:
+                stale.append(previous["image_filename"])
+            # unreadable files and missing images are recorded too, so they are only retried once they change
+            entries[xml_file_path.name] = {"xml": signatures[xml_file_path.name], "image": None,
+                                           "image_filename": image_filename, "label": False}
+            if image_filename is None:
+                counters["unreadable_xml"] += 1
+                continue
+
+            source_image_path: Path = image_input_dir / image_filename
+            if not source_image_path.is_file():
+                counters["image_not_found"] += 1
+                continue
+            if annotations:
+                write_label_file(output_labels_dir, image_filename, annotations)
+                counters["labels_written"] += 1
+                counters[f"images_{link_or_copy(source_image_path, output_images_dir / image_filename, link_mode)}"] += 1
+            else:
+                counters["no_valid_objects"] += 1
+            entries[xml_file_path.name] = {"xml": signatures[xml_file_path.name],
+                                           "image": file_signature(source_image_path, check),
+                                           "image_filename": image_filename,
+                                           "label": bool(annotations)}
+
+    in_use = {entry["image_filename"] for entry in entries.values() if entry["label"]}
+    for image_filename in set(stale) - in_use:
+        _remove_outputs(image_filename, output_images_dir, output_labels_dir)
+        counters["stale_removed"] += 1
+
+    with open(manifest_path, 'w') as f:
+        json.dump({"check": check, "files": entries}, f)
+
+    elapsed = time.perf_counter() - t_start
+    counters["processed"] = len(to_process)
+    summary: Dict[str, Any] = {**counters, "seconds": round(elapsed, 3),
+                               "files_per_second": round(len(xml_files) / max(elapsed, 1e-9), 1)}
+    logger.info("--- Processing Summary ---")
+    logger.info(", ".join(f"{k}: {v}" for k, v in summary.items()))
+    return summary
+
+
 if __name__ == '__main__':
     CLASS_MAPPING: Dict[str, int] = {
         'drone': 0,
     }
 
     base_example_dir = Path.home() / "data"
-    base_example_dir.mkdir(exist_ok=True)
-    source_images_folder: Path = base_example_dir / "DroneTestDataset" / "Drone_TestSet"
-    source_annotations_folder: Path = base_example_dir / "DroneTestDataset" /"Drone_TestSet_XMLs"
-    yolo_output_dataset_folder: Path = base_example_dir / "yolo_drone_test"
-
+    parser = argparse.ArgumentParser(description="Convert a PASCAL VOC dataset to the YOLO layout")
+    parser.add_argument("--images", type=Path, default=base_example_dir / "DroneTestDataset" / "Drone_TestSet")
+    parser.add_argument("--annotations", type=Path,
+                        default=base_example_dir / "DroneTestDataset" / "Drone_TestSet_XMLs")
+    parser.add_argument("--output", type=Path, default=base_example_dir / "yolo_drone_test")
+    parser.add_argument("--serial", action="store_true", help="convert one file at a time, logging every file")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes, default one per core")
+    parser.add_argument("--link", choices=LINK_MODES, default="auto",
+                        help="how images are placed in the output, auto tries hardlink, reflink then copy")
+    parser.add_argument("--check", choices=["mtime", "hash"], default="mtime",
+                        help="how unchanged files are detected on re-runs")
+    args = parser.parse_args()
 
     logger.info("--- Starting dataset processing ---")
-    process_dataset_folders(
-        image_input_dir=source_images_folder,
-        annotation_input_dir=source_annotations_folder,
-        yolo_base_output_dir=yolo_output_dataset_folder,
-        class_mapping=CLASS_MAPPING
-    )
-
+    if args.serial:
+        process_dataset_folders(
+            image_input_dir=args.images,
+            annotation_input_dir=args.annotations,
+            yolo_base_output_dir=args.output,
+            class_mapping=CLASS_MAPPING
+        )
+    else:
+        process_dataset_folders_parallel(
+            image_input_dir=args.images,
+            annotation_input_dir=args.annotations,
+            yolo_base_output_dir=args.output,
+            class_mapping=CLASS_MAPPING,
+            workers=args.workers,
+            link_mode=args.link,
+            check=args.check
+        )
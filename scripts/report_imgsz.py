@@ -0,0 +1,111 @@
+# Report the accuracy / latency trade-off of the YOLO inference size on a video.
+#
+# Every frame is run through the detector at each size. The detections at the largest size are the reference:
+# for each size the report gives the latency per frame, the detections per frame, the recall and precision
+# against the reference, and the recall of small reference targets (smaller side below --small-px). Also
+# reports how often a ResolutionSelector with the given settings would have picked each size on the video.
+#
+# python scripts/report_imgsz.py --video data/demo.mp4 --model-path yolov11s_640_best.pt --sizes 320 480 640 960
+import argparse
+import pathlib
+import time
+
+import numpy as np
+from loguru import logger
+
+from drone_detection.detectors import DetectorYOLO, Detection, DetectionBatch
+from drone_detection.detectors.resolution import ResolutionSelector
+from drone_detection.grabbers import VideoGrabber
+from drone_detection.utils import iou_matrix
+
+package_root = pathlib.Path(__file__).resolve().parents[1]
+
+
+def match(reference: list[Detection], detections: list[Detection], iou_threshold: float) -> np.ndarray:
+    """Greedily matches detections to the reference detections, returns a mask of the matched references."""
+    matched = np.zeros(len(reference), dtype=bool)
+    if not reference or not detections:
+        return matched
+    iou = iou_matrix(DetectionBatch.from_detections(reference).bboxes_xyxy,
+                     DetectionBatch.from_detections(detections).bboxes_xyxy)
+    while iou.size and iou.max() >= iou_threshold:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        iou[i, :] = 0
+        iou[:, j] = 0
+        matched[i] = True
+    return matched
+
+
+def main(args: argparse.Namespace) -> None:
+    sizes = sorted(args.sizes)
+    detector = DetectorYOLO(model_path=args.model_path, min_confidence=args.min_confidence, device=args.device)
+    selector = ResolutionSelector(sizes, min_target_px=args.min_target_px, budget_ms=args.budget_ms,
+                                  refresh_interval=args.refresh_interval)
+    grabber = VideoGrabber(video_path=args.video, video_root_dir=str(package_root))
+
+    latency: dict[int, list[float]] = {s: [] for s in sizes}
+    n_detections = dict.fromkeys(sizes, 0)
+    n_matched = dict.fromkeys(sizes, 0)
+    n_small_matched = dict.fromkeys(sizes, 0)
+    n_reference = n_small = frames = 0
+
+    for frame in grabber:
+        if frame is None or (args.max_frames and frames >= args.max_frames):
+            break
+        frames += 1
+
+        results = {}
+        for size in sizes:
+            detector.imgsz = size
+            t0 = time.perf_counter()
+            results[size] = detector.run(frame)
+            latency[size].append((time.perf_counter() - t0) * 1000)
+            selector.record(size, latency[size][-1])
+
+        reference = results[sizes[-1]]
+        small = np.array([min(x1 - x0, y1 - y0) < args.small_px for x0, y0, x1, y1 in
+                          (d.bbox_xyxy for d in reference)], dtype=bool)
+        n_reference += len(reference)
+        n_small += int(small.sum())
+        for size in sizes:
+            matched = match(reference, results[size], args.iou_threshold)
+            n_detections[size] += len(results[size])
+            n_matched[size] += int(matched.sum())
+            n_small_matched[size] += int(matched[small].sum())
+
+        # the selector sees the reference detections as the tracks
+        selector.select(frame.shape)
+        selector.observe_tracks(min(x1 - x0, y1 - y0) for x0, y0, x1, y1 in (d.bbox_xyxy for d in reference))
+
+    if frames == 0:
+        logger.error("No frames were read")
+        return
+
+    print(f"{frames} frames, {n_reference} reference detections at imgsz {sizes[-1]}, {n_small} smaller than "
+          f"{args.small_px} px, IoU>={args.iou_threshold}")
+    print(f"{'imgsz':>6} {'mean ms':>8} {'p95 ms':>8} {'det/frame':>10} {'recall':>7} {'precision':>10} "
+          f"{'small recall':>13} {'selected':>9}")
+    for size in sizes:
+        recall = n_matched[size] / n_reference if n_reference else float("nan")
+        precision = n_matched[size] / n_detections[size] if n_detections[size] else float("nan")
+        small_recall = n_small_matched[size] / n_small if n_small else float("nan")
+        print(f"{size:>6} {np.mean(latency[size]):>8.2f} {np.percentile(latency[size], 95):>8.2f} "
+              f"{n_detections[size] / frames:>10.2f} {recall:>7.3f} {precision:>10.3f} {small_recall:>13.3f} "
+              f"{selector.frames_per_size[size] / frames:>9.1%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report YOLO accuracy and latency at each inference size")
+    parser.add_argument("--video", default=str(package_root / "data/demo.mp4"))
+    parser.add_argument("--model-path", default="yolov11s_640_best.pt",
+                        help="weights file, relative to data/weights or absolute")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[320, 480, 640, 960])
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--min-confidence", type=float, default=0.3)
+    parser.add_argument("--iou-threshold", type=float, default=0.5)
+    parser.add_argument("--small-px", type=float, default=32, help="smaller side of a small target")
+    parser.add_argument("--min-target-px", type=float, default=12, help="ResolutionSelector.min_target_px")
+    parser.add_argument("--budget-ms", type=float, default=None, help="ResolutionSelector.budget_ms")
+    parser.add_argument("--refresh-interval", type=int, default=30, help="ResolutionSelector.refresh_interval")
+    parser.add_argument("--max-frames", type=int, default=0, help="0 for the whole video")
+    main(parser.parse_args())
@@ -1,8 +1,31 @@
+# Train a YOLO detector on a dataset prepared by scripts/prepare_data.py.
+#
+# With --packed the images are decoded once into a memory-mapped cache beside each images directory (see
+# drone_detection/training/packed.py) and training and validation read from it instead of decoding JPEGs.
+#
+# python scripts/train_yolo.py --data /path/to/yolo_drone_train/data.yaml --packed
+import argparse
+
 from ultralytics import YOLO
 
-# Load a COCO-pretrained YOLO11n model
-model = YOLO("yolo11s.pt")
 
-# Train the model on the COCO8 example dataset for 100 epochs
-results = model.train(data="/home/iain/data/yolo_drone_train/data.yaml", epochs=10, batch=32, imgsz=640)
+def main(args: argparse.Namespace) -> None:
+    model = YOLO(args.model)
+    kwargs = {}
+    if args.packed:
+        from drone_detection.training.ultralytics_packed import PackedDetectionTrainer
+        kwargs["trainer"] = PackedDetectionTrainer
+    model.train(data=args.data, epochs=args.epochs, batch=args.batch, imgsz=args.imgsz, workers=args.workers,
+                **kwargs)
+
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train a YOLO detector")
+    parser.add_argument("--data", required=True, help="dataset yaml")
+    parser.add_argument("--model", default="yolo11s.pt", help="the model to start from")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--workers", type=int, default=8, help="data loader workers")
+    parser.add_argument("--packed", action="store_true", help="read images from the packed image cache")
+    main(parser.parse_args())
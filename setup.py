@@ -20,6 +20,9 @@ setup(
             'pytest',
             'flake8',
         ],
+        'pyav': [
+            'av>=12',
+        ],
     },
     classifiers=[
         'Development Status :: 3 - Alpha',
@@ -0,0 +1,53 @@
+import pathlib
+
+from omegaconf import OmegaConf
+
+from drone_detection import batch
+from drone_detection.batch import Shard, ShardResult, run_shard, stitch
+
+package_root = pathlib.Path(__file__).resolve().parents[2]
+
+
+def _records(track_id: str, frames: range, x: float) -> list[dict]:
+    return [{"frame": f, "track_id": track_id, "bbox_xyxy": [x + f, 0, x + f + 10, 10], "threat_score": None,
+             "classification": None} for f in frames]
+
+
+def test_stitch_keeps_track_ids_across_shards():
+    first = ShardResult(shard=Shard("v.mp4", 0, 100, 0),
+                        records=_records("1", range(0, 100), 0) + _records("2", range(50, 100), 500), frames=100)
+    # the second shard re-processes frames 80-99, its tracker numbers the same targets differently
+    second = ShardResult(shard=Shard("v.mp4", 80, 200, 100),
+                         records=_records("1", range(85, 200), 500) + _records("7", range(80, 150), 0)
+                         + _records("9", range(120, 200), 1000), frames=120)
+
+    records = stitch([second, first])
+
+    ids = {(r["frame"], r["bbox_xyxy"][0] - r["frame"]): r["track_id"] for r in records}
+    assert ids[(10, 0)] == ids[(140, 0)]
+    assert ids[(60, 500)] == ids[(190, 500)]
+    assert ids[(190, 1000)] not in (ids[(10, 0)], ids[(60, 500)])
+    # the overlap frames come from the first shard only
+    assert len([r for r in records if r["frame"] == 90]) == 2
+
+
+def test_run_shard_does_not_carry_detector_state_between_shards():
+    cfg = OmegaConf.load(package_root / "config/config.yaml")
+    cfg.detector = {"type": "MOG2", "parameters": {}}
+    cfg.tracker = {"type": "MultiObject", "age_threshold": 10, "parameters": {}}
+    cfg = OmegaConf.to_container(cfg)
+    shard = Shard(str(package_root / "data/demo.mp4"), 0, 40, 0)
+
+    first = run_shard(cfg, shard)
+    # the worker's second shard starts from an empty background model, not the first shard's
+    second = run_shard(cfg, shard)
+
+    assert first.records and first.records == second.records
+
+
+def test_plan_shards_keeps_the_video_whole_without_pyav(monkeypatch):
+    monkeypatch.setattr(batch, "_pyav_available", lambda: False)
+
+    shards = batch.plan_shards(package_root / "data/demo.mp4", shard_frames=20, overlap_frames=5)
+
+    assert len(shards) == 1 and shards[0].start == 0 and shards[0].owned_from == 0
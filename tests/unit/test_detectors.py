@@ -1,9 +1,12 @@
 import pathlib
 
 import cv2
+import numpy as np
 from omegaconf import DictConfig
 
-from drone_detection.detectors import create, DetectorType, DetectorYOLO
+from drone_detection.detectors import create, BaseDetector, DetectorType, DetectorYOLO, DetectorMOG2, \
+    DetectorMotionGated
+from drone_detection.detectors.resolution import ResolutionSelector
 
 
 def test_detector_factory():
@@ -26,3 +29,78 @@ def test_detector_yolo_run():
     assert isinstance(detections, list)
     assert len(detections) == 1
     assert len(detections[0].bbox_xyxy) == 4
+
+
+def _moving_square_frames(n_static: int = 30, n_moving: int = 10):
+    background = np.full((240, 320, 3), 120, dtype=np.uint8)
+    for _ in range(n_static):
+        yield background.copy()
+    for i in range(n_moving):
+        frame = background.copy()
+        frame[100:120, 50 + 10 * i:70 + 10 * i] = 255
+        yield frame
+
+
+def test_detector_mog2_run():
+    detector = create(cfg=DictConfig({"type": DetectorType.MOG2.value,
+                                      "parameters": {"scale": 0.5, "history": 20}}))
+    assert isinstance(detector, DetectorMOG2)
+
+    detections = []
+    for frame in _moving_square_frames():
+        detections = detector.run(frame)
+
+    assert len(detections) == 1
+    xmin, ymin, xmax, ymax = detections[0].bbox_xyxy
+    assert 130 <= xmin <= 150 and 95 <= ymin <= 105
+    assert 150 <= xmax <= 170 and 115 <= ymax <= 125
+
+
+class _CountingDetector(BaseDetector):
+
+    def __init__(self, **kwargs) -> None:
+        self.calls = 0
+
+    def run(self, frame):
+        self.calls += 1
+        return []
+
+
+def test_detector_motion_gated_skips_static_frames():
+    inner = _CountingDetector()
+    gated = DetectorMotionGated(detector=inner, motion={"history": 20}, hold_frames=0)
+
+    for frame in _moving_square_frames(n_static=30, n_moving=10):
+        gated.run(frame)
+
+    assert gated.frame_count == 40
+    assert inner.calls + gated.frames_skipped == 40
+    assert 10 <= inner.calls < 20
+
+    # the inference size is the wrapped detector's, if it has one
+    assert not hasattr(gated, "imgsz")
+    inner.imgsz = 640
+    gated.imgsz = 320
+    assert gated.imgsz == inner.imgsz == 320
+
+
+def test_resolution_selector_sizes_for_targets_and_budget():
+    selector = ResolutionSelector(sizes=[640, 320, 960], min_target_px=12, budget_ms=50, track_cost_ms=1,
+                                  refresh_interval=4)
+    shape = (1080, 1920, 3)
+
+    # nothing tracked: smallest size, except on refresh frames
+    assert [selector.select(shape) for _ in range(4)] == [320, 320, 320, 960]
+
+    # a 40 px target is 12 px at 640 and only 6.7 px at 320
+    selector.observe_tracks([200, 40])
+    assert selector.select(shape) == 640
+    assert selector.select(shape, max_size=480) == 320
+
+    # 960 is estimated at 45 ms from the 640 measurement, within the 48 ms left after 2 tracks but not after 10
+    selector.record(640, 20)
+    selector.observe_tracks([20, 25])
+    assert selector.select(shape) == 960
+    selector.observe_tracks([20] * 10)
+    assert selector.select(shape) == 640
+    assert selector.frames_per_size == {320: 4, 640: 2, 960: 2}
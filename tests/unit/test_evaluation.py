@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+
+from drone_detection import detectors, evaluation
+from drone_detection.evaluation import GroundTruth, Predictions, Variant, average_precision, evaluate, \
+    match_detections
+
+
+def test_match_detections_greedy_by_confidence_at_each_threshold():
+    gt = [[0, 0, 10, 10], [100, 100, 110, 110]]
+    boxes = [[0, 0, 10, 11], [1, 0, 11, 10], [100, 100, 110, 110], [50, 50, 60, 60]]
+    matched, ignored = match_detections(boxes, [0.6, 0.9, 0.8, 0.7], gt, iou_thresholds=[0.5, 0.85, 0.95])
+
+    # the most confident box takes the first object, the box matching it better is a duplicate
+    np.testing.assert_array_equal(matched, [[False, True, False], [True, False, False],
+                                            [True, True, True], [False, False, False]])
+    assert not ignored.any()
+
+    _, ignored = match_detections(boxes, [0.6, 0.9, 0.8, 0.7], gt, gt_ignore=[False, True])
+    assert ignored[2].all() and not ignored[[0, 1, 3]].any()
+
+
+def test_average_precision_and_size_buckets():
+    tp = np.array([[True], [False], [True]])
+    # precision 1 up to recall 0.5, then 2/3 up to recall 1
+    np.testing.assert_allclose(average_precision(tp, np.array([0.9, 0.8, 0.7]), 2), [(51 + 50 * 2 / 3) / 101])
+
+    ground_truth = [GroundTruth(image=None, bboxes_xyxy=np.array([[0, 0, 8, 8], [100, 100, 150, 150]], float))]
+    predictions = [Predictions(bboxes_xyxy=np.array([[100, 100, 150, 150], [300, 300, 340, 340]], float),
+                               confidences=np.array([0.9, 0.3]))]
+    results = evaluate(ground_truth, predictions, min_confidence=0.5)
+
+    assert results["all"]["objects"] == 2 and results["all"]["recall"] == 0.5
+    assert results["tiny"]["map50"] == 0 and results["tiny"]["recall"] == 0
+    assert results["medium"]["map50"] == 1 and results["medium"]["precision"] == 1
+    assert np.isnan(results["large"]["map50"])
+
+
+def test_predict_runs_the_variant_detector_and_caches_by_its_config(tmp_path, monkeypatch):
+    images = []
+    for i in range(3):
+        image = np.zeros((64, 64, 3), np.uint8)
+        image[10 + 10 * i:30 + 10 * i, 10:40] = 255
+        cv2.imwrite(str(tmp_path / f"{i}.png"), image)
+        images.append(tmp_path / f"{i}.png")
+    created = []
+    create = detectors.create
+    monkeypatch.setattr(detectors, "create", lambda cfg: created.append(cfg) or create(cfg))
+    variant = Variant(name="mog2", detector={"type": "MOG2", "parameters": {}})
+
+    first = evaluation.predict([variant], images, cache_dir=tmp_path / "cache")
+    again = evaluation.predict([variant], images, cache_dir=tmp_path / "cache")
+
+    assert len(created) == 1 and set(first["mog2"]) == {str(image) for image in images}
+    for image in images:
+        np.testing.assert_array_equal(first["mog2"][str(image)].bboxes_xyxy, again["mog2"][str(image)].bboxes_xyxy)
+    changed = Variant(name="mog2", detector={"type": "MOG2", "parameters": {"history": 10}})
+    assert changed.cache_key() != variant.cache_key()
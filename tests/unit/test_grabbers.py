@@ -0,0 +1,96 @@
+import pathlib
+import shutil
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from drone_detection.grabbers import VideoGrabber, ImageGrabber, Display
+
+DEMO_VIDEO = pathlib.Path(__file__).resolve().parents[2] / "data" / "demo.mp4"
+
+
+def test_video_grabber_pyav_seeks_exactly(tmp_path):
+    pytest.importorskip("av")
+    video = tmp_path / DEMO_VIDEO.name
+    shutil.copy(DEMO_VIDEO, video)
+
+    frames = list(VideoGrabber(video_path=str(video), video_root_dir=str(tmp_path), backend="pyav"))
+    assert (tmp_path / "demo.mp4.index.npz").exists()
+
+    grabber = VideoGrabber(video_path=str(video), video_root_dir=str(tmp_path), backend="pyav")
+    for frame in (len(frames) - 1, 3, 150):
+        grabber.seek(frame)
+        assert np.array_equal(next(grabber), frames[frame])
+
+    scaled = VideoGrabber(video_path=str(video), video_root_dir=str(tmp_path), backend="pyav", width=320)
+    height, width = frames[0].shape[:2]
+    assert next(scaled).shape == (round(height * 320 / width), 320, 3)
+
+
+def test_video_grabber_resolves_relative_paths_against_an_absolute_string_root(tmp_path):
+    shutil.copy(DEMO_VIDEO, tmp_path / DEMO_VIDEO.name)
+
+    grabber = VideoGrabber(video_path=DEMO_VIDEO.name, video_root_dir=str(tmp_path))
+
+    assert grabber.paths == [tmp_path / DEMO_VIDEO.name]
+    assert next(grabber) is not None
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_image_grabber_reads_in_order_and_skips_bad_files(tmp_path, use_mmap):
+    for i in range(1, 13):
+        cv2.imwrite(str(tmp_path / f"frame_{i}.png"), np.full((4, 6, 3), i, dtype=np.uint8))
+    (tmp_path / "frame_5.png").write_bytes(b"not an image")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    grabber = ImageGrabber(image_path=str(tmp_path), workers=2, read_ahead=3, use_mmap=use_mmap)
+    items = list(grabber.items())
+
+    assert [path.name for path, _ in items] == [f"frame_{i}.png" for i in range(1, 13) if i != 5]
+    assert [int(frame[0, 0, 0]) for _, frame in items] == [i for i in range(1, 13) if i != 5]
+    assert grabber.frames_skipped == 1
+    assert len(list(ImageGrabber(image_path=str(tmp_path / "frame_1*.png"), workers=0))) == 4
+
+
+def _wait_until(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.002)
+    return condition()
+
+
+def test_display_shows_latest_frame_downscaled_and_handles_keys(monkeypatch):
+    shown, keys = [], []
+
+    def slow_imshow(name, image):
+        time.sleep(0.02)
+        shown.append(image.shape)
+
+    monkeypatch.setattr(cv2, "imshow", slow_imshow)
+    monkeypatch.setattr(cv2, "waitKey", lambda delay: keys.pop(0) if keys else -1)
+    monkeypatch.setattr(cv2, "destroyAllWindows", lambda: None)
+
+    display = Display(max_width=320, max_height=240, poll_ms=1).start()
+    frame = np.zeros((2160, 3840, 3), np.uint8)
+    for _ in range(50):
+        display.show(frame)  # never waits on the slow window
+    assert _wait_until(lambda: display.shown >= 1)
+    assert display.dropped > 0
+    assert set(shown) == {(180, 320, 3)}
+
+    keys.append(ord("p"))
+    assert _wait_until(lambda: display.paused)
+    waiter = threading.Thread(target=display.wait_if_paused)
+    waiter.start()
+    waiter.join(0.05)
+    assert waiter.is_alive()
+    keys.append(ord(" "))  # steps one frame
+    waiter.join(2.0)
+    assert not waiter.is_alive()
+
+    keys.append(ord("q"))
+    assert _wait_until(lambda: display.quit_requested)
+    display.stop()
@@ -0,0 +1,76 @@
+import errno
+import os
+import sys
+
+import pytest
+
+from scripts.prepare_data import link_or_copy, process_dataset_folders_parallel
+
+CLASS_MAPPING = {"drone": 0}
+
+
+def _write_xml(path, image_filename, class_name="drone"):
+    path.write_text(f"<annotation><filename>{image_filename}</filename>"
+                    f"<size><width>100</width><height>50</height></size>"
+                    f"<object><name>{class_name}</name>"
+                    f"<bndbox><xmin>10</xmin><ymin>10</ymin><xmax>30</xmax><ymax>20</ymax></bndbox></object>"
+                    f"</annotation>")
+
+
+def _touch_later(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.mark.parametrize("check", ["mtime", "hash"])
+def test_prepare_data_reruns_incrementally_and_removes_stale_outputs(tmp_path, check):
+    images, annotations, output = tmp_path / "images", tmp_path / "xml", tmp_path / "yolo"
+    images.mkdir()
+    annotations.mkdir()
+    for name in ["a", "b", "c"]:
+        (images / f"{name}.jpg").write_bytes(name.encode() * 10)
+        _write_xml(annotations / f"{name}.xml", f"{name}.jpg")
+
+    def run():
+        return process_dataset_folders_parallel(images, annotations, output, CLASS_MAPPING, workers=1,
+                                                link_mode="copy", check=check)
+
+    first = run()
+    assert first["labels_written"] == 3
+    assert (output / "labels" / "a.txt").read_text() == "0 0.200000 0.300000 0.200000 0.200000\n"
+
+    unchanged = run()
+    assert unchanged["up_to_date"] == 3 and unchanged["processed"] == 0
+
+    # b no longer has a valid object, c's XML is deleted, a's image changes (same size, and for the hash check the
+    # same mtime, so only its content tells)
+    _write_xml(annotations / "b.xml", "b.jpg", class_name="bird")
+    _touch_later(annotations / "b.xml")
+    (annotations / "c.xml").unlink()
+    stat = (images / "a.jpg").stat()
+    (images / "a.jpg").write_bytes(b"A" * 10)
+    if check == "hash":
+        os.utime(images / "a.jpg", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    else:
+        _touch_later(images / "a.jpg")
+
+    changed = run()
+    assert changed["processed"] == 2 and changed["labels_written"] == 1 and changed["stale_removed"] == 2
+    assert (output / "images" / "a.jpg").read_bytes() == b"A" * 10
+    assert sorted(p.name for p in (output / "labels").iterdir()) == ["a.txt"]
+    assert sorted(p.name for p in (output / "images").iterdir()) == ["a.jpg"]
+    assert run()["up_to_date"] == 2
+
+
+def test_link_or_copy_falls_back_to_copy_without_fcntl(tmp_path, monkeypatch):
+    def cross_device(*args):
+        raise OSError(errno.EXDEV, "cross-device link")
+    monkeypatch.setattr(os, "link", cross_device)
+    monkeypatch.setitem(sys.modules, "fcntl", None)  # as on Windows
+    source = tmp_path / "a.jpg"
+    source.write_bytes(b"image")
+
+    assert link_or_copy(source, tmp_path / "b.jpg") == "copy"
+    assert (tmp_path / "b.jpg").read_bytes() == b"image"
+    with pytest.raises(OSError):
+        link_or_copy(source, tmp_path / "c.jpg", mode="reflink")
@@ -0,0 +1,67 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from drone_detection.detectors import BaseDetector, Detection
+from drone_detection.service import InferenceService, ServiceClient
+from drone_detection.trackers import MultiObjectTracker
+
+
+class MovingTargetDetector(BaseDetector):
+    """One detection per frame, at the x the frame's first pixel encodes."""
+
+    def __init__(self) -> None:
+        self.batch_sizes = []
+
+    def run(self, frame):
+        x = float(frame[0, 0, 0])
+        return [Detection(bbox_xyxy=(x, 20.0, x + 20, 40.0), data=frame[20:40, int(x):int(x) + 20], confidence=0.9)]
+
+    def run_batch(self, frames):
+        self.batch_sizes.append(len(frames))
+        return super().run_batch(frames)
+
+
+def _frame(x: int) -> np.ndarray:
+    frame = np.zeros((64, 128, 3), np.uint8)
+    frame[0, 0, 0] = x
+    return frame
+
+
+@pytest.mark.parametrize("encoding", ["png", "raw"])
+def test_service_batches_streams_and_tracks_each_separately(encoding):
+    detector = MovingTargetDetector()
+
+    async def run():
+        service = await InferenceService(detector, lambda: MultiObjectTracker(max_age=5), lambda **kwargs: {},
+                                         lambda **kwargs: 0.0, max_batch=8, max_wait_ms=20).start()
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        clients = [await ServiceClient(port=port, encoding=encoding).connect() for _ in range(3)]
+        # every frame of every stream is in flight at once, pipelined on one connection per stream
+        responses = await asyncio.gather(*[
+            asyncio.gather(*[client.detect(f"camera{i}", _frame(10 + 2 * f + 30 * i)) for f in range(10)])
+            for i, client in enumerate(clients)])
+        ended = await clients[0].end_stream("camera0")
+        with pytest.raises(RuntimeError, match="KeyError"):
+            await clients[1].request({"encoding": encoding})  # no stream id
+        streams = set(service.streams)
+        for client in clients:
+            await client.close()
+        server.close()
+        await server.wait_closed()
+        await service.stop()
+        return responses, ended, streams
+
+    responses, ended, streams = asyncio.run(run())
+
+    assert max(detector.batch_sizes) > 1 and sum(detector.batch_sizes) == 30
+    for i, stream_responses in enumerate(responses):
+        assert [r["frame"] for r in stream_responses] == list(range(10))
+        assert {r["stream"] for r in stream_responses} == {f"camera{i}"}
+        # the target keeps its track id in its stream's tracker
+        assert len({r["tracks"][0]["track_id"] for r in stream_responses}) == 1
+        assert stream_responses[-1]["tracks"][0]["bbox_xyxy"][0] == pytest.approx(10 + 18 + 30 * i, abs=2)
+    assert ended["ended"] and ended["frames"] == 10
+    assert streams == {"camera1", "camera2"}
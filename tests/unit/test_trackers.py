@@ -0,0 +1,184 @@
+import numpy as np
+import pytest
+from omegaconf import DictConfig
+
+from drone_detection.classifiers import ClassificationCadence
+from drone_detection.detectors import Detection
+from drone_detection.trackers import create, TrackerType, MultiObjectTracker, TrackManager, TrackEvent, Track
+from drone_detection.utils import ComputeScheduler
+
+
+def _detection(cx: float, cy: float, size: float = 20) -> Detection:
+    return Detection(bbox_xyxy=(cx - size / 2, cy - size / 2, cx + size / 2, cy + size / 2),
+                     data=np.zeros((1, 1, 3), dtype=np.uint8),
+                     confidence=0.9)
+
+
+def test_tracker_factory():
+    tracker = create(cfg=DictConfig({"type": TrackerType.MultiObject.value,
+                                     "parameters": {"max_age": 3}}))
+    assert isinstance(tracker, MultiObjectTracker)
+
+
+def test_multi_object_tracker_keeps_ids():
+    tracker = MultiObjectTracker(max_age=3)
+
+    for i in range(20):
+        tracks = tracker.update([_detection(100 + 3 * i, 100), _detection(400, 300 - 2 * i)], frame=None)
+
+    assert len(tracks) == 2
+    assert sorted(t.track_id for t in tracks) == [1, 2]
+    assert all(t.time_since_last_seen == 0 for t in tracks)
+    assert all(len(t) == 15 for t in tracks)
+    # the states computed as a batch are the estimator's
+    for track in tracks:
+        assert track.state == pytest.approx(track.estimator.get_state())
+
+
+def test_multi_object_tracker_removes_old_tracks():
+    tracker = MultiObjectTracker(max_age=3)
+    for i in range(5):
+        tracker.update([_detection(100, 100)], frame=None)
+
+    for i in range(4):
+        tracks = tracker.update([], frame=None)
+    assert len(tracks) == 0
+
+
+def test_multi_object_tracker_gates_far_detections():
+    tracker = MultiObjectTracker(max_age=3)
+    for i in range(10):
+        tracker.update([_detection(100, 100)], frame=None)
+
+    # a detection far from the only track must start a new track
+    tracks = tracker.update([_detection(600, 400)], frame=None)
+    assert sorted(t.track_id for t in tracks) == [1, 2]
+    assert tracker.tracks[1].time_since_last_seen == 1
+
+
+def test_multi_object_tracker_grid_matches_dense():
+    rng = np.random.default_rng(0)
+    dense = MultiObjectTracker(grid_min_pairs=None)
+    sparse = MultiObjectTracker(grid_min_pairs=0)
+
+    centres = rng.uniform(0, 1000, size=(100, 2))
+    velocities = rng.uniform(-5, 5, size=(100, 2))
+    for i in range(15):
+        centres += velocities
+        detections = [_detection(cx, cy) for cx, cy in centres + rng.normal(0, 2, size=centres.shape)]
+        # a large target is matched outside the grid rather than setting its cell size
+        detections.append(_detection(100 + 5 * i, 500, size=300))
+        dense_tracks = dense.update(detections, frame=None)
+        sparse_tracks = sparse.update(detections, frame=None)
+
+        assert [t.track_id for t in dense_tracks] == [t.track_id for t in sparse_tracks]
+        assert np.allclose([t.bbox_xyxy for t in dense_tracks], [t.bbox_xyxy for t in sparse_tracks])
+    assert sparse.grid.cell_size < 100
+    assert sparse.tracks[101].time_since_last_seen == 0
+
+
+def test_track_manager_lifecycle_events():
+    manager = TrackManager(max_age=2, log_events=False)
+    events = []
+    manager.subscribe(lambda event, track: events.append((event, track.track_id)))
+
+    manager.update([(7, _detection(100, 100)), (8, _detection(300, 100))])
+    manager.update([(7, _detection(102, 100))])
+    for i in range(3):
+        tracks = manager.update([(7, _detection(104 + 2 * i, 100))])
+
+    assert [t.track_id for t in tracks] == [7]
+    assert events == [(TrackEvent.CREATED, 7), (TrackEvent.CREATED, 8),
+                      (TrackEvent.LOST, 8), (TrackEvent.REMOVED, 8)]
+
+
+def test_track_manager_reuses_removed_tracks():
+    manager = TrackManager(max_age=0, log_events=False)
+    first = manager.create(_detection(100, 100))
+    for i in range(3):
+        first.update(_detection(100 + 5 * i, 100))
+    manager.update_tracks([first], [None])
+    assert len(manager) == 0
+
+    second = manager.create(_detection(500, 300))
+    assert second is first
+    assert second.track_id == 2
+    assert second.time_since_last_seen == 0
+    assert len(second) == 1
+    assert np.allclose(second.bbox_xyxy, _detection(500, 300).bbox_xyxy)
+
+
+def test_deep_sort_reuses_cached_embeddings():
+    tracker = create(cfg=DictConfig({"type": TrackerType.DeepSort.value,
+                                     "parameters": {"max_age": 3, "embedding_max_age": 5, "embedder_gpu": False}}))
+    frame = np.full((480, 640, 3), 200, dtype=np.uint8)
+    for i in range(12):
+        detections = [_detection(100 + 2 * i, 100), _detection(400, 300 - 2 * i)]
+        tracks = tracker.update(detections, frame=frame)
+
+    assert sorted(t.track_id for t in tracks) == ["1", "2"]
+    # embedded on the first frame and then refreshed, instead of every frame
+    assert tracker.crops_embedded < 2 * 12 / 2
+    assert tracker.embedder_calls < 12
+
+
+def test_deep_sort_skips_degenerate_boxes():
+    tracker = create(cfg=DictConfig({"type": TrackerType.DeepSort.value,
+                                     "parameters": {"max_age": 3, "cache_embeddings": False, "embedder_gpu": False}}))
+    frame = np.random.default_rng(0).integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+    detections = [_detection(50, 50, size=0), _detection(100, 100), _detection(400, 300)]
+    for i in range(4):
+        tracks = tracker.update(detections, frame=frame)
+
+    assert sorted(t.track_id for t in tracks) == ["1", "2"]
+    # each track cached the embedding of its own detection
+    for track in tracks:
+        box = np.asarray(track.detection.bbox_xyxy, dtype=float)[None]
+        assert np.allclose(tracker._embeddings[track.track_id][0], tracker.embed(frame, box), atol=1e-3)
+
+
+def test_deep_sort_only_schedules_confirmed_tracks():
+    class RecordingScheduler(ComputeScheduler):
+        def may_spend(self, track, work):
+            spent.append(track)
+            return super().may_spend(track, work)
+
+    spent = []
+    tracker = create(cfg=DictConfig({"type": TrackerType.DeepSort.value,
+                                     "parameters": {"max_age": 3, "embedding_max_age": 0, "embedder_gpu": False}}))
+    tracker.scheduler = RecordingScheduler(budget_ms=0, costs={"reid": 1})
+    frame = np.full((480, 640, 3), 200, dtype=np.uint8)
+    for i in range(4):
+        tracker.scheduler.plan(list(tracker.tracks.values()))
+        tracker.update([_detection(100 + 2 * i, 100)], frame=frame)
+
+    # the tentative track is re-embedded without asking, the confirmed track is ranked and deferred
+    assert spent and all(isinstance(track, Track) for track in spent)
+    assert tracker.scheduler.deferred["reid"] == len(spent)
+
+
+def test_classification_cadence_caches_results_on_track():
+    calls = []
+    scores = iter([10.0, 10.0, 80.0, 80.0, 10.0])
+
+    def classify(state_history):
+        calls.append(len(state_history))
+        return {"Hovering": 1.0}
+
+    cadence = ClassificationCadence(interval=3, velocity_delta=1e9, area_delta=1e9, high_threat_threshold=50)
+    track = Track(track_id=1, detection=_detection(100, 100))
+    for i in range(8):
+        track.update(_detection(100, 100))
+        cadence.classify(track, classify, lambda state, behavior_probs: next(scores))
+
+    # every 3 frames while low threat, every frame while high threat
+    assert calls == [1, 4, 7, 8]
+    assert track.classification == {"Hovering": 1.0} and track.threat_score == 80.0
+
+    # a large change of area invalidates the cached result
+    cadence.area_delta = 0.25
+    cadence.high_threat_threshold = 100
+    assert not cadence.should_classify(track)
+    track.update(_detection(100, 100, size=40))
+    track.update(_detection(100, 100, size=40))
+    assert cadence.should_classify(track)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from drone_detection.tracking_evaluation import Tracks, evaluate_sequence, metrics
+
+
+def _tracks(rows: list[tuple[int, int, float]]) -> Tracks:
+    # (frame, id, x) of 10x10 boxes
+    return Tracks(frames=np.array([r[0] for r in rows]), ids=np.array([r[1] for r in rows]),
+                  bboxes_xyxy=np.array([[x, 0, x + 10, 10] for _, _, x in rows], dtype=float))
+
+
+def test_perfect_tracking():
+    gt = _tracks([(f, i, 50 * i + f) for f in range(20) for i in range(3)])
+    result = metrics(evaluate_sequence(gt, gt))
+    for name in ("MOTA", "IDF1", "HOTA", "DetA", "AssA", "LocA"):
+        assert result[name] == pytest.approx(1)
+    assert result["id_switches"] == 0
+
+
+def test_id_switch_and_missed_object():
+    gt = _tracks([(f, 0, f) for f in range(10)] + [(f, 1, 100) for f in range(10)])
+    # the first object changes id half way through, the second is only found in the last 5 frames
+    predicted = _tracks([(f, 0 if f < 5 else 1, f) for f in range(10)] + [(f, 2, 100) for f in range(5, 10)])
+    result = metrics(evaluate_sequence(gt, predicted))
+
+    assert result["id_switches"] == 1
+    assert result["MOTA"] == pytest.approx(1 - (5 + 0 + 1) / 20)
+    # the first gt track matches predicted track 0 or 1 for 5 frames, the second matches track 2 for 5 frames
+    assert result["IDF1"] == pytest.approx(2 * 10 / (20 + 15))
+    assert result["DetA"] == pytest.approx(15 / 20)
+    # every matched pair of tracks shares 5 of the 10 detections of the ground truth track
+    assert result["AssA"] == pytest.approx(0.5)
+    assert result["HOTA"] == pytest.approx(np.sqrt(0.75 * 0.5))
@@ -0,0 +1,74 @@
+import pathlib
+import pickle
+
+import cv2
+import numpy as np
+
+from drone_detection.training import PackedDataset, pack_dataset
+
+
+def test_pack_dataset_round_trip(tmp_path):
+    (tmp_path / "images").mkdir()
+    (tmp_path / "labels").mkdir()
+    cv2.imwrite(str(tmp_path / "images" / "a.png"), np.full((100, 200, 3), 50, dtype=np.uint8))
+    cv2.imwrite(str(tmp_path / "images" / "b.png"), np.full((300, 150, 3), 200, dtype=np.uint8))
+    (tmp_path / "images" / "broken.jpg").write_bytes(b"not an image")
+    (tmp_path / "labels" / "a.txt").write_text("0 0.5 0.5 0.1 0.2\n1 0.25 0.25 0.1 0.1\n")
+
+    pack = PackedDataset(pack_dataset(tmp_path / "images", imgsz=64, workers=2))
+
+    assert len(pack) == 2
+    assert pack.image(0).shape == (32, 64, 3) and pack.original_shape(0) == (100, 200)
+    assert pack.image(1).shape == (64, 32, 3) and (pack.image(1) == 200).all()
+    assert not pack.image(0).flags.writeable
+    np.testing.assert_allclose(pack.labels(0), [[0, 0.5, 0.5, 0.1, 0.2], [1, 0.25, 0.25, 0.1, 0.1]])
+    assert pack.labels(1).shape == (0, 5)
+    assert (pickle.loads(pickle.dumps(pack)).image(1) == 200).all()
+
+
+def test_packed_yolo_dataset_rect_mode_pairs_images_with_their_labels(tmp_path):
+    from ultralytics.cfg import get_cfg
+    from drone_detection.training.ultralytics_packed import build_packed_dataset
+
+    (tmp_path / "images").mkdir()
+    (tmp_path / "labels").mkdir()
+    # mixed aspect ratios, so rect mode sorts the images out of file order
+    shapes = {"a": (50, 200), "b": (200, 50), "c": (100, 100), "d": (60, 180)}
+    for k, (name, shape) in enumerate(shapes.items()):
+        cv2.imwrite(str(tmp_path / "images" / f"{name}.png"), np.full((*shape, 3), 10 * (k + 1), dtype=np.uint8))
+        (tmp_path / "labels" / f"{name}.txt").write_text(f"{k} 0.5 0.5 0.1 0.1\n")
+
+    dataset = build_packed_dataset(get_cfg(overrides={"imgsz": 64}), str(tmp_path / "images"), batch=2,
+                                   data={"names": {k: name for k, name in enumerate(shapes)}, "nc": 4, "channels": 3},
+                                   mode="val", rect=True)
+
+    assert [pathlib.Path(f).stem for f in dataset.im_files] != list(shapes)
+    for i in range(len(dataset)):
+        item = dataset.get_image_and_label(i)
+        k = list(shapes).index(pathlib.Path(item["im_file"]).stem)
+        assert item["ori_shape"] == shapes[pathlib.Path(item["im_file"]).stem]
+        assert item["cls"].ravel().tolist() == [k]
+        assert (item["img"] == 10 * (k + 1)).all()
+        assert "pack_index" not in item
+
+
+def test_open_pack_repacks_when_the_sources_change(tmp_path):
+    from drone_detection.training.ultralytics_packed import open_pack
+
+    (tmp_path / "images").mkdir()
+    (tmp_path / "labels").mkdir()
+    cv2.imwrite(str(tmp_path / "images" / "a.png"), np.full((40, 80, 3), 50, dtype=np.uint8))
+    (tmp_path / "labels" / "a.txt").write_text("0 0.5 0.5 0.1 0.2\n")
+
+    pack = open_pack(tmp_path / "images", 32)
+    assert pack.is_current()
+    written = (pack.path / "meta.json").stat().st_mtime_ns
+    assert (open_pack(tmp_path / "images", 32).path / "meta.json").stat().st_mtime_ns == written
+
+    (tmp_path / "labels" / "a.txt").write_text("1 0.5 0.5 0.3 0.4\n")
+    cv2.imwrite(str(tmp_path / "images" / "b.png"), np.full((80, 40, 3), 200, dtype=np.uint8))
+    assert not pack.is_current()
+
+    repacked = open_pack(tmp_path / "images", 32)
+    assert repacked.is_current() and len(repacked) == 2
+    np.testing.assert_allclose(repacked.labels(0), [[1, 0.5, 0.5, 0.3, 0.4]])
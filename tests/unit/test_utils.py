@@ -0,0 +1,290 @@
+import copy
+import os
+import subprocess
+import sys
+import types
+import urllib.request
+
+import numpy as np
+import pytest
+
+from drone_detection.detectors import Detection, DetectionBatch
+from drone_detection.utils import xyxy_to_xywh, xyxy_to_cxcywh, boxes_xyxy_to_xywh, boxes_xywh_to_xyxy, \
+    boxes_xyxy_to_cxcywh, boxes_cxcywh_to_xyxy, clip_boxes, iou_matrix, giou_matrix, nms, SpatialGrid, grid_nms, \
+    ModelRegistry, Runtime, parse_cores, RealtimeController, ComputeScheduler, MetricsRegistry, MetricsExporter, \
+    Profiler, OverlayRenderer, draw_track, draw_classification, draw_threat_scores
+from drone_detection.utils import realtime
+from drone_detection.utils.model_registry import BACKENDS, _shared_network
+
+BOXES = np.array([[0, 0, 10, 10],
+                  [5, 5, 15, 15],
+                  [20, 20, 30, 40]], dtype=float)
+
+
+def test_box_conversions_match_single_box_functions():
+    assert np.allclose(boxes_xyxy_to_xywh(BOXES), [xyxy_to_xywh(b) for b in BOXES])
+    assert np.allclose(boxes_xyxy_to_cxcywh(BOXES), [xyxy_to_cxcywh(b) for b in BOXES])
+    assert np.allclose(boxes_xywh_to_xyxy(boxes_xyxy_to_xywh(BOXES)), BOXES)
+    assert np.allclose(boxes_cxcywh_to_xyxy(boxes_xyxy_to_cxcywh(BOXES)), BOXES)
+
+
+def test_clip_boxes():
+    clipped = clip_boxes([[-5, -5, 10, 10], [5, 5, 50, 50]], width=20, height=30)
+    assert np.allclose(clipped, [[0, 0, 10, 10], [5, 5, 20, 30]])
+
+
+def test_iou_matrix():
+    iou = iou_matrix(BOXES, BOXES)
+    assert iou.shape == (3, 3)
+    assert np.allclose(np.diag(iou), 1)
+    assert iou[0, 1] == pytest.approx(25 / 175)
+    assert iou[0, 2] == 0
+    assert iou_matrix(BOXES, np.empty((0, 4))).shape == (3, 0)
+
+
+def test_giou_matrix():
+    giou = giou_matrix(BOXES, BOXES)
+    assert np.allclose(np.diag(giou), 1)
+    # non-overlapping boxes have negative GIoU: enclosing box is 30x40
+    assert giou[0, 2] == pytest.approx(0 - (1200 - 300) / 1200)
+
+
+def test_nms():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [20, 20, 30, 30]], dtype=float)
+    keep = nms(boxes, scores=[0.5, 0.9, 0.7], iou_threshold=0.5)
+    assert keep.tolist() == [1, 2]
+
+
+def test_detection_batch_round_trip():
+    frame = np.zeros((50, 50, 3), dtype=np.uint8)
+    detections = [Detection(bbox_xyxy=b, data=frame, confidence=c) for b, c in zip(BOXES, [0.1, 0.2, None])]
+
+    batch = DetectionBatch.from_detections(detections)
+    assert len(batch) == 3
+    assert np.allclose(batch.bboxes_xywh, boxes_xyxy_to_xywh(BOXES))
+
+    selected = batch[batch.confidences > 0.15]
+    assert len(selected) == 1
+
+    round_trip = batch.to_detections(frame)
+    assert np.allclose([d.bbox_xyxy for d in round_trip], BOXES)
+    assert [d.confidence for d in round_trip] == [0.1, 0.2, None]
+    assert round_trip[2].data.shape == (20, 10, 3)
+
+
+def test_spatial_grid_returns_all_close_points():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 1000, size=(500, 2))
+    queries = rng.uniform(0, 1000, size=(200, 2))
+
+    grid = SpatialGrid(cell_size=50)
+    grid.update(points, ids=np.arange(500))
+    # second update reuses the previous order, with some points removed and moved
+    points = points[50:] + rng.normal(0, 10, size=(450, 2))
+    grid.update(points, ids=np.arange(50, 500))
+
+    point_index, query_index = grid.candidate_pairs(queries)
+    candidates = set(zip(point_index.tolist(), query_index.tolist()))
+    assert len(candidates) == len(point_index)
+
+    distance = np.linalg.norm(points[:, None] - queries[None], axis=2)
+    close = set(zip(*np.nonzero(distance <= 50)))
+    assert close <= candidates
+
+
+def test_grid_nms_matches_nms():
+    rng = np.random.default_rng(0)
+    centres = rng.uniform(0, 500, size=(300, 2))
+    sizes = rng.uniform(5, 60, size=(300, 2))
+    boxes = np.hstack([centres - sizes / 2, centres + sizes / 2])
+    scores = rng.random(300)
+
+    assert np.array_equal(grid_nms(boxes, scores, 0.3), nms(boxes, scores, 0.3))
+
+
+def test_model_registry_loads_each_model_once(monkeypatch, tmp_path):
+    loaded = []
+
+    def load(model_path, device, warmup_imgsz):
+        loaded.append((model_path, device))
+        return {"path": model_path}
+
+    monkeypatch.setitem(BACKENDS, "fake", (load, lambda model: {"shared": model}))
+    registry = ModelRegistry()
+
+    first = registry.get(tmp_path / "a.pt", backend="fake")
+    second = registry.get(tmp_path / "a.pt", backend="fake")
+    registry.get(tmp_path / "a.pt", backend="fake", device="cpu")
+
+    assert first is not second and first["shared"] is second["shared"]
+    assert len(loaded) == 2 and len(registry) == 2
+    with pytest.raises(ValueError):
+        registry.get(tmp_path / "a.pt", backend="unknown")
+
+
+def test_shared_network_only_aliases_deep_copies_inside_the_block():
+    import torch
+
+    network = torch.nn.Linear(2, 2)
+    with _shared_network(network):
+        with _shared_network(network):
+            assert copy.deepcopy(network) is network
+        assert copy.deepcopy(network) is network
+    assert copy.deepcopy(network) is not network
+    assert "__deepcopy__" not in vars(network)
+
+
+def test_packages_import_backends_lazily():
+    code = ("import sys\n"
+            "from drone_detection import detectors, trackers, grabbers\n"
+            "assert not {'torch', 'ultralytics', 'deep_sort_realtime', 'scipy'} & set(sys.modules)\n"
+            "assert trackers.MultiObjectTracker.__name__ == 'MultiObjectTracker'\n"
+            "assert 'scipy' in sys.modules and 'torch' not in sys.modules\n")
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_parse_cores():
+    assert parse_cores("0-3,8") == {0, 1, 2, 3, 8}
+    assert parse_cores(2) == {2}
+    assert parse_cores([0, 1]) == {0, 1}
+    assert parse_cores(None) is None
+
+
+def test_runtime_stage_affinity():
+    available = sorted(os.sched_getaffinity(0))
+    runtime = Runtime(opencv_threads=1, affinity={"detector": str(available[0]), "tracker": None})
+    runtime.apply()
+
+    with runtime.stage("detector"):
+        assert os.sched_getaffinity(0) == {available[0]}
+    with runtime.stage("tracker"):
+        assert os.sched_getaffinity(0) == set(available)
+
+    with pytest.raises(ValueError):
+        Runtime(affinity={"detector": [max(available) + 1]})
+
+
+def test_realtime_controller_degrades_and_restores(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(realtime.time, "perf_counter", lambda: clock[0])
+    controller = RealtimeController(budget_ms=10, imgsz_steps=[320], max_stride=2, patience=2, recovery=3,
+                                    smoothing=1.0)
+
+    def run_frame(ms):
+        controller.start_frame()
+        clock[0] += ms / 1000
+        controller.end_frame()
+
+    for _ in range(6):
+        run_frame(50)
+    assert controller.ladder[:controller.level] == [("skip_drawing", True),
+                                                    ("skip_low_threat_classification", True),
+                                                    ("reduce_imgsz", 320)]
+    assert not controller.draw and controller.imgsz == 320 and controller.stride == 1
+    assert controller.should_classify(None) and not controller.should_classify(10)
+
+    for _ in range(4):
+        run_frame(50)
+    assert controller.stride == 2 and controller._active("drop_frames")
+    assert controller.should_drop()
+
+    for _ in range(3):
+        run_frame(1)
+    assert controller.level == len(controller.ladder) - 1
+    assert controller.stats()["restorations"] == {"drop_frames": 1}
+
+
+def test_compute_scheduler_admits_highest_priority_tracks():
+    def track(track_id, threat_score, area=100.0, vw=0.0):
+        return types.SimpleNamespace(track_id=track_id, threat_score=threat_score, state={"area": area, "vw": vw})
+
+    # room for the work of two tracks
+    scheduler = ComputeScheduler(budget_ms=6, costs={"reid": 2, "high_res": 1, "classification": 0})
+    low, high, close, unscored = track(1, 10), track(2, 60), track(3, 10, area=5000), track(4, None)
+    scheduler.plan([low, high, close, unscored])
+
+    assert scheduler.may_spend(unscored, "reid") and scheduler.may_spend(high, "classification")
+    assert not scheduler.may_spend(close, "reid") and not scheduler.may_spend(low, "high_res")
+    assert scheduler.may_spend(None, "reid")
+
+    # a track created after planning only gets work while there is budget left
+    scheduler.plan([low, close])
+    assert scheduler.may_spend(close, "reid") and scheduler.may_spend(low, "reid")
+    assert not scheduler.may_spend(track(5, None), "reid")
+    assert scheduler.stats()["deferred"] == {"reid": 2, "high_res": 1}
+
+
+def test_metrics_render_and_endpoint(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("frames", "Frames read").inc(3)
+    latency = registry.histogram("stage_seconds", "Stage time", buckets=(0.01, 0.1), stage="detector")
+    for value in (0.005, 0.05, 0.5):
+        latency.observe(value)
+    registry.gauge("active_tracks").set(7)
+
+    text = registry.render()
+    assert "# TYPE drone_frames counter\ndrone_frames_total 3.0" in text
+    assert 'drone_stage_seconds_bucket{stage="detector",le="0.1"} 2.0' in text
+    assert 'drone_stage_seconds_bucket{stage="detector",le="+Inf"} 3.0' in text
+    assert 'drone_stage_seconds_count{stage="detector"} 3.0' in text
+    assert latency.quantile(0.5) == 0.1
+
+    exporter = MetricsExporter(registry, port=0, dump_path=str(tmp_path / "metrics.prom")).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics") as response:
+            assert response.read().decode() == text
+    finally:
+        exporter.stop()
+    assert (tmp_path / "metrics.prom").read_text() == text
+
+    registry.enabled = False
+    registry.counter("frames").inc()
+    with latency.time():
+        pass
+    assert registry.counter("frames").value == 3 and latency.count == 3
+
+
+def test_profiler_writes_a_report_per_window(tmp_path):
+    profiler = Profiler(output_dir=str(tmp_path), interval=4, window=2, signal_name=None)
+    assert profiler.stage("detector") is profiler.stage("tracker")  # the shared no-op while off
+
+    profiler.toggle()
+    for _ in range(8):
+        profiler.start_frame()
+        with profiler.stage("detector"):
+            sorted(range(1000), key=lambda i: -i)
+        with profiler.stage("tracker"):
+            pass
+    profiler.stop()
+
+    assert len(profiler.reports) == 2
+    for report in profiler.reports:
+        assert {p.name for p in report.iterdir()} == {"detector.prof", "detector.txt", "tracker.prof",
+                                                       "tracker.txt", "packages.txt", "memory.txt"}
+    assert "growth since the previous window" in (profiler.reports[1] / "memory.txt").read_text()
+    assert not profiler.enabled and not profiler.profiling
+
+
+def test_overlay_renderer_matches_draw_functions():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (240, 320, 3), dtype=np.uint8)
+    tracks = [types.SimpleNamespace(track_id=i, bbox_xyxy=np.array([x, y, x + 25.4, y + 18.6]))
+              for i, (x, y) in enumerate([(-10, 30), (100, 100), (290, 220), (150, 5)])]
+    classifications = {0: {"Hovering": 0.2, "Attacking": 0.8}, 2: {"Hovering": 1.0, "Attacking": 0.0}}
+    threat_scores = {0: 40.0, 2: 120.0}
+
+    expected = image.copy()
+    for track in tracks:
+        if track.track_id in classifications:
+            draw_classification(expected, track.bbox_xyxy, classifications[track.track_id])
+        draw_track(expected, track.bbox_xyxy, track.track_id)
+    draw_threat_scores(expected, threat_scores)
+
+    renderer = OverlayRenderer(cache_size=4)
+    np.testing.assert_array_equal(renderer.render(image.copy(), tracks, classifications, threat_scores), expected)
+    assert len(renderer._sprites) == 4
+    assert renderer.sprite("[1]", 0.4, (0, 255, 0)) is renderer.sprite("[1]", 0.4, (0, 255, 0))
+
+    assert OverlayRenderer(display_width=160).render(image, tracks, classifications).shape == (120, 160, 3)
+    # frames that are not drawn on are downscaled to the same size
+    assert OverlayRenderer(display_width=160).resize(image).shape == (120, 160, 3)